@@ -0,0 +1,33 @@
+"""keyset indexes for top-rated comment listing
+
+Revision ID: 1b4d788547bd
+Revises: 8c6bdc9f5dbc
+Create Date: 2026-10-16 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1b4d788547bd'
+down_revision = '8c6bdc9f5dbc'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # sort=top: ORDER BY rating DESC, id DESC; newest использует обратный обход *_listing
+    op.create_index(
+        'ix_comments_root_top',
+        'comments',
+        ['entity_type', 'entity_id', 'rating', 'id'],
+        postgresql_where=sa.text('parent_id IS NULL'),
+        sqlite_where=sa.text('parent_id IS NULL'),
+    )
+    op.create_index('ix_comments_parent_top', 'comments', ['parent_id', 'rating', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_comments_parent_top', table_name='comments')
+    op.drop_index('ix_comments_root_top', table_name='comments')
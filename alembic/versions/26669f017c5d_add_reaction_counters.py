@@ -0,0 +1,55 @@
+"""add likes_count / dislikes_count reaction counters
+
+Revision ID: 26669f017c5d
+Revises: 7bf2041592d7
+Create Date: 2026-10-16 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '26669f017c5d'
+down_revision = '7bf2041592d7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('comments', schema=None) as batch_op:
+        batch_op.add_column(
+            sa.Column('likes_count', sa.Integer(), nullable=False, server_default='0')
+        )
+        batch_op.add_column(
+            sa.Column('dislikes_count', sa.Integer(), nullable=False, server_default='0')
+        )
+
+    # Заполняем счетчики по существующим реакциям и выравниваем рейтинг
+    op.execute(
+        """
+        UPDATE comments SET
+            likes_count = (
+                SELECT count(*) FROM comment_reactions r
+                WHERE r.comment_id = comments.id AND r.reaction = 'like'
+            ),
+            dislikes_count = (
+                SELECT count(*) FROM comment_reactions r
+                WHERE r.comment_id = comments.id AND r.reaction = 'dislike'
+            )
+        WHERE EXISTS (SELECT 1 FROM comment_reactions r WHERE r.comment_id = comments.id)
+        """
+    )
+    op.execute(
+        """
+        UPDATE comments SET
+            rating = likes_count - dislikes_count,
+            is_positive = (likes_count >= dislikes_count)
+        """
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('comments', schema=None) as batch_op:
+        batch_op.drop_column('dislikes_count')
+        batch_op.drop_column('likes_count')
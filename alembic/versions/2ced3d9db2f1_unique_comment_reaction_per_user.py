@@ -0,0 +1,65 @@
+"""unique (comment_id, user_id) index on comment_reactions
+
+Revision ID: 2ced3d9db2f1
+Revises: 26669f017c5d
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '2ced3d9db2f1'
+down_revision = '26669f017c5d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Удаляем дубликаты, оставляя самую позднюю реакцию пользователя
+    op.execute(
+        """
+        DELETE FROM comment_reactions
+        WHERE id NOT IN (
+            SELECT max_id FROM (
+                SELECT max(id) AS max_id FROM comment_reactions GROUP BY comment_id, user_id
+            ) AS latest
+        )
+        """
+    )
+
+    # После удаления дубликатов пересчитываем счетчики реакций
+    op.execute(
+        """
+        UPDATE comments SET
+            likes_count = (
+                SELECT count(*) FROM comment_reactions r
+                WHERE r.comment_id = comments.id AND r.reaction = 'like'
+            ),
+            dislikes_count = (
+                SELECT count(*) FROM comment_reactions r
+                WHERE r.comment_id = comments.id AND r.reaction = 'dislike'
+            )
+        """
+    )
+    op.execute(
+        """
+        UPDATE comments SET
+            rating = likes_count - dislikes_count,
+            is_positive = (likes_count >= dislikes_count)
+        """
+    )
+
+    op.create_index(
+        'uq_comment_reactions_comment_user',
+        'comment_reactions',
+        ['comment_id', 'user_id'],
+        unique=True,
+    )
+    # Покрывается составным индексом (comment_id — его первая колонка)
+    op.drop_index('ix_comment_reactions_comment_id', table_name='comment_reactions')
+
+
+def downgrade() -> None:
+    op.create_index('ix_comment_reactions_comment_id', 'comment_reactions', ['comment_id'])
+    op.drop_index('uq_comment_reactions_comment_user', table_name='comment_reactions')
@@ -0,0 +1,54 @@
+"""add denormalized comment counters
+
+Revision ID: 7bf2041592d7
+Revises: 8debb87afd2d
+Create Date: 2026-10-16 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7bf2041592d7'
+down_revision = '8debb87afd2d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Счетчик прямых ответов на комментарий
+    with op.batch_alter_table('comments', schema=None) as batch_op:
+        batch_op.add_column(
+            sa.Column('children_count', sa.Integer(), nullable=False, server_default='0')
+        )
+
+    # Счетчик комментариев сущности (пост/игра), включая ответы
+    op.create_table(
+        'comment_counts',
+        sa.Column('entity_type', sa.String(length=10), primary_key=True),
+        sa.Column('entity_id', sa.Integer(), primary_key=True),
+        sa.Column('comment_count', sa.Integer(), nullable=False, server_default='0'),
+    )
+
+    # Заполняем счетчики по существующим данным
+    op.execute(
+        """
+        UPDATE comments SET children_count = (
+            SELECT count(*) FROM comments AS child WHERE child.parent_id = comments.id
+        )
+        WHERE EXISTS (SELECT 1 FROM comments AS child WHERE child.parent_id = comments.id)
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO comment_counts (entity_type, entity_id, comment_count)
+        SELECT entity_type, entity_id, count(*) FROM comments GROUP BY entity_type, entity_id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('comment_counts')
+    with op.batch_alter_table('comments', schema=None) as batch_op:
+        batch_op.drop_column('children_count')
@@ -0,0 +1,50 @@
+"""composite indexes for comment listing queries
+
+Revision ID: 8c6bdc9f5dbc
+Revises: 2ced3d9db2f1
+Create Date: 2026-10-16 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c6bdc9f5dbc'
+down_revision = '2ced3d9db2f1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Корневые комментарии: фильтр (entity_type, entity_id, parent_id IS NULL) + порядок ленты
+    op.create_index(
+        'ix_comments_root_listing',
+        'comments',
+        ['entity_type', 'entity_id', 'created_at', 'id'],
+        postgresql_where=sa.text('parent_id IS NULL'),
+        sqlite_where=sa.text('parent_id IS NULL'),
+    )
+    # Ответы: фильтр parent_id + порядок ленты; также обслуживает FK parent_id
+    op.create_index(
+        'ix_comments_parent_listing', 'comments', ['parent_id', 'created_at', 'id']
+    )
+    # Все комментарии сущности: удаление по сущности и сверка счетчиков
+    op.create_index('ix_comments_entity', 'comments', ['entity_type', 'entity_id', 'id'])
+
+    # Одноколоночные индексы покрываются составными и только увеличивают стоимость записи
+    op.drop_index('ix_comments_entity_id', table_name='comments')
+    op.drop_index('ix_comments_entity_type', table_name='comments')
+    op.drop_index('ix_comments_parent_id', table_name='comments')
+    op.drop_index('ix_comments_created_at', table_name='comments')
+
+
+def downgrade() -> None:
+    op.create_index('ix_comments_created_at', 'comments', ['created_at'])
+    op.create_index('ix_comments_parent_id', 'comments', ['parent_id'])
+    op.create_index('ix_comments_entity_type', 'comments', ['entity_type'])
+    op.create_index('ix_comments_entity_id', 'comments', ['entity_id'])
+
+    op.drop_index('ix_comments_entity', table_name='comments')
+    op.drop_index('ix_comments_parent_listing', table_name='comments')
+    op.drop_index('ix_comments_root_listing', table_name='comments')
@@ -0,0 +1,86 @@
+"""add root_id / depth / path materialized path to comments
+
+Revision ID: b6f502c5d77a
+Revises: 1b4d788547bd
+Create Date: 2026-10-16 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b6f502c5d77a'
+down_revision = '1b4d788547bd'
+branch_labels = None
+depends_on = None
+
+
+def _segment_sql(column: str) -> str:
+    """SQL-выражение сегмента пути: id, дополненный нулями до 10 знаков, и "/" """
+    if op.get_bind().dialect.name == 'postgresql':
+        return f"lpad(CAST({column} AS TEXT), 10, '0') || '/'"
+    return f"substr('0000000000' || {column}, -10, 10) || '/'"
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('comments', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('root_id', sa.Integer(), nullable=True))
+        batch_op.add_column(
+            sa.Column('depth', sa.Integer(), nullable=False, server_default='0')
+        )
+        # Побайтовое сравнение для диапазонного поиска ветки и сортировки по path
+        batch_op.add_column(
+            sa.Column(
+                'path',
+                sa.Text().with_variant(sa.Text(collation='C'), 'postgresql'),
+                nullable=True,
+            )
+        )
+
+    segment = _segment_sql('comments.id')
+    bind = op.get_bind()
+
+    # Корневые комментарии
+    op.execute(
+        f"""
+        UPDATE comments SET root_id = id, depth = 0, path = {segment}
+        WHERE parent_id IS NULL
+        """
+    )
+
+    # Ответы — уровень за уровнем, пока есть строки, чей родитель уже заполнен
+    while True:
+        result = bind.execute(
+            sa.text(
+                f"""
+                UPDATE comments SET
+                    root_id = (SELECT p.root_id FROM comments p WHERE p.id = comments.parent_id),
+                    depth = (SELECT p.depth FROM comments p WHERE p.id = comments.parent_id) + 1,
+                    path = (SELECT p.path FROM comments p WHERE p.id = comments.parent_id)
+                        || {segment}
+                WHERE path IS NULL
+                  AND parent_id IN (SELECT id FROM comments WHERE path IS NOT NULL)
+                """
+            )
+        )
+        if not result.rowcount:
+            break
+
+    # Ответы на отсутствующих родителей считаем корнями своих веток
+    op.execute(
+        f"""
+        UPDATE comments SET root_id = id, depth = 0, path = {segment}
+        WHERE path IS NULL
+        """
+    )
+
+    op.create_index('ix_comments_thread', 'comments', ['root_id', 'path'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_comments_thread', table_name='comments')
+    with op.batch_alter_table('comments', schema=None) as batch_op:
+        batch_op.drop_column('path')
+        batch_op.drop_column('depth')
+        batch_op.drop_column('root_id')
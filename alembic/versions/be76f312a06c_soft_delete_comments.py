@@ -0,0 +1,40 @@
+"""soft delete for comments: deleted_at and the purge queue index
+
+Revision ID: be76f312a06c
+Revises: 282cdf5c1b6c
+Create Date: 2026-10-16 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'be76f312a06c'
+down_revision = '282cdf5c1b6c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('comments', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True))
+
+    # Индексы корневых лент (parent_id IS NULL) не меняются: надгробие с живыми ответами
+    # остается в ленте как "[deleted]", надгробия без ответов отсекаются при чтении
+
+    # Очередь фоновой очистки: в индекс попадают только надгробия
+    op.create_index(
+        'ix_comments_deleted',
+        'comments',
+        ['deleted_at'],
+        postgresql_where=sa.text('deleted_at IS NOT NULL'),
+        sqlite_where=sa.text('deleted_at IS NOT NULL'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_comments_deleted', table_name='comments')
+
+    with op.batch_alter_table('comments', schema=None) as batch_op:
+        batch_op.drop_column('deleted_at')
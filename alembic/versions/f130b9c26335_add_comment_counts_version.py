@@ -0,0 +1,43 @@
+"""add version / updated_at to comment_counts for conditional GET
+
+Revision ID: f130b9c26335
+Revises: b6f502c5d77a
+Create Date: 2026-10-16 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f130b9c26335'
+down_revision = 'b6f502c5d77a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('comment_counts', schema=None) as batch_op:
+        batch_op.add_column(
+            sa.Column('version', sa.BigInteger(), nullable=False, server_default='0')
+        )
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True))
+
+    # Начальная версия — число комментариев, время — последний созданный комментарий
+    op.execute(
+        """
+        UPDATE comment_counts SET
+            version = comment_count,
+            updated_at = (
+                SELECT MAX(c.created_at) FROM comments c
+                WHERE c.entity_type = comment_counts.entity_type
+                  AND c.entity_id = comment_counts.entity_id
+            )
+        """
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('comment_counts', schema=None) as batch_op:
+        batch_op.drop_column('updated_at')
+        batch_op.drop_column('version')
@@ -0,0 +1,76 @@
+"""
+Бенчмарк зависимости аутентификации: полная проверка JWT на каждый запрос против кэша TokenVerifier.
+
+Запуск из корня репозитория:
+
+    PYTHONPATH=src python benchmarks/bench_auth.py --users 100 --iterations 20000
+
+Вызывает require_authenticated_user напрямую (без HTTP), токены пользователей чередуются по кругу.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from jose import jwt
+
+from comment_service.api.deps import require_authenticated_user
+from comment_service.core.auth import TokenVerifier
+from comment_service.core.config import Settings
+
+
+def make_tokens(settings: Settings, users: int) -> list[str]:
+    exp = int(time.time()) + 3600
+    return [
+        jwt.encode(
+            {"sub": str(user_id), "username": f"user{user_id}", "exp": exp},
+            settings.jwt_secret_key,
+            algorithm=settings.jwt_algorithm,
+        )
+        for user_id in range(1, users + 1)
+    ]
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def measure(name: str, verifier: TokenVerifier, tokens: list[str], iterations: int) -> None:
+    samples: list[float] = []
+    started_all = time.perf_counter()
+    for i in range(iterations):
+        token = tokens[i % len(tokens)]
+        started = time.perf_counter()
+        await require_authenticated_user(token, verifier)
+        samples.append((time.perf_counter() - started) * 1_000_000)
+    elapsed = time.perf_counter() - started_all
+    print(
+        f"{name:<8} calls/s={iterations / elapsed:>9.0f}  mean={statistics.mean(samples):.1f}us  "
+        f"p50={percentile(samples, 50):.1f}us  p99={percentile(samples, 99):.1f}us"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--iterations", type=int, default=20_000)
+    args = parser.parse_args()
+
+    settings = Settings()
+    tokens = make_tokens(settings, args.users)
+
+    print(f"users={args.users} iterations={args.iterations} alg={settings.jwt_algorithm}")
+    uncached = TokenVerifier(settings.jwt_secret_key, settings.jwt_algorithm, cache_size=0)
+    await measure("uncached", uncached, tokens, args.iterations)
+    cached = TokenVerifier.from_settings(settings)
+    await measure("cached", cached, tokens, args.iterations)
+    print(f"cache stats: {cached.stats()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,118 @@
+"""
+Бенчмарк обработки входящих событий EventConsumer: последовательно (CONSUMER_CONCURRENCY=1)
+против пула воркеров. Брокер заменен in-memory очередью, обработчик имитирует медленный
+каскад post_deleted через asyncio.sleep.
+
+Запуск из корня репозитория:
+
+    PYTHONPATH=src python benchmarks/bench_consumer.py --messages 500 --concurrency 8
+
+Помимо времени проверяет, что события одной сущности обработаны по порядку,
+все сообщения подтверждены, а ошибка обработчика уводит сообщение в DLQ (reject без requeue).
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import time
+from collections import defaultdict
+
+from comment_service.core.config import Settings
+from comment_service.mq.consumer import EventConsumer
+
+
+class InMemoryMessage:
+    """Замена aio_pika.IncomingMessage: body, routing_key, message_id и исход доставки"""
+
+    def __init__(self, routing_key: str, payload: dict):
+        self.routing_key = routing_key
+        self.message_id: str | None = None
+        self.body = json.dumps(payload).encode()
+        self.outcome: str | None = None
+
+    async def ack(self):
+        self.outcome = "ack"
+
+    async def nack(self, requeue: bool = True):
+        self.outcome = "requeue" if requeue else "nack"
+
+    async def reject(self, requeue: bool = False):
+        self.outcome = "requeue" if requeue else "dead_letter"
+
+
+async def iterate(messages: list[InMemoryMessage]):
+    for message in messages:
+        yield message
+
+
+def build_messages(count: int, posts: int) -> list[InMemoryMessage]:
+    messages = []
+    for seq in range(count):
+        post_id = seq % posts
+        messages.append(
+            InMemoryMessage(
+                "comments.comment_created",
+                {
+                    "event_type": "comment_created",
+                    "entity_type": "post",
+                    "entity_id": post_id,
+                    "seq": seq,
+                },
+            )
+        )
+    # Сообщение, на котором обработчик падает
+    messages.append(
+        InMemoryMessage(
+            "comments.comment_created",
+            {"event_type": "comment_created", "entity_type": "post", "entity_id": 0, "seq": -1},
+        )
+    )
+    return messages
+
+
+async def run(concurrency: int, count: int, posts: int, delay: float) -> float:
+    consumer = EventConsumer(Settings(consumer_concurrency=concurrency))
+    seen: dict[int, list[int]] = defaultdict(list)
+
+    async def handler(event: dict):
+        if event["seq"] < 0:
+            raise RuntimeError("boom")
+        await asyncio.sleep(delay)
+        seen[event["entity_id"]].append(event["seq"])
+
+    consumer.register_handler("comment_created", handler)
+    messages = build_messages(count, posts)
+
+    started = time.perf_counter()
+    await consumer.consume(iterate(messages))
+    elapsed = time.perf_counter() - started
+
+    assert all(seqs == sorted(seqs) for seqs in seen.values()), "per-entity order broken"
+    assert sum(len(seqs) for seqs in seen.values()) == count
+    assert [m.outcome for m in messages[:-1]] == ["ack"] * count
+    assert messages[-1].outcome == "dead_letter"
+    return elapsed
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--posts", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--delay-ms", type=float, default=2.0)
+    args = parser.parse_args()
+    logging.getLogger("comment_service.mq.consumer").setLevel(logging.CRITICAL)
+
+    print(f"messages={args.messages} posts={args.posts} handler_delay={args.delay_ms}ms")
+    for concurrency in (1, args.concurrency):
+        elapsed = await run(concurrency, args.messages, args.posts, args.delay_ms / 1000)
+        print(
+            f"concurrency={concurrency:<3} {elapsed:>7.2f}s {args.messages / elapsed:>8.0f} msg/s"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,142 @@
+"""
+Бенчмарк гидрации страницы комментариев: по-комментарийный путь (N+1) против пакетного.
+
+Запуск из корня репозитория:
+
+    PYTHONPATH=src python benchmarks/bench_hydration.py --page-size 5 --iterations 500
+
+Считает SQL-запросы на одну страницу и латентность p50/p99 на SQLite (in-memory).
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from comment_service.core.config import Settings
+from comment_service.repo.sql import models as m
+from comment_service.repo.sql.repositories import SQLCommentRepository
+from comment_service.services.comment_service import CommentAppService
+
+ENTITY_ID = 1
+VIEWER_ID = 1
+
+
+async def seed(session_factory, roots: int, replies: int, reactors: int) -> None:
+    rnd = random.Random(42)
+    start = datetime(2024, 1, 1)
+    async with session_factory() as session:
+        for i in range(roots):
+            root = m.CommentModel(
+                entity_id=ENTITY_ID,
+                entity_type="post",
+                author_id=rnd.randint(1, 1000),
+                author_username="user",
+                text="root comment",
+                children_count=replies,
+                created_at=start + timedelta(seconds=i),
+                updated_at=start + timedelta(seconds=i),
+            )
+            session.add(root)
+            await session.flush()
+            for j in range(replies):
+                session.add(
+                    m.CommentModel(
+                        entity_id=ENTITY_ID,
+                        entity_type="post",
+                        author_id=rnd.randint(1, 1000),
+                        author_username="user",
+                        text="reply",
+                        parent_id=root.id,
+                        created_at=start + timedelta(seconds=i, milliseconds=j + 1),
+                        updated_at=start + timedelta(seconds=i, milliseconds=j + 1),
+                    )
+                )
+            for user_id in range(1, reactors + 1):
+                session.add(
+                    m.CommentReactionModel(
+                        comment_id=root.id,
+                        user_id=user_id,
+                        reaction=rnd.choice(("like", "dislike")),
+                    )
+                )
+        await session.commit()
+
+
+async def legacy_page(service: CommentAppService, page_size: int) -> None:
+    """Прежний путь: отдельные count_children и get_user_reaction на каждый комментарий"""
+    repo = service.comment_repo
+    comments, _ = await repo.list_root_comments(ENTITY_ID, "post", limit=page_size)
+    for comment in comments:
+        await repo.count_children(comment.id)
+        await repo.get_user_reaction(comment.id, VIEWER_ID)
+
+
+async def batched_page(service: CommentAppService, page_size: int) -> None:
+    repo = service.comment_repo
+    comments, _ = await repo.list_root_comments(ENTITY_ID, "post", limit=page_size)
+    await service._build_comment_dtos(comments, VIEWER_ID)
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def measure(name, page_fn, session_factory, counter, page_size, iterations) -> None:
+    samples: list[float] = []
+    queries: list[int] = []
+    for _ in range(iterations):
+        async with session_factory() as session:
+            service = CommentAppService(SQLCommentRepository(session), Settings())
+            before = counter["n"]
+            started = time.perf_counter()
+            await page_fn(service, page_size)
+            samples.append((time.perf_counter() - started) * 1000)
+            queries.append(counter["n"] - before)
+    print(
+        f"{name:<8} queries/page={statistics.mean(queries):>5.1f}  "
+        f"p50={percentile(samples, 50):.3f}ms  p99={percentile(samples, 99):.3f}ms"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--page-size", type=int, default=5)
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--roots", type=int, default=200)
+    parser.add_argument("--replies", type=int, default=20)
+    parser.add_argument("--reactors", type=int, default=20)
+    args = parser.parse_args()
+
+    engine = create_async_engine("sqlite+aiosqlite://")
+    counter = {"n": 0}
+
+    def count_query(*_):
+        counter["n"] += 1
+
+    event.listen(engine.sync_engine, "before_cursor_execute", count_query)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(m.Base.metadata.create_all)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    await seed(session_factory, args.roots, args.replies, args.reactors)
+
+    print(f"page_size={args.page_size} iterations={args.iterations}")
+    await measure("legacy", legacy_page, session_factory, counter, args.page_size, args.iterations)
+    await measure(
+        "batched", batched_page, session_factory, counter, args.page_size, args.iterations
+    )
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,124 @@
+"""
+Бенчмарк сериализации страницы из 50 комментариев: response_model FastAPI против
+готовых байтов через model_dump_json / orjson (настройка RESPONSE_JSON_BACKEND).
+
+Запуск из корня репозитория:
+
+    PYTHONPATH=src python benchmarks/bench_json.py --requests 2000
+
+Считает requests/sec для GET /api/v1/post/comments/{id}?limit=50 через ASGI-транспорт httpx
+(SQLite in-memory, без сети) и отдельно время сериализации одной страницы.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+
+import httpx
+from pydantic import TypeAdapter
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from comment_service.api.app import create_app
+from comment_service.api.responses import JSONRenderer, orjson
+from comment_service.core.config import Settings
+from comment_service.dtos.http import CommentListResponse
+from comment_service.repo.sql import models as m
+from comment_service.repo.sql.repositories import SQLCommentRepository
+from comment_service.services.comment_service import CommentAppService
+
+ENTITY_ID = 1
+PAGE_SIZE = 50
+
+_RESPONSE_ADAPTER = TypeAdapter(CommentListResponse)
+
+
+async def seed(session_factory) -> None:
+    start = datetime(2024, 1, 1)
+    async with session_factory() as session:
+        for i in range(PAGE_SIZE):
+            session.add(
+                m.CommentModel(
+                    entity_id=ENTITY_ID,
+                    entity_type="post",
+                    author_id=i + 1,
+                    author_username=f"user{i + 1}",
+                    author_avatar=f"https://cdn.example.com/avatars/{i + 1}.png",
+                    text="Комментарий средней длины, как в обычной ленте. " * 3,
+                    rating=i % 7,
+                    children_count=i % 4,
+                    created_at=start + timedelta(seconds=i),
+                    updated_at=start + timedelta(seconds=i),
+                )
+            )
+        await session.commit()
+
+
+async def measure_http(backend: str, session_factory, requests: int) -> float:
+    app = create_app(Settings(response_json_backend=backend, log_level="WARNING"))
+    app.state.session_factory = session_factory
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        url = f"/api/v1/post/comments/{ENTITY_ID}?limit={PAGE_SIZE}"
+        response = await client.get(url)
+        assert len(response.json()["items"]) == PAGE_SIZE
+        started = time.perf_counter()
+        for _ in range(requests):
+            await client.get(url)
+        elapsed = time.perf_counter() - started
+    return requests / elapsed
+
+
+def default_dumps(page: CommentListResponse) -> bytes:
+    """Что делает FastAPI с response_model: dump в dict, повторная валидация, dump_json"""
+    validated = _RESPONSE_ADAPTER.validate_python(page.model_dump(by_alias=True))
+    return _RESPONSE_ADAPTER.dump_json(validated, by_alias=True)
+
+
+async def measure_dumps(backend: str, session_factory, iterations: int) -> None:
+    async with session_factory() as session:
+        service = CommentAppService(SQLCommentRepository(session), Settings())
+        page = await service.list_comments(ENTITY_ID, "post", limit=PAGE_SIZE)
+    dumps = default_dumps if backend == "default" else JSONRenderer(backend).dumps
+    started = time.perf_counter()
+    for _ in range(iterations):
+        dumps(page)
+    elapsed = time.perf_counter() - started
+    print(f"{backend:<8} serialize page={elapsed / iterations * 1_000_000:>8.1f}us")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--iterations", type=int, default=5000)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(m.Base.metadata.create_all)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    await seed(session_factory)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    backends = ["default", "pydantic"] + (["orjson"] if orjson is not None else [])
+    print(f"page_size={PAGE_SIZE} requests={args.requests} rounds={args.rounds}")
+    # Раунды чередуют бэкенды, чтобы прогрев и фоновые колебания не доставались одному из них
+    best = dict.fromkeys(backends, 0.0)
+    for _ in range(args.rounds):
+        for backend in backends:
+            best[backend] = max(
+                best[backend], await measure_http(backend, session_factory, args.requests)
+            )
+    for backend in backends:
+        print(f"{backend:<8} http req/s={best[backend]:>8.0f} (best of {args.rounds})")
+    for backend in backends:
+        await measure_dumps(backend, session_factory, args.iterations)
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
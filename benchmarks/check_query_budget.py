@@ -0,0 +1,100 @@
+"""
+Проверка числа SQL-запросов основных эндпоинтов: фиксирует отсутствие N+1 на ровном месте.
+Каждый сценарий выполняется через ASGI-транспорт httpx на SQLite в памяти внутри
+assert_max_queries; превышение бюджета завершает скрипт с ненулевым кодом и списком запросов.
+
+Запуск из корня репозитория:
+
+    PYTHONPATH=src python benchmarks/check_query_budget.py
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import sys
+
+import httpx
+from jose import jwt
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from comment_service.api.app import create_app
+from comment_service.core.config import Settings
+from comment_service.core.metrics import instrument_engine
+from comment_service.core.query_budget import assert_max_queries
+from comment_service.repo.sql import models as m
+
+ENTITY_ID = 1
+ROOTS = 20
+REPLIES = 3
+
+# (метод, путь, авторизован, бюджет запросов). Бюджет не зависит от размера страницы
+BUDGETS = [
+    ("GET", f"/api/v1/post/comments/{ENTITY_ID}?limit=20", False, 2),
+    ("GET", f"/api/v1/post/comments/{ENTITY_ID}?limit=20", True, 3),
+    ("GET", f"/api/v1/post/comments/{ENTITY_ID}/tree?limit=20&replies=3", True, 4),
+    ("GET", "/api/v1/post/comments/{root}/children", True, 2),
+    ("GET", "/api/v1/post/comments/{root}/thread", True, 3),
+    ("POST", f"/api/v1/post/{ENTITY_ID}/comments", True, 7),
+    ("POST", "/api/v1/post/comments/{root}/like", True, 5),
+]
+
+
+def auth(user_id: int) -> dict[str, str]:
+    token = jwt.encode(
+        {"sub": str(user_id), "username": f"user{user_id}"},
+        Settings().jwt_secret_key,
+        algorithm="HS256",
+    )
+    return {"Authorization": f"Bearer {token}"}
+
+
+async def seed(client: httpx.AsyncClient) -> int:
+    root = 0
+    for i in range(ROOTS):
+        response = await client.post(
+            f"/api/v1/post/{ENTITY_ID}/comments", json={"text": f"root {i}"}, headers=auth(1)
+        )
+        root = root or response.json()["comment"]["id"]
+    for i in range(REPLIES):
+        await client.post(
+            f"/api/v1/post/comments/{root}/replies", json={"text": f"reply {i}"}, headers=auth(2)
+        )
+    return root
+
+
+async def main() -> int:
+    engine = create_async_engine("sqlite+aiosqlite://")
+    instrument_engine(engine.sync_engine)
+    async with engine.begin() as conn:
+        await conn.run_sync(m.Base.metadata.create_all)
+
+    app = create_app(Settings(log_level="WARNING", query_budget_max_queries=0))
+    app.state.session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    failed = 0
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://check") as client:
+        root = await seed(client)
+        for method, path, authorized, budget in BUDGETS:
+            url = path.format(root=root)
+            headers = auth(3) if authorized else {}
+            kwargs = {"json": {"text": "budget"}} if method == "POST" else {}
+            try:
+                with assert_max_queries(budget) as stats:
+                    response = await client.request(method, url, headers=headers, **kwargs)
+                assert response.status_code == 200, response.text
+                status = "ok"
+            except AssertionError as e:
+                failed += 1
+                status = f"FAIL\n{e}"
+            user = "user" if authorized else "anon"
+            print(f"{method:<5} {url:<55} {user:<5} {stats.count:>2}/{budget:<2} {status}")
+
+    await engine.dispose()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
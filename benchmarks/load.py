@@ -0,0 +1,407 @@
+"""
+Нагрузочный прогон API по базе из benchmarks/seed.py.
+
+Приложение работает в том же процессе, запросы идут через ASGI-транспорт httpx
+(без сети и uvicorn), поэтому цифры отражают стоимость кода сервиса и SQL.
+База копируется во временный файл: записи прогона не портят исходные данные.
+Для каждого сценария — прогрев, затем --requests запросов в --concurrency потоков;
+результат — rps и перцентили латентности.
+
+    PYTHONPATH=src python benchmarks/load.py --db benchmarks/data/bench.db --save baseline.json
+    PYTHONPATH=src python benchmarks/load.py --db benchmarks/data/bench.db --compare baseline.json
+
+В режиме --compare скрипт завершается с кодом 1, если rps какого-либо сценария упал
+или p95 вырос больше чем на --tolerance (по умолчанию 15%), либо появились ошибки.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Optional
+
+import httpx
+from jose import jwt
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from comment_service.api.app import create_app
+from comment_service.core.config import Settings
+from comment_service.core.metrics import instrument_engine
+from comment_service.services.reaction_buffer import ReactionBuffer
+
+USERS = 1_000
+
+
+@dataclass
+class Dataset:
+    """Выборки id из засеянной базы, из которых сценарии строят запросы"""
+
+    entities: list[tuple[str, int]]
+    entity_weights: list[int]
+    parents: list[tuple[str, int]]
+    deep: list[tuple[str, int]]
+    comments: list[tuple[str, int]]
+
+    @classmethod
+    def load(cls, path: str) -> Dataset:
+        conn = sqlite3.connect(path)
+        try:
+            counts = conn.execute(
+                "SELECT entity_type, entity_id, comment_count FROM comment_counts"
+                " ORDER BY entity_type, entity_id"
+            ).fetchall()
+            parents = conn.execute(
+                "SELECT entity_type, id FROM comments"
+                " WHERE parent_id IS NULL AND children_count > 0 ORDER BY id LIMIT 5000"
+            ).fetchall()
+            deep = conn.execute(
+                "SELECT entity_type, id FROM comments WHERE depth >= 5 ORDER BY id LIMIT 5000"
+            ).fetchall()
+            comments = conn.execute(
+                "SELECT entity_type, id FROM comments ORDER BY id LIMIT 20000"
+            ).fetchall()
+        finally:
+            conn.close()
+        return cls(
+            entities=[(t, i) for t, i, _ in counts],
+            entity_weights=[c for _, _, c in counts],
+            parents=parents,
+            deep=deep or parents,
+            comments=comments,
+        )
+
+
+@dataclass
+class Request:
+    method: str
+    url: str
+    user_id: Optional[int] = None
+    json: Optional[dict[str, Any]] = None
+
+
+def _entity(rnd: random.Random, data: Dataset) -> tuple[str, int]:
+    # Популярные сущности запрашиваются чаще — пропорционально числу комментариев
+    return rnd.choices(data.entities, weights=data.entity_weights)[0]
+
+
+def _user(rnd: random.Random) -> int:
+    return rnd.randint(1, USERS)
+
+
+def list_anon(rnd: random.Random, data: Dataset) -> Request:
+    entity_type, entity_id = _entity(rnd, data)
+    return Request("GET", f"/api/v1/{entity_type}/comments/{entity_id}?limit=20")
+
+
+def list_user(rnd: random.Random, data: Dataset) -> Request:
+    entity_type, entity_id = _entity(rnd, data)
+    url = f"/api/v1/{entity_type}/comments/{entity_id}?limit=20"
+    return Request("GET", url, user_id=_user(rnd))
+
+
+def list_top(rnd: random.Random, data: Dataset) -> Request:
+    entity_type, entity_id = _entity(rnd, data)
+    return Request("GET", f"/api/v1/{entity_type}/comments/{entity_id}?limit=20&sort=top")
+
+
+def tree(rnd: random.Random, data: Dataset) -> Request:
+    entity_type, entity_id = _entity(rnd, data)
+    url = f"/api/v1/{entity_type}/comments/{entity_id}/tree?limit=20&replies=3"
+    return Request("GET", url, user_id=_user(rnd))
+
+
+def children(rnd: random.Random, data: Dataset) -> Request:
+    entity_type, comment_id = rnd.choice(data.parents)
+    return Request("GET", f"/api/v1/{entity_type}/comments/{comment_id}/children?limit=20")
+
+
+def thread(rnd: random.Random, data: Dataset) -> Request:
+    entity_type, comment_id = rnd.choice(data.deep)
+    return Request("GET", f"/api/v1/{entity_type}/comments/{comment_id}/thread")
+
+
+def create(rnd: random.Random, data: Dataset) -> Request:
+    entity_type, entity_id = _entity(rnd, data)
+    return Request(
+        "POST",
+        f"/api/v1/{entity_type}/{entity_id}/comments",
+        user_id=_user(rnd),
+        json={"text": f"load test {rnd.random()}"},
+    )
+
+
+def reply(rnd: random.Random, data: Dataset) -> Request:
+    entity_type, comment_id = rnd.choice(data.parents)
+    return Request(
+        "POST",
+        f"/api/v1/{entity_type}/comments/{comment_id}/replies",
+        user_id=_user(rnd),
+        json={"text": f"load test reply {rnd.random()}"},
+    )
+
+
+def like(rnd: random.Random, data: Dataset) -> Request:
+    entity_type, comment_id = rnd.choice(data.comments)
+    reaction = "like" if rnd.random() < 0.8 else "dislike"
+    url = f"/api/v1/{entity_type}/comments/{comment_id}/{reaction}"
+    return Request("POST", url, user_id=_user(rnd))
+
+
+# Чтения идут первыми, чтобы записи прогона не влияли на их данные
+SCENARIOS: dict[str, Callable[[random.Random, Dataset], Request]] = {
+    "list_anon": list_anon,
+    "list_user": list_user,
+    "list_top": list_top,
+    "tree": tree,
+    "children": children,
+    "thread": thread,
+    "create": create,
+    "reply": reply,
+    "like": like,
+}
+
+
+@dataclass
+class Result:
+    requests: int
+    errors: int
+    seconds: float
+    rps: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+    statuses: dict[str, int] = field(default_factory=dict)
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    """Перцентиль по ближайшему рангу"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, round(q / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def auth_headers(settings: Settings) -> dict[int, dict[str, str]]:
+    """Токены готовятся заранее: подпись JWT — работа клиента, а не сервиса"""
+    headers = {}
+    for user_id in range(1, USERS + 1):
+        token = jwt.encode(
+            {"sub": str(user_id), "username": f"user{user_id}"},
+            settings.jwt_secret_key,
+            algorithm=settings.jwt_algorithm,
+        )
+        headers[user_id] = {"Authorization": f"Bearer {token}"}
+    return headers
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    scenario: Callable[[random.Random, Dataset], Request],
+    data: Dataset,
+    headers: dict[int, dict[str, str]],
+    seed: int,
+    requests: int,
+    concurrency: int,
+) -> Result:
+    rnd = random.Random(seed)
+    planned = [scenario(rnd, data) for _ in range(requests)]
+    latencies: list[float] = []
+    statuses: dict[str, int] = {}
+    position = 0
+
+    async def worker() -> None:
+        nonlocal position
+        while position < len(planned):
+            request = planned[position]
+            position += 1
+            user_headers = headers[request.user_id] if request.user_id is not None else {}
+            started = time.perf_counter()
+            try:
+                response = await client.request(
+                    request.method, request.url, headers=user_headers, json=request.json
+                )
+                status = str(response.status_code)
+            except Exception as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - started)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    errors = sum(count for status, count in statuses.items() if not status.startswith("2"))
+    return Result(
+        requests=len(latencies),
+        errors=errors,
+        seconds=round(elapsed, 3),
+        rps=round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        p50_ms=round(percentile(latencies, 50) * 1000, 2),
+        p95_ms=round(percentile(latencies, 95) * 1000, 2),
+        p99_ms=round(percentile(latencies, 99) * 1000, 2),
+        max_ms=round(latencies[-1] * 1000, 2) if latencies else 0.0,
+        statuses=statuses,
+    )
+
+
+def compare(baseline: dict[str, Any], current: dict[str, Any], tolerance: float) -> int:
+    """Сравнение с базовой линией; возвращает число регрессий"""
+    regressions = 0
+    print(f"\n{'scenario':<10} {'rps':>18} {'p95 ms':>20}  verdict")
+    for name, result in current["endpoints"].items():
+        base = baseline["endpoints"].get(name)
+        if base is None:
+            print(f"{name:<10} {'(no baseline)':>18}")
+            continue
+        rps_delta = result["rps"] / base["rps"] - 1 if base["rps"] else 0.0
+        p95_delta = result["p95_ms"] / base["p95_ms"] - 1 if base["p95_ms"] else 0.0
+        problems = []
+        if rps_delta < -tolerance:
+            problems.append("rps")
+        if p95_delta > tolerance:
+            problems.append("p95")
+        if result["errors"] > base["errors"]:
+            problems.append("errors")
+        regressions += bool(problems)
+        verdict = "REGRESSION: " + ", ".join(problems) if problems else "ok"
+        print(
+            f"{name:<10} {base['rps']:>8.1f}→{result['rps']:<8.1f} {rps_delta:+6.1%}"
+            f" {base['p95_ms']:>7.2f}→{result['p95_ms']:<7.2f} {p95_delta:+6.1%}  {verdict}"
+        )
+    return regressions
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+async def main(args: argparse.Namespace) -> int:
+    names = args.only.split(",") if args.only else list(SCENARIOS)
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        print(f"unknown scenarios: {', '.join(unknown)}", file=sys.stderr)
+        return 2
+
+    data = Dataset.load(args.db)
+    workdir = tempfile.mkdtemp(prefix="comments-load-")
+    db_path = os.path.join(workdir, "load.db")
+    shutil.copyfile(args.db, db_path)
+
+    settings = Settings(
+        log_level="WARNING",
+        query_budget_max_queries=0,
+        query_budget_max_db_ms=0,
+        page_cache_enabled=args.page_cache,
+        reaction_buffer_enabled=args.reaction_buffer,
+    )
+    engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}", connect_args={"timeout": 30})
+    instrument_engine(engine.sync_engine)
+    app = create_app(settings)
+    app.state.session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    # Lifespan через ASGI-транспорт не запускается: буфер реакций создается здесь
+    reaction_buffer = None
+    if args.reaction_buffer:
+        reaction_buffer = ReactionBuffer(app.state.session_factory, settings)
+        reaction_buffer.start()
+    app.state.reaction_buffer = reaction_buffer
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    headers = auth_headers(settings)
+
+    report: dict[str, Any] = {
+        "meta": {
+            "db": os.path.basename(args.db),
+            "comments": sum(data.entity_weights),
+            "entities": len(data.entities),
+            "requests": args.requests,
+            "warmup": args.warmup,
+            "concurrency": args.concurrency,
+            "seed": args.seed,
+            "page_cache": args.page_cache,
+            "reaction_buffer": args.reaction_buffer,
+            "revision": git_revision(),
+            "python": platform.python_version(),
+        },
+        "endpoints": {},
+    }
+
+    print(f"{'scenario':<10} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}  errors")
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://load") as client:
+            for index, name in enumerate(names):
+                scenario = SCENARIOS[name]
+                seed = args.seed + index
+                if args.warmup:
+                    await run_scenario(
+                        client, scenario, data, headers, -seed, args.warmup, args.concurrency
+                    )
+                result = await run_scenario(
+                    client, scenario, data, headers, seed, args.requests, args.concurrency
+                )
+                report["endpoints"][name] = asdict(result)
+                print(
+                    f"{name:<10} {result.rps:>8.1f} {result.p50_ms:>8.2f} {result.p95_ms:>8.2f}"
+                    f" {result.p99_ms:>8.2f} {result.max_ms:>8.2f}  {result.errors}"
+                )
+    finally:
+        if reaction_buffer is not None:
+            await reaction_buffer.close()
+        await engine.dispose()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\nbaseline saved to {args.save}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline["meta"].get("concurrency") != args.concurrency:
+            print("warning: baseline was recorded with a different concurrency", file=sys.stderr)
+        regressions = compare(baseline, report, args.tolerance)
+        if regressions:
+            print(f"\n{regressions} scenario(s) regressed beyond {args.tolerance:.0%}")
+            return 1
+    return 0
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--db", default="benchmarks/data/bench.db")
+    parser.add_argument("--requests", type=int, default=500, help="requests per scenario")
+    parser.add_argument("--warmup", type=int, default=50, help="warmup requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--only", help="comma-separated scenarios: " + ",".join(SCENARIOS))
+    parser.add_argument("--page-cache", action="store_true", help="enable the page cache")
+    parser.add_argument(
+        "--reaction-buffer", action="store_true", help="enable write-behind reactions"
+    )
+    parser.add_argument("--save", help="write results as a JSON baseline")
+    parser.add_argument("--compare", help="compare with a JSON baseline, exit 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parse_args())))
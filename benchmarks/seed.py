@@ -0,0 +1,224 @@
+"""
+Генерация воспроизводимой SQLite-базы для нагрузочных тестов (benchmarks/load.py).
+
+Данные похожи на боевые: размер лент сущностей распределен по степенному закону
+(несколько «горячих» постов и длинный хвост), часть ответов продолжает последнюю ветку,
+поэтому встречаются глубокие цепочки, а реакции распределены неравномерно по комментариям.
+Денормализованные поля (path, depth, children_count, comment_counts, likes/dislikes/rating)
+заполняются сразу, как их поддерживает сервис.
+
+    PYTHONPATH=src python benchmarks/seed.py --scale medium --output benchmarks/data/bench.db
+
+Одинаковые --seed и --scale дают одинаковую базу.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sqlite3
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+
+from comment_service.repo.sql import models as m
+
+
+@dataclass(frozen=True)
+class Scale:
+    entities: int
+    comments: int
+    reactions: int
+    users: int
+
+
+SCALES = {
+    "small": Scale(entities=200, comments=10_000, reactions=50_000, users=5_000),
+    "medium": Scale(entities=2_000, comments=100_000, reactions=1_000_000, users=50_000),
+    "large": Scale(entities=5_000, comments=500_000, reactions=5_000_000, users=200_000),
+}
+
+# Доля ответов среди комментариев и доля ответов, продолжающих последнюю ветку (глубина)
+REPLY_RATIO = 0.6
+CHAIN_RATIO = 0.35
+LIKE_RATIO = 0.8
+BATCH = 50_000
+# Формат, в котором SQLAlchemy хранит DateTime в SQLite (UTC без смещения)
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+
+WORDS = (
+    "игра пост сюжет графика отлично согласен спорно патч баланс сервер обновление "
+    "персонаж уровень босс финал музыка атмосфера механика автор статья спасибо вопрос "
+    "ответ мнение интересно скучно долго быстро лучше хуже снова впервые"
+).split()
+
+
+def entity_sizes(rnd: random.Random, scale: Scale) -> list[int]:
+    """Число комментариев на сущность: Парето с суммой ровно scale.comments"""
+    weights = [rnd.paretovariate(1.2) for _ in range(scale.entities)]
+    total = sum(weights)
+    sizes = [max(1, int(scale.comments * w / total)) for w in weights]
+    # Остаток (или излишек) округления — самой крупной сущности
+    sizes[sizes.index(max(sizes))] += scale.comments - sum(sizes)
+    return sizes
+
+
+def text(rnd: random.Random) -> str:
+    return " ".join(rnd.choices(WORDS, k=rnd.randint(3, 60))).capitalize()
+
+
+def generate_comments(rnd: random.Random, scale: Scale):
+    """Строки comments и comment_counts; id назначаются по порядку, как в автоинкременте"""
+    start = datetime(2025, 1, 1)
+    comment_id = 0
+    rows: list[tuple] = []
+    counts: list[tuple] = []
+    for index, size in enumerate(entity_sizes(rnd, scale)):
+        entity_type = "post" if index % 4 else "game"
+        entity_id = index + 1
+        created = start + timedelta(minutes=index)
+        # Для каждого комментария сущности: id, root_id, depth, path, номер строки в rows
+        thread: list[tuple[int, int, int, str, int]] = []
+        for _ in range(size):
+            comment_id += 1
+            created += timedelta(seconds=rnd.randint(1, 600))
+            parent = None
+            if thread and rnd.random() < REPLY_RATIO:
+                parent = thread[-1] if rnd.random() < CHAIN_RATIO else rnd.choice(thread)
+            if parent is None:
+                root_id, depth, path, parent_id = comment_id, 0, m.path_segment(comment_id), None
+            else:
+                parent_id = parent[0]
+                root_id, depth = parent[1], parent[2] + 1
+                path = parent[3] + m.path_segment(comment_id)
+                parent_row = rows[parent[4]]
+                parent_row[13] += 1  # children_count
+            author = rnd.randint(1, scale.users)
+            rows.append(
+                [
+                    comment_id,
+                    entity_id,
+                    entity_type,
+                    author,
+                    f"user{author}",
+                    f"https://cdn.example.com/avatars/{author}.png",
+                    text(rnd),
+                    parent_id,
+                    root_id,
+                    depth,
+                    path,
+                    0,  # likes_count
+                    0,  # dislikes_count
+                    0,  # children_count
+                    created.strftime(DATETIME_FORMAT),
+                ]
+            )
+            thread.append((comment_id, root_id, depth, path, len(rows) - 1))
+        counts.append((entity_type, entity_id, size, size, created.strftime(DATETIME_FORMAT)))
+    return rows, counts
+
+
+def generate_reactions(rnd: random.Random, scale: Scale, rows: list[list]):
+    """Реакции: число на комментарий — по степенному закону, пользователи без повторов"""
+    weights = [rnd.paretovariate(1.1) for _ in rows]
+    total = sum(weights)
+    for row, weight in zip(rows, weights):
+        k = min(scale.users, int(scale.reactions * weight / total))
+        if not k:
+            continue
+        for user_id in rnd.sample(range(1, scale.users + 1), k):
+            if rnd.random() < LIKE_RATIO:
+                row[11] += 1
+                yield (row[0], user_id, "like")
+            else:
+                row[12] += 1
+                yield (row[0], user_id, "dislike")
+
+
+def comment_params(row: list) -> tuple:
+    likes, dislikes = row[11], row[12]
+    return (
+        *row[:11],
+        likes - dislikes,
+        likes,
+        dislikes,
+        row[13],
+        likes >= dislikes,
+        row[14],
+        row[14],
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--scale", choices=sorted(SCALES), default="medium")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="benchmarks/data/bench.db")
+    args = parser.parse_args()
+
+    scale = SCALES[args.scale]
+    rnd = random.Random(args.seed)
+    started = time.perf_counter()
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    if os.path.exists(args.output):
+        os.remove(args.output)
+    engine = create_engine(f"sqlite:///{args.output}")
+    m.Base.metadata.create_all(engine)
+    engine.dispose()
+
+    rows, counts = generate_comments(rnd, scale)
+    conn = sqlite3.connect(args.output)
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+
+    reactions = 0
+    batch: list[tuple] = []
+    for reaction in generate_reactions(rnd, scale, rows):
+        batch.append(reaction)
+        if len(batch) >= BATCH:
+            conn.executemany(
+                "INSERT INTO comment_reactions (comment_id, user_id, reaction) VALUES (?, ?, ?)",
+                batch,
+            )
+            reactions += len(batch)
+            batch.clear()
+    if batch:
+        conn.executemany(
+            "INSERT INTO comment_reactions (comment_id, user_id, reaction) VALUES (?, ?, ?)",
+            batch,
+        )
+        reactions += len(batch)
+
+    conn.executemany(
+        """
+        INSERT INTO comments (
+            id, entity_id, entity_type, author_id, author_username, author_avatar, text,
+            parent_id, root_id, depth, path, rating, likes_count, dislikes_count,
+            children_count, is_positive, created_at, updated_at
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        (comment_params(row) for row in rows),
+    )
+    conn.executemany(
+        "INSERT INTO comment_counts (entity_type, entity_id, comment_count, version, updated_at)"
+        " VALUES (?, ?, ?, ?, ?)",
+        counts,
+    )
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+
+    deepest = max(row[9] for row in rows)
+    print(
+        f"scale={args.scale} seed={args.seed} entities={scale.entities} comments={len(rows)} "
+        f"reactions={reactions} max_depth={deepest} largest_entity={max(c[2] for c in counts)} "
+        f"in {time.perf_counter() - started:.1f}s -> {args.output}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,27 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from starlette.middleware.gzip import GZipMiddleware
 
 from comment_service.api.lifespan import build_lifespan
+from comment_service.api.metrics import MetricsMiddleware, QueryBudgetMiddleware, metrics_router
+from comment_service.api.request_id import RequestIdMiddleware
+from comment_service.api.responses import resolve_json_backend
 from comment_service.api.v1.routers import api_v1
+from comment_service.core.auth import TokenVerifier
 from comment_service.core.config import Settings, load_settings
 from comment_service.core.logging import init_logging
+from comment_service.domain.services import InvalidCursorError
+
+
+async def invalid_cursor_handler(request: Request, exc: InvalidCursorError) -> JSONResponse:
+    return JSONResponse(status_code=400, content={"detail": "Invalid cursor"})
 
 
 def create_app(settings: Settings | None = None) -> FastAPI:
     settings = settings or load_settings()
-    init_logging(settings.log_level)
+    log_format = settings.log_format or ("rich" if settings.env == "dev" else "json")
+    init_logging(settings.log_level, log_format, settings.log_debug_sample_rate)
 
     app = FastAPI(
         title=settings.app_name,
@@ -29,6 +40,27 @@ def create_app(settings: Settings | None = None) -> FastAPI:
         allow_headers=["*"],
     )
 
+    server_timing = settings.server_timing
+    if server_timing is None:
+        server_timing = settings.env == "dev"
+    app.add_middleware(
+        QueryBudgetMiddleware,
+        max_queries=settings.query_budget_max_queries,
+        max_db_ms=settings.query_budget_max_db_ms,
+        server_timing=server_timing,
+    )
+
+    if settings.metrics_enabled:
+        # Последним добавленный middleware — внешний: время включает CORS и сжатие
+        app.add_middleware(MetricsMiddleware)
+        app.include_router(metrics_router)
+
+    # Самый внешний: id запроса виден во всех записях лога, включая бюджет SQL
+    app.add_middleware(RequestIdMiddleware)
+
     app.include_router(api_v1, prefix="/api")
+    app.add_exception_handler(InvalidCursorError, invalid_cursor_handler)
     app.state.settings = settings
+    app.state.token_verifier = TokenVerifier.from_settings(settings)
+    app.state.json_backend = resolve_json_backend(settings.response_json_backend)
     return app
@@ -2,16 +2,19 @@ from __future__ import annotations
 
 from typing import Annotated, AsyncIterator
 
-from fastapi import Depends, HTTPException, Request, status
+from fastapi import Depends, HTTPException, Request, Response, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from jose import JWTError, jwt
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
+from comment_service.api.responses import JSONRenderer
+from comment_service.core.auth import InvalidTokenError, TokenVerifier
+from comment_service.core.cache import PageCache
 from comment_service.core.config import Settings
-from comment_service.core.db import get_session_factory
+from comment_service.core.db import ReadRouter, get_session_factory
 from comment_service.repo.sql.repositories import SQLCommentRepository
 from comment_service.services.comment_service import CommentAppService
-from comment_service.mq.publisher import EventPublisher
+from comment_service.services.reaction_buffer import ReactionBuffer
 
 
 bearer_scheme = HTTPBearer(auto_error=False)
@@ -42,32 +45,60 @@ def get_comment_repository(
     return SQLCommentRepository(session)
 
 
-def get_event_publisher(request: Request) -> EventPublisher | None:
-    """Получить event publisher из app state"""
-    return getattr(request.app.state, "event_publisher", None)
+def get_page_cache(request: Request) -> PageCache | None:
+    """Получить кэш страниц из app state (None, если кэш выключен)"""
+    return getattr(request.app.state, "page_cache", None)
+
+
+def get_reaction_buffer(request: Request) -> ReactionBuffer | None:
+    """Буфер реакций из app state (None, если write-behind выключен)"""
+    return getattr(request.app.state, "reaction_buffer", None)
+
+
+def get_replica_router(request: Request) -> ReadRouter | None:
+    """Получить маршрутизатор реплик из app state (None, если реплики не настроены)"""
+    return getattr(request.app.state, "read_router", None)
 
 
 def get_comment_service(
     comment_repo: Annotated[SQLCommentRepository, Depends(get_comment_repository)],
     settings: Annotated[Settings, Depends(get_settings)],
-    event_publisher: Annotated[EventPublisher | None, Depends(get_event_publisher)] = None,
+    page_cache: Annotated[PageCache | None, Depends(get_page_cache)] = None,
+    reaction_buffer: Annotated[ReactionBuffer | None, Depends(get_reaction_buffer)] = None,
 ) -> CommentAppService:
     return CommentAppService(
         comment_repo=comment_repo,
         settings=settings,
-        event_publisher=event_publisher,
+        page_cache=page_cache,
+        reaction_buffer=reaction_buffer,
     )
 
 
+def get_json_renderer(request: Request, response: Response) -> JSONRenderer:
+    backend = getattr(request.app.state, "json_backend", "default")
+    return JSONRenderer(backend, response)
+
+
+JSONRendererDep = Annotated[JSONRenderer, Depends(get_json_renderer)]
+
+
 async def get_current_token(
     creds: Annotated[HTTPAuthorizationCredentials | None, Depends(bearer_scheme)],
 ) -> str:
     return "" if creds is None else creds.credentials
 
 
+def get_token_verifier(request: Request) -> TokenVerifier:
+    verifier = getattr(request.app.state, "token_verifier", None)
+    if verifier is None:
+        verifier = TokenVerifier.from_settings(request.app.state.settings)
+        request.app.state.token_verifier = verifier
+    return verifier
+
+
 async def require_authenticated_user(
     token: Annotated[str, Depends(get_current_token)],
-    settings: Annotated[Settings, Depends(get_settings)],
+    verifier: Annotated[TokenVerifier, Depends(get_token_verifier)],
 ) -> dict:
     """Проверка аутентификации пользователя"""
     if not token:
@@ -78,28 +109,11 @@ async def require_authenticated_user(
         )
 
     try:
-        payload = jwt.decode(
-            token,
-            settings.jwt_secret_key,
-            algorithms=[settings.jwt_algorithm],
-        )
-        user_id = payload.get("sub")
-        if not user_id:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid token payload",
-            )
-        username = payload.get("username") or payload.get("name", "")
-        return {
-            "user_id": int(user_id),
-            "email": payload.get("email"),
-            "username": username,
-            "avatar": payload.get("avatar"),
-        }
-    except JWTError:
+        return verifier.verify(token)
+    except InvalidTokenError as e:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid or expired token",
+            detail=e.detail,
             headers={"WWW-Authenticate": "Bearer"},
         )
 
@@ -109,30 +123,78 @@ CurrentUserDep = Annotated[dict, Depends(require_authenticated_user)]
 
 async def get_optional_user(
     token: Annotated[str, Depends(get_current_token)],
-    settings: Annotated[Settings, Depends(get_settings)],
+    verifier: Annotated[TokenVerifier, Depends(get_token_verifier)],
 ) -> dict | None:
     """Опциональная проверка аутентификации пользователя (для GET эндпоинтов)"""
     if not token:
         return None
 
     try:
-        payload = jwt.decode(
-            token,
-            settings.jwt_secret_key,
-            algorithms=[settings.jwt_algorithm],
-        )
-        user_id = payload.get("sub")
-        if not user_id:
-            return None
-        username = payload.get("username") or payload.get("name", "")
-        return {
-            "user_id": int(user_id),
-            "email": payload.get("email"),
-            "username": username,
-            "avatar": payload.get("avatar"),
-        }
-    except JWTError:
+        return verifier.verify(token)
+    except InvalidTokenError:
         return None
 
 
 OptionalUserDep = Annotated[dict | None, Depends(get_optional_user)]
+
+
+async def get_read_session(
+    request: Request,
+    user: OptionalUserDep,
+    read_router: Annotated[ReadRouter | None, Depends(get_replica_router)],
+) -> AsyncIterator[AsyncSession]:
+    """
+    Сессия для чтения: реплика по round-robin, если реплики настроены и пользователь
+    не писал недавно; при недоступной реплике или без реплик — primary.
+    """
+    user_id = user.get("user_id") if user else None
+    if read_router is not None and not read_router.is_pinned(user_id):
+        for _ in range(len(read_router.replicas)):
+            replica = read_router.choose()
+            if replica is None:
+                break
+            session = replica.session_factory()
+            try:
+                # Соединение берется сразу, чтобы недоступная реплика не превращалась в 500
+                await session.connection()
+            except (DBAPIError, OSError):
+                await session.close()
+                read_router.mark_unhealthy(replica)
+                continue
+            # Страницы с реплики не кэшируются, пока она может отставать (см. CommentAppService)
+            session.info["replica"] = True
+            async with session:
+                yield session
+            return
+
+    async with _get_session_factory(request)() as session:
+        yield session
+
+
+def get_read_comment_service(
+    session: Annotated[AsyncSession, Depends(get_read_session)],
+    settings: Annotated[Settings, Depends(get_settings)],
+    read_router: Annotated[ReadRouter | None, Depends(get_replica_router)],
+    page_cache: Annotated[PageCache | None, Depends(get_page_cache)] = None,
+    reaction_buffer: Annotated[ReactionBuffer | None, Depends(get_reaction_buffer)] = None,
+) -> CommentAppService:
+    """Сервис для GET-эндпоинтов: читает через get_read_session"""
+    stale_reads = None
+    if read_router is not None and session.info.get("replica"):
+        stale_reads = read_router.has_recent_writes
+    return CommentAppService(
+        comment_repo=SQLCommentRepository(session),
+        settings=settings,
+        page_cache=page_cache,
+        reaction_buffer=reaction_buffer,
+        stale_reads=stale_reads,
+    )
+
+
+def pin_reads_to_primary(
+    user: CurrentUserDep,
+    read_router: Annotated[ReadRouter | None, Depends(get_replica_router)],
+) -> None:
+    """Закрепить чтения пользователя за primary после записи (read-your-writes)"""
+    if read_router is not None:
+        read_router.pin(user["user_id"])
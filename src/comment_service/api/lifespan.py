@@ -1,31 +1,45 @@
 import asyncio
+import time
 from contextlib import asynccontextmanager
+from functools import partial
 from typing import AsyncIterator
 
 from fastapi import FastAPI
 
-from comment_service.core.config import Settings
+from comment_service.core.cache import (
+    children_tag,
+    close_page_cache,
+    entity_tag,
+    get_page_cache,
+    init_page_cache,
+)
+from comment_service.core.config import Settings, load_settings
 from comment_service.core.db import (
     init_engine,
     init_session_factory,
+    init_read_router,
     close_engine,
+    close_read_router,
     get_session_factory,
 )
 from comment_service.core.logging import get_logger
 from comment_service.mq.consumer import EventConsumer
-from comment_service.mq.publisher import EventPublisher
-from comment_service.repo.sql.repositories import SQLCommentRepository
+from comment_service.mq.outbox import OutboxRelay
+from comment_service.mq.publisher import CountUpdateAggregator, EventPublisher
+from comment_service.repo.sql.repositories import BulkDeleteProgress, SQLCommentRepository
+from comment_service.services.purger import TombstonePurger
+from comment_service.services.reaction_buffer import ReactionBuffer
 
 log = get_logger(__name__)
 
 
-async def handle_post_deleted(event_data: dict):
+async def handle_post_deleted(event_data: dict, settings: Settings | None = None):
     """Обработчик события удаления поста - удаляем все комментарии к этому посту"""
     try:
         post_id = event_data.get("post_id") or event_data.get("postId")
 
         if not post_id:
-            log.warning(f"Invalid event data for post_deleted: {event_data}")
+            log.warning("Invalid event data for post_deleted: %s", event_data)
             return
 
         session_factory = get_session_factory()
@@ -33,21 +47,57 @@ async def handle_post_deleted(event_data: dict):
             log.error("Session factory not initialized")
             return
 
+        settings = settings or load_settings()
+        page_cache = get_page_cache()
+        deleted_ids: list[int] = []
+
+        def report(progress: BulkDeleteProgress):
+            if page_cache is not None:
+                deleted_ids.extend(progress.batch_ids)
+            log.debug(
+                "Post %s: deleted %s comments in %s batches (%.2fs)",
+                post_id,
+                progress.deleted,
+                progress.batches,
+                progress.duration_seconds,
+            )
+
         async with session_factory() as session:
             comment_repo = SQLCommentRepository(session)
 
-            # Удаляем все комментарии к посту
+            # Удаляем все комментарии к посту пачками; при сбое повторная доставка
+            # события продолжит удаление с оставшихся строк
+            started = time.perf_counter()
             deleted_count = await comment_repo.delete_by_entity(
-                entity_id=int(post_id), entity_type="post"
+                entity_id=int(post_id),
+                entity_type="post",
+                batch_size=settings.delete_batch_size,
+                max_batches_per_second=settings.delete_max_batches_per_second,
+                on_progress=report,
             )
 
             if deleted_count > 0:
-                log.info(f"Deleted {deleted_count} comments for post {post_id}")
+                log.info(
+                    "Deleted %s comments for post %s in %.2fs",
+                    deleted_count,
+                    post_id,
+                    time.perf_counter() - started,
+                )
             else:
-                log.info(f"No comments found for post {post_id}")
+                log.info("No comments found for post %s", post_id)
+
+        # Страницы удаленного поста больше не должны отдаваться из кэша: ленты и дерево
+        # помечены тегом сущности, /children — тегом родителя, а родители ответов удалены вместе
+        # с постом
+        if page_cache is not None:
+            await page_cache.invalidate(
+                entity_tag("post", int(post_id)), *(children_tag(i) for i in deleted_ids)
+            )
 
     except Exception as e:
-        log.error(f"Error handling post_deleted event: {e}")
+        # Пробрасываем: consumer отправит сообщение в DLQ, а не подтвердит его
+        log.error("Error handling post_deleted event: %s", e)
+        raise
 
 
 async def start_consumer(consumer: EventConsumer):
@@ -57,7 +107,7 @@ async def start_consumer(consumer: EventConsumer):
     except asyncio.CancelledError:
         log.info("Consumer cancelled")
     except Exception as e:
-        log.error(f"Consumer error: {e}")
+        log.error("Consumer error: %s", e)
 
 
 def build_lifespan(settings: Settings):
@@ -69,10 +119,22 @@ def build_lifespan(settings: Settings):
 
         try:
             # DB engine & session factory
-            engine = await init_engine(settings.database_url, echo=settings.sql_echo)
+            engine = await init_engine(
+                settings.database_url, echo=settings.sql_echo, settings=settings
+            )
             sf = init_session_factory(engine)
             app.state.engine = engine
             app.state.session_factory = sf
+            app.state.read_router = await init_read_router(settings)
+
+            # Page cache (None, если выключен в настройках)
+            app.state.page_cache = init_page_cache(settings)
+
+            # Write-behind для реакций (None, если выключен)
+            app.state.reaction_buffer = None
+            if settings.reaction_buffer_enabled:
+                app.state.reaction_buffer = ReactionBuffer(sf, settings, app.state.page_cache)
+                app.state.reaction_buffer.start()
 
             # Initialize event publisher
             publisher = EventPublisher(settings)
@@ -80,12 +142,31 @@ def build_lifespan(settings: Settings):
             app.state.event_publisher = publisher
             log.info("Event publisher initialized successfully")
 
+            # Фоновая публикация событий из outbox; счетчики схлопываются по сущности
+            count_aggregator = None
+            if settings.count_events_window_seconds > 0:
+                count_aggregator = CountUpdateAggregator(
+                    publisher, settings.count_events_window_seconds
+                )
+                count_aggregator.start()
+            app.state.count_aggregator = count_aggregator
+            relay = OutboxRelay(sf, publisher, settings, count_aggregator=count_aggregator)
+            app.state.outbox_task = asyncio.create_task(relay.run())
+            log.info("Outbox relay started")
+
+            # Физическая очистка мягко удаленных комментариев в окне низкой нагрузки
+            app.state.purge_task = None
+            if settings.purge_enabled:
+                app.state.purge_task = asyncio.create_task(TombstonePurger(sf, settings).run())
+
             # Initialize event consumer
             consumer = EventConsumer(settings)
             await consumer.connect()
 
             # Регистрируем обработчики событий
-            consumer.register_handler("post_deleted", handle_post_deleted)
+            consumer.register_handler(
+                "post_deleted", partial(handle_post_deleted, settings=settings)
+            )
 
             # Запускаем consumer в фоновой задаче
             consumer_task = asyncio.create_task(start_consumer(consumer))
@@ -98,7 +179,7 @@ def build_lifespan(settings: Settings):
             log.info("Service is up")
 
         except Exception as e:
-            log.error(f"Failed to start service: {e}")
+            log.error("Failed to start service: %s", e)
             raise
 
         try:
@@ -120,13 +201,42 @@ def build_lifespan(settings: Settings):
                 await app.state.consumer.close()
                 log.info("Event consumer closed")
 
+            # Останавливаем outbox relay до закрытия publisher;
+            # неопубликованные события останутся в outbox до следующего запуска
+            if getattr(app.state, "outbox_task", None):
+                app.state.outbox_task.cancel()
+                try:
+                    await app.state.outbox_task
+                except asyncio.CancelledError:
+                    pass
+                log.info("Outbox relay stopped")
+
+            if getattr(app.state, "count_aggregator", None):
+                await app.state.count_aggregator.close()
+
+            if getattr(app.state, "purge_task", None):
+                app.state.purge_task.cancel()
+                try:
+                    await app.state.purge_task
+                except asyncio.CancelledError:
+                    pass
+
             # Close event publisher
             if hasattr(app.state, "event_publisher"):
                 await app.state.event_publisher.close()
                 log.info("Event publisher closed")
 
-            # Close DB engine
+            # Записываем накопленные реакции, пока БД доступна
+            if getattr(app.state, "reaction_buffer", None):
+                try:
+                    await app.state.reaction_buffer.close()
+                except Exception as e:
+                    log.error("Failed to flush reaction buffer on shutdown: %s", e)
+
+            # Close DB engines
+            await close_read_router()
             await close_engine(engine)
+            close_page_cache()
 
             log.info("Bye")
 
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import time
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from starlette.datastructures import MutableHeaders
+from starlette.routing import NoMatchFound
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from comment_service.core.logging import get_logger
+from comment_service.core.metrics import REGISTRY, http_request_db_queries, http_request_duration
+from comment_service.core.query_budget import track_queries
+
+log = get_logger(__name__)
+
+metrics_router = APIRouter()
+
+
+@metrics_router.get("/metrics", include_in_schema=False)
+async def metrics() -> PlainTextResponse:
+    """Метрики в текстовом формате Prometheus"""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
+class MetricsMiddleware:
+    """
+    Гистограмма латентности HTTP по шаблону маршрута (а не по фактическому пути,
+    чтобы id в URL не раздували число серий) и статусу ответа.
+    Чистый ASGI-middleware: без обертки запроса/ответа, как у BaseHTTPMiddleware.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_request_duration.labels(scope["method"], _route_label(scope), str(status)).observe(
+                time.perf_counter() - started
+            )
+
+
+def _route_label(scope: Scope) -> str:
+    """
+    Полный шаблон маршрута вместе с префиксами роутеров (/api/v1/...). Новые версии FastAPI
+    кладут в scope["route"] маршрут из include_router с путем без префиксов, поэтому префикс
+    восстанавливается как часть фактического пути перед подставленным шаблоном маршрута.
+    """
+    route = scope.get("route")
+    if route is None:
+        return "unmatched"
+    template = getattr(route, "path_format", route.path)
+    try:
+        concrete = route.url_path_for(route.name, **scope.get("path_params", {}))
+    except NoMatchFound:
+        return template
+    path = scope.get("path", "")
+    if not path.endswith(concrete):
+        return template
+    return path[: len(path) - len(concrete)] + template
+
+
+class QueryBudgetMiddleware:
+    """
+    Бюджет SQL на HTTP-запрос: число выражений и суммарное время БД.
+    Превышение логируется вместе с самыми медленными выражениями; при server_timing
+    в ответ добавляется заголовок Server-Timing: db;dur=<мс>;desc="<n> queries".
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        max_queries: int = 0,
+        max_db_ms: float = 0.0,
+        server_timing: bool = False,
+    ):
+        self.app = app
+        self.max_queries = max_queries
+        self.max_db_seconds = max_db_ms / 1000
+        self.server_timing = server_timing
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with track_queries() as stats:
+            send_wrapper = send
+            if self.server_timing:
+
+                async def send_wrapper(message: Message) -> None:
+                    if message["type"] == "http.response.start":
+                        MutableHeaders(scope=message).append(
+                            "Server-Timing",
+                            f'db;dur={stats.total_seconds * 1000:.1f};desc="{stats.count} queries"',
+                        )
+                    await send(message)
+
+            await self.app(scope, receive, send_wrapper)
+
+        if stats.count:
+            http_request_db_queries.labels(_route_label(scope)).observe(stats.count)
+        over_count = self.max_queries and stats.count > self.max_queries
+        over_time = self.max_db_seconds and stats.total_seconds > self.max_db_seconds
+        if over_count or over_time:
+            log.warning(
+                "Query budget exceeded: %s %s — %s",
+                scope["method"],
+                scope["path"],
+                stats.describe(),
+            )
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+from fastapi import Response
+from pydantic import BaseModel
+
+from comment_service.core.config import JsonBackendName
+from comment_service.core.logging import get_logger
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson опционален
+    orjson = None
+
+log = get_logger(__name__)
+
+
+def resolve_json_backend(backend: JsonBackendName) -> JsonBackendName:
+    """Проверить выбранный бэкенд при старте: без orjson откатываемся на pydantic"""
+    if backend == "orjson" and orjson is None:
+        log.warning("orjson is not installed, falling back to pydantic JSON backend")
+        return "pydantic"
+    return backend
+
+
+class JSONRenderer:
+    """
+    Сериализация готовых DTO прямо в байты ответа.
+    default — обычный путь FastAPI через response_model (повторная валидация модели);
+    pydantic — model_dump_json; orjson — orjson.dumps поверх model_dump.
+    Заголовки, проставленные в Response эндпоинта (ETag и т.п.), переносятся в ответ.
+    """
+
+    def __init__(self, backend: JsonBackendName, response: Response | None = None):
+        self.backend = backend if backend != "orjson" or orjson is not None else "pydantic"
+        self.response = response
+
+    def __call__(self, payload: BaseModel) -> BaseModel | Response:
+        if self.backend == "default":
+            return payload
+        return Response(
+            content=self.dumps(payload),
+            media_type="application/json",
+            headers=dict(self.response.headers) if self.response is not None else None,
+        )
+
+    def dumps(self, payload: BaseModel) -> bytes:
+        if self.backend == "orjson":
+            # OPT_UTC_Z — тот же формат дат, что у pydantic ("...Z")
+            return orjson.dumps(payload.model_dump(by_alias=True), option=orjson.OPT_UTC_Z)
+        return payload.model_dump_json(by_alias=True).encode()
@@ -1,13 +1,25 @@
 from __future__ import annotations
 
-from typing import Optional
+import hashlib
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Literal, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 
-from comment_service.api.deps import CurrentUserDep, OptionalUserDep, get_comment_service
+from comment_service.api.deps import (
+    CurrentUserDep,
+    JSONRendererDep,
+    OptionalUserDep,
+    get_comment_service,
+    get_read_comment_service,
+    pin_reads_to_primary,
+)
+from comment_service.domain.models import SortOrder
 from comment_service.dtos.http import (
     CommentDto,
     CommentListResponse,
+    CommentTreeResponse,
     CreateCommentRequest,
     CreateCommentResponse,
 )
@@ -18,73 +30,331 @@ post_router = APIRouter(prefix="/post", tags=["Post Comments"])
 game_router = APIRouter(prefix="/game", tags=["Game Comments"])
 
 
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Слабое сравнение ETag из If-None-Match (RFC 9110, 13.1.2)"""
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+def _not_modified_since(if_modified_since: str, updated_at: datetime) -> bool:
+    """
+    HTTP-дата имеет точность секунды: 304 только если последнее изменение целиком раньше
+    названной секунды, иначе запись в ту же секунду была бы неотличима от уже полученной
+    """
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        return False
+    return updated_at < since
+
+
+def _last_modified(updated_at: datetime) -> Optional[datetime]:
+    """
+    Last-Modified — конец секунды последнего изменения (с ним If-Modified-Since дает 304).
+    Пока эта секунда не прошла, заголовок не отдается: в нее еще может попасть новая запись.
+    """
+    end_of_second = updated_at.replace(microsecond=0) + timedelta(seconds=1)
+    if end_of_second > datetime.now(timezone.utc):
+        return None
+    return end_of_second
+
+
+async def _check_not_modified(
+    request: Request,
+    response: Response,
+    comment_service: CommentAppService,
+    entity_type: Literal["post", "game"],
+    entity_id: int,
+    user_id: Optional[int],
+    **params,
+) -> Optional[Response]:
+    """
+    Условный GET по версии ленты сущности: один запрос по первичному ключу до построения страницы.
+    Возвращает готовый ответ 304 или None, проставив ETag/Last-Modified в response.
+    """
+    version = await comment_service.get_entity_version(entity_id, entity_type)
+    # Реакция из буфера еще не подняла версию ленты, но уже видна автору в overlay:
+    # незаписанные реакции входят в ETag, иначе 304 спрятал бы собственный лайк
+    pending = {}
+    if user_id and comment_service.reaction_buffer is not None:
+        pending = comment_service.reaction_buffer.pending_for(user_id)
+    # Флаги реакций зависят от пользователя, поэтому он входит в ETag
+    raw = "|".join(
+        [
+            str(version.version if version else 0),
+            version.updated_at.isoformat() if version and version.updated_at else "",
+            str(user_id or 0),
+            *(f"{key}={value}" for key, value in sorted(params.items())),
+            *(f"{comment_id}:{reaction}" for comment_id, reaction in sorted(pending.items())),
+        ]
+    )
+    etag = f'W/"{hashlib.blake2b(raw.encode(), digest_size=12).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Authorization"}
+    # По времени изменения незаписанные реакции не отличить, поэтому пока они есть —
+    # только ETag
+    updated_at = version.updated_at if version and not pending else None
+    last_modified = _last_modified(updated_at) if updated_at is not None else None
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+
+    if_none_match = request.headers.get("if-none-match")
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_none_match is not None:
+        not_modified = _etag_matches(if_none_match, etag)
+    elif if_modified_since is not None and updated_at is not None:
+        not_modified = _not_modified_since(if_modified_since, updated_at)
+    else:
+        not_modified = False
+
+    if not_modified:
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+
 @post_router.get("/comments/{entity_id}", response_model=CommentListResponse)
 async def get_post_comments(
     entity_id: int,
+    request: Request,
+    response: Response,
     cursor: Optional[str] = Query(None, description="Cursor for pagination"),
+    sort: SortOrder = Query("oldest", description="Sort order: oldest, newest or top"),
+    limit: Optional[int] = Query(None, ge=1, description="Page size (capped by the server)"),
     user: OptionalUserDep = None,
-    comment_service: CommentAppService = Depends(get_comment_service),
+    comment_service: CommentAppService = Depends(get_read_comment_service),
+    render: JSONRendererDep = None,
 ) -> CommentListResponse:
-    """Получить комментарии к посту"""
+    """Получить комментарии к посту (поддерживает If-None-Match)"""
     user_id = user.get("user_id") if user else None
-    return await comment_service.list_comments(
+    not_modified = await _check_not_modified(
+        request,
+        response,
+        comment_service,
+        entity_type="post",
+        entity_id=entity_id,
+        user_id=user_id,
+        cursor=cursor,
+        sort=sort,
+        limit=limit,
+    )
+    if not_modified is not None:
+        return not_modified
+    page = await comment_service.list_comments(
         entity_id=entity_id,
         entity_type="post",
         cursor=cursor,
         user_id=user_id,
+        sort=sort,
+        limit=limit,
     )
+    return render(page)
 
 
 @game_router.get("/comments/{entity_id}", response_model=CommentListResponse)
 async def get_game_comments(
     entity_id: int,
+    request: Request,
+    response: Response,
     cursor: Optional[str] = Query(None, description="Cursor for pagination"),
+    sort: SortOrder = Query("oldest", description="Sort order: oldest, newest or top"),
+    limit: Optional[int] = Query(None, ge=1, description="Page size (capped by the server)"),
     user: OptionalUserDep = None,
-    comment_service: CommentAppService = Depends(get_comment_service),
+    comment_service: CommentAppService = Depends(get_read_comment_service),
+    render: JSONRendererDep = None,
 ) -> CommentListResponse:
-    """Получить комментарии к игре"""
+    """Получить комментарии к игре (поддерживает If-None-Match)"""
+    user_id = user.get("user_id") if user else None
+    not_modified = await _check_not_modified(
+        request,
+        response,
+        comment_service,
+        entity_type="game",
+        entity_id=entity_id,
+        user_id=user_id,
+        cursor=cursor,
+        sort=sort,
+        limit=limit,
+    )
+    if not_modified is not None:
+        return not_modified
+    page = await comment_service.list_comments(
+        entity_id=entity_id,
+        entity_type="game",
+        cursor=cursor,
+        user_id=user_id,
+        sort=sort,
+        limit=limit,
+    )
+    return render(page)
+
+
+@post_router.get("/comments/{entity_id}/tree", response_model=CommentTreeResponse)
+async def get_post_comment_tree(
+    entity_id: int,
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = Query(None, description="Cursor for pagination"),
+    sort: SortOrder = Query("oldest", description="Sort order: oldest, newest or top"),
+    limit: Optional[int] = Query(None, ge=1, description="Page size (capped by the server)"),
+    replies: Optional[int] = Query(None, ge=0, description="Replies inlined per comment"),
+    user: OptionalUserDep = None,
+    comment_service: CommentAppService = Depends(get_read_comment_service),
+    render: JSONRendererDep = None,
+) -> CommentTreeResponse:
+    """Получить комментарии к посту вместе с первыми ответами"""
+    user_id = user.get("user_id") if user else None
+    not_modified = await _check_not_modified(
+        request,
+        response,
+        comment_service,
+        entity_type="post",
+        entity_id=entity_id,
+        user_id=user_id,
+        cursor=cursor,
+        sort=sort,
+        limit=limit,
+        replies=replies,
+    )
+    if not_modified is not None:
+        return not_modified
+    page = await comment_service.list_comment_tree(
+        entity_id=entity_id,
+        entity_type="post",
+        cursor=cursor,
+        user_id=user_id,
+        sort=sort,
+        limit=limit,
+        replies=replies,
+    )
+    return render(page)
+
+
+@game_router.get("/comments/{entity_id}/tree", response_model=CommentTreeResponse)
+async def get_game_comment_tree(
+    entity_id: int,
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = Query(None, description="Cursor for pagination"),
+    sort: SortOrder = Query("oldest", description="Sort order: oldest, newest or top"),
+    limit: Optional[int] = Query(None, ge=1, description="Page size (capped by the server)"),
+    replies: Optional[int] = Query(None, ge=0, description="Replies inlined per comment"),
+    user: OptionalUserDep = None,
+    comment_service: CommentAppService = Depends(get_read_comment_service),
+    render: JSONRendererDep = None,
+) -> CommentTreeResponse:
+    """Получить комментарии к игре вместе с первыми ответами"""
     user_id = user.get("user_id") if user else None
-    return await comment_service.list_comments(
+    not_modified = await _check_not_modified(
+        request,
+        response,
+        comment_service,
+        entity_type="game",
+        entity_id=entity_id,
+        user_id=user_id,
+        cursor=cursor,
+        sort=sort,
+        limit=limit,
+        replies=replies,
+    )
+    if not_modified is not None:
+        return not_modified
+    page = await comment_service.list_comment_tree(
         entity_id=entity_id,
         entity_type="game",
         cursor=cursor,
         user_id=user_id,
+        sort=sort,
+        limit=limit,
+        replies=replies,
     )
+    return render(page)
 
 
 @post_router.get("/comments/{comment_id}/children", response_model=CommentListResponse)
 async def get_post_comment_children(
     comment_id: int,
     cursor: Optional[str] = Query(None, description="Cursor for pagination"),
+    sort: SortOrder = Query("oldest", description="Sort order: oldest, newest or top"),
+    limit: Optional[int] = Query(None, ge=1, description="Page size (capped by the server)"),
     user: OptionalUserDep = None,
-    comment_service: CommentAppService = Depends(get_comment_service),
+    comment_service: CommentAppService = Depends(get_read_comment_service),
+    render: JSONRendererDep = None,
 ) -> CommentListResponse:
     """Получить дочерние комментарии к комментарию поста"""
     user_id = user.get("user_id") if user else None
-    return await comment_service.list_children(
+    page = await comment_service.list_children(
         parent_id=comment_id,
         cursor=cursor,
         user_id=user_id,
+        sort=sort,
+        limit=limit,
     )
+    return render(page)
 
 
 @game_router.get("/comments/{comment_id}/children", response_model=CommentListResponse)
 async def get_game_comment_children(
     comment_id: int,
     cursor: Optional[str] = Query(None, description="Cursor for pagination"),
+    sort: SortOrder = Query("oldest", description="Sort order: oldest, newest or top"),
+    limit: Optional[int] = Query(None, ge=1, description="Page size (capped by the server)"),
     user: OptionalUserDep = None,
-    comment_service: CommentAppService = Depends(get_comment_service),
+    comment_service: CommentAppService = Depends(get_read_comment_service),
+    render: JSONRendererDep = None,
 ) -> CommentListResponse:
     """Получить дочерние комментарии к комментарию игры"""
     user_id = user.get("user_id") if user else None
-    return await comment_service.list_children(
+    page = await comment_service.list_children(
         parent_id=comment_id,
         cursor=cursor,
         user_id=user_id,
+        sort=sort,
+        limit=limit,
     )
+    return render(page)
+
+
+@post_router.get("/comments/{comment_id}/thread", response_model=CommentListResponse)
+async def get_post_comment_thread(
+    comment_id: int,
+    limit: Optional[int] = Query(None, ge=1, description="Max comments (capped by the server)"),
+    user: OptionalUserDep = None,
+    comment_service: CommentAppService = Depends(get_read_comment_service),
+    render: JSONRendererDep = None,
+) -> CommentListResponse:
+    """Получить ветку комментария поста целиком (в порядке обхода, с depth)"""
+    user_id = user.get("user_id") if user else None
+    thread = await comment_service.get_thread(comment_id=comment_id, user_id=user_id, limit=limit)
+    if not thread.items:
+        raise HTTPException(status_code=404, detail="Comment not found")
+    return render(thread)
+
+
+@game_router.get("/comments/{comment_id}/thread", response_model=CommentListResponse)
+async def get_game_comment_thread(
+    comment_id: int,
+    limit: Optional[int] = Query(None, ge=1, description="Max comments (capped by the server)"),
+    user: OptionalUserDep = None,
+    comment_service: CommentAppService = Depends(get_read_comment_service),
+    render: JSONRendererDep = None,
+) -> CommentListResponse:
+    """Получить ветку комментария игры целиком (в порядке обхода, с depth)"""
+    user_id = user.get("user_id") if user else None
+    thread = await comment_service.get_thread(comment_id=comment_id, user_id=user_id, limit=limit)
+    if not thread.items:
+        raise HTTPException(status_code=404, detail="Comment not found")
+    return render(thread)
 
 
-@post_router.post("/{entity_id}/comments", response_model=CreateCommentResponse)
+@post_router.post(
+    "/{entity_id}/comments",
+    response_model=CreateCommentResponse,
+    dependencies=[Depends(pin_reads_to_primary)],
+)
 async def create_post_comment(
     entity_id: int,
     request: CreateCommentRequest,
@@ -104,7 +374,11 @@ async def create_post_comment(
     return CreateCommentResponse(comment=comment)
 
 
-@game_router.post("/{entity_id}/comments", response_model=CreateCommentResponse)
+@game_router.post(
+    "/{entity_id}/comments",
+    response_model=CreateCommentResponse,
+    dependencies=[Depends(pin_reads_to_primary)],
+)
 async def create_game_comment(
     entity_id: int,
     request: CreateCommentRequest,
@@ -124,7 +398,11 @@ async def create_game_comment(
     return CreateCommentResponse(comment=comment)
 
 
-@post_router.post("/comments/{comment_id}/replies", response_model=CreateCommentResponse)
+@post_router.post(
+    "/comments/{comment_id}/replies",
+    response_model=CreateCommentResponse,
+    dependencies=[Depends(pin_reads_to_primary)],
+)
 async def reply_to_post_comment(
     comment_id: int,
     request: CreateCommentRequest,
@@ -133,7 +411,7 @@ async def reply_to_post_comment(
 ) -> CreateCommentResponse:
     """Ответить на комментарий поста (требует авторизации)"""
     parent_comment = await comment_service.comment_repo.get_by_id(comment_id)
-    if not parent_comment:
+    if not parent_comment or parent_comment.deleted_at is not None:
         raise HTTPException(status_code=404, detail="Parent comment not found")
 
     comment = await comment_service.create_comment(
@@ -148,7 +426,11 @@ async def reply_to_post_comment(
     return CreateCommentResponse(comment=comment)
 
 
-@game_router.post("/comments/{comment_id}/replies", response_model=CreateCommentResponse)
+@game_router.post(
+    "/comments/{comment_id}/replies",
+    response_model=CreateCommentResponse,
+    dependencies=[Depends(pin_reads_to_primary)],
+)
 async def reply_to_game_comment(
     comment_id: int,
     request: CreateCommentRequest,
@@ -157,7 +439,7 @@ async def reply_to_game_comment(
 ) -> CreateCommentResponse:
     """Ответить на комментарий игры (требует авторизации)"""
     parent_comment = await comment_service.comment_repo.get_by_id(comment_id)
-    if not parent_comment:
+    if not parent_comment or parent_comment.deleted_at is not None:
         raise HTTPException(status_code=404, detail="Parent comment not found")
 
     comment = await comment_service.create_comment(
@@ -172,49 +454,111 @@ async def reply_to_game_comment(
     return CreateCommentResponse(comment=comment)
 
 
-@post_router.post("/comments/{comment_id}/like", response_model=CommentDto)
+async def _delete_comment(
+    comment_id: int, user: dict, comment_service: CommentAppService
+) -> Response:
+    comment = await comment_service.comment_repo.get_by_id(comment_id)
+    if not comment or comment.deleted_at is not None:
+        raise HTTPException(status_code=404, detail="Comment not found")
+    if comment.author_id != user["user_id"]:
+        raise HTTPException(status_code=403, detail="Only the author can delete a comment")
+    await comment_service.delete_comment(comment_id)
+    return Response(status_code=204)
+
+
+@post_router.delete(
+    "/comments/{comment_id}",
+    status_code=204,
+    dependencies=[Depends(pin_reads_to_primary)],
+)
+async def delete_post_comment(
+    comment_id: int,
+    user: CurrentUserDep,
+    comment_service: CommentAppService = Depends(get_comment_service),
+) -> Response:
+    """Удалить свой комментарий к посту (в ветке остается как "[deleted]")"""
+    return await _delete_comment(comment_id, user, comment_service)
+
+
+@game_router.delete(
+    "/comments/{comment_id}",
+    status_code=204,
+    dependencies=[Depends(pin_reads_to_primary)],
+)
+async def delete_game_comment(
+    comment_id: int,
+    user: CurrentUserDep,
+    comment_service: CommentAppService = Depends(get_comment_service),
+) -> Response:
+    """Удалить свой комментарий к игре (в ветке остается как "[deleted]")"""
+    return await _delete_comment(comment_id, user, comment_service)
+
+
+async def _set_reaction(
+    comment_id: int,
+    user: dict,
+    reaction: Literal["like", "dislike"],
+    comment_service: CommentAppService,
+) -> CommentDto:
+    comment = await comment_service.set_reaction(
+        comment_id=comment_id, user_id=user["user_id"], reaction=reaction
+    )
+    if comment is None:
+        raise HTTPException(status_code=404, detail="Comment not found")
+    return comment
+
+
+@post_router.post(
+    "/comments/{comment_id}/like",
+    response_model=CommentDto,
+    dependencies=[Depends(pin_reads_to_primary)],
+)
 async def like_post_comment(
     comment_id: int,
     user: CurrentUserDep,
     comment_service: CommentAppService = Depends(get_comment_service),
 ) -> CommentDto:
     """Лайкнуть комментарий поста (требует авторизации)"""
-    return await comment_service.set_reaction(
-        comment_id=comment_id, user_id=user["user_id"], reaction="like"
-    )
+    return await _set_reaction(comment_id, user, "like", comment_service)
 
 
-@post_router.post("/comments/{comment_id}/dislike", response_model=CommentDto)
+@post_router.post(
+    "/comments/{comment_id}/dislike",
+    response_model=CommentDto,
+    dependencies=[Depends(pin_reads_to_primary)],
+)
 async def dislike_post_comment(
     comment_id: int,
     user: CurrentUserDep,
     comment_service: CommentAppService = Depends(get_comment_service),
 ) -> CommentDto:
     """Дизлайкнуть комментарий поста (требует авторизации)"""
-    return await comment_service.set_reaction(
-        comment_id=comment_id, user_id=user["user_id"], reaction="dislike"
-    )
+    return await _set_reaction(comment_id, user, "dislike", comment_service)
 
 
-@game_router.post("/comments/{comment_id}/like", response_model=CommentDto)
+@game_router.post(
+    "/comments/{comment_id}/like",
+    response_model=CommentDto,
+    dependencies=[Depends(pin_reads_to_primary)],
+)
 async def like_game_comment(
     comment_id: int,
     user: CurrentUserDep,
     comment_service: CommentAppService = Depends(get_comment_service),
 ) -> CommentDto:
     """Лайкнуть комментарий игры (требует авторизации)"""
-    return await comment_service.set_reaction(
-        comment_id=comment_id, user_id=user["user_id"], reaction="like"
-    )
+    return await _set_reaction(comment_id, user, "like", comment_service)
 
 
-@game_router.post("/comments/{comment_id}/dislike", response_model=CommentDto)
+@game_router.post(
+    "/comments/{comment_id}/dislike",
+    response_model=CommentDto,
+    dependencies=[Depends(pin_reads_to_primary)],
+)
 async def dislike_game_comment(
     comment_id: int,
     user: CurrentUserDep,
     comment_service: CommentAppService = Depends(get_comment_service),
 ) -> CommentDto:
     """Дизлайкнуть комментарий игры (требует авторизации)"""
-    return await comment_service.set_reaction(
-        comment_id=comment_id, user_id=user["user_id"], reaction="dislike"
-    )
+    return await _set_reaction(comment_id, user, "dislike", comment_service)
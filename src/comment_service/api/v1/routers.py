@@ -1,6 +1,8 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
 
 from comment_service.api.v1.comments_router import post_router, game_router
+from comment_service.core.db import pool_stats
+from comment_service.repo.sql.repositories import bulk_delete_stats
 
 api_v1 = APIRouter(prefix="/v1", tags=["v1"])
 api_v1.include_router(post_router)
@@ -10,3 +12,26 @@ api_v1.include_router(game_router)
 @api_v1.get("/healthz")
 async def healthz():
     return {"status": "ok"}
+
+
+@api_v1.get("/stats/cache")
+async def cache_stats(request: Request):
+    """Счетчики кэша страниц (hit/miss/evictions/invalidations)"""
+    page_cache = getattr(request.app.state, "page_cache", None)
+    if page_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **page_cache.stats()}
+
+
+@api_v1.get("/stats/db")
+async def db_stats(request: Request):
+    """
+    Заполненность пула соединений, время ожидания checkout, состояние реплик
+    и метрики пакетного удаления комментариев
+    """
+    stats = pool_stats()
+    stats["bulk_delete"] = bulk_delete_stats.snapshot()
+    read_router = getattr(request.app.state, "read_router", None)
+    if read_router is not None:
+        stats["replicas"] = read_router.stats()
+    return stats
@@ -0,0 +1,51 @@
+"""
+Сверка денормализованных счетчиков комментариев.
+
+    uv run python -m comment_service.cli.reconcile [--dry-run]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+
+from comment_service.core.config import load_settings
+from comment_service.core.db import close_engine, init_engine, init_session_factory
+from comment_service.core.logging import get_logger, init_logging
+from comment_service.repo.sql.repositories import SQLCommentRepository
+
+log = get_logger(__name__)
+
+
+async def reconcile(dry_run: bool = False) -> None:
+    settings = load_settings()
+    engine = await init_engine(settings.database_url, echo=settings.sql_echo, settings=settings)
+    session_factory = init_session_factory(engine)
+    try:
+        async with session_factory() as session:
+            drift = await SQLCommentRepository(session).reconcile_counters(dry_run=dry_run)
+        log.info(
+            "drifted counters: children_count=%s, comment_counts=%s, reactions=%s%s",
+            drift.children_counts,
+            drift.entity_counts,
+            drift.reaction_counts,
+            " (dry run, not fixed)" if dry_run else "",
+        )
+    finally:
+        await close_engine(engine)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Reconcile denormalized comment counters")
+    parser.add_argument(
+        "--dry-run", action="store_true", help="only report drifted counters, do not fix them"
+    )
+    args = parser.parse_args()
+    settings = load_settings()
+    # Для запуска из консоли по умолчанию rich, независимо от env
+    init_logging(settings.log_level, settings.log_format or "rich", settings.log_debug_sample_rate)
+    asyncio.run(reconcile(dry_run=args.dry_run))
+
+
+if __name__ == "__main__":
+    main()
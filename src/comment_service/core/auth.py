@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from jose import JWTError, jwt
+
+from comment_service.core.config import Settings
+
+
+class InvalidTokenError(Exception):
+    """Токен не прошел проверку; detail — текст для ответа 401"""
+
+    def __init__(self, detail: str):
+        super().__init__(detail)
+        self.detail = detail
+
+
+class TokenVerifier:
+    """
+    Проверка JWT с LRU-кэшем успешно проверенных токенов.
+    Ключ кэша — sha256 токена; запись живет до exp токена, но не дольше ttl_seconds.
+    """
+
+    def __init__(
+        self,
+        secret_key: str,
+        algorithm: str,
+        cache_size: int = 10_000,
+        ttl_seconds: float = 300.0,
+    ):
+        self.secret_key = secret_key
+        self.algorithm = algorithm
+        self.cache_size = cache_size
+        self.ttl_seconds = ttl_seconds
+        # sha256(token) -> (expires_at, user)
+        self._cache: OrderedDict[bytes, tuple[float, dict[str, Any]]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> "TokenVerifier":
+        return cls(
+            secret_key=settings.jwt_secret_key,
+            algorithm=settings.jwt_algorithm,
+            cache_size=settings.auth_token_cache_size,
+            ttl_seconds=settings.auth_token_cache_ttl_seconds,
+        )
+
+    def verify(self, token: str) -> dict[str, Any]:
+        """Вернуть данные пользователя из токена или бросить InvalidTokenError"""
+        if self.cache_size <= 0:
+            user, _ = self._decode(token)
+            return user
+
+        key = hashlib.sha256(token.encode()).digest()
+        now = time.time()
+        entry = self._cache.get(key)
+        if entry is not None:
+            expires_at, user = entry
+            if expires_at > now:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return dict(user)
+            del self._cache[key]
+
+        self.misses += 1
+        user, exp = self._decode(token)
+        expires_at = now + self.ttl_seconds
+        if exp is not None:
+            expires_at = min(expires_at, exp)
+        self._cache[key] = (expires_at, user)
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return dict(user)
+
+    def _decode(self, token: str) -> tuple[dict[str, Any], Optional[float]]:
+        try:
+            payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
+        except JWTError:
+            raise InvalidTokenError("Invalid or expired token")
+
+        try:
+            user_id = int(payload.get("sub") or 0)
+        except (TypeError, ValueError):
+            user_id = 0
+        if not user_id:
+            raise InvalidTokenError("Invalid token payload")
+        username = payload.get("username") or payload.get("name", "")
+        user = {
+            "user_id": user_id,
+            "email": payload.get("email"),
+            "username": username,
+            "avatar": payload.get("avatar"),
+        }
+        exp = payload.get("exp")
+        return user, float(exp) if exp is not None else None
+
+    def stats(self) -> dict[str, int]:
+        return {"entries": len(self._cache), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from typing import Any, Iterable, Protocol
+
+from comment_service.core.config import Settings
+from comment_service.core.logging import get_logger
+from comment_service.core.metrics import REGISTRY, Gauge
+
+log = get_logger(__name__)
+
+
+class PageCache(Protocol):
+    """
+    Кэш страниц комментариев с инвалидацией по тегам.
+    Интерфейс асинхронный, чтобы его можно было реализовать поверх Redis.
+    """
+
+    async def get(self, key: str) -> Any | None: ...
+
+    async def set(self, key: str, value: Any, tags: Iterable[str]) -> None: ...
+
+    async def invalidate(self, *tags: str) -> None: ...
+
+    def stats(self) -> dict[str, int]: ...
+
+
+class InMemoryPageCache:
+    """LRU-кэш в памяти процесса с TTL и ограничением по числу записей"""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        # key -> (expires_at, value, tags)
+        self._entries: OrderedDict[str, tuple[float, Any, frozenset[str]]] = OrderedDict()
+        self._keys_by_tag: dict[str, set[str]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    async def get(self, key: str) -> Any | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value, _ = entry
+        if expires_at < time.monotonic():
+            self._remove(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    async def set(self, key: str, value: Any, tags: Iterable[str]) -> None:
+        if key in self._entries:
+            self._remove(key)
+        tags = frozenset(tags)
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value, tags)
+        for tag in tags:
+            self._keys_by_tag.setdefault(tag, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    async def invalidate(self, *tags: str) -> None:
+        for tag in tags:
+            for key in self._keys_by_tag.pop(tag, set()):
+                if key in self._entries:
+                    self._remove(key)
+                    self.invalidations += 1
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+    def _remove(self, key: str) -> None:
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._keys_by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_tag[tag]
+
+
+def entity_tag(entity_type: str, entity_id: int) -> str:
+    return f"entity:{entity_type}:{entity_id}"
+
+
+def children_tag(parent_id: int) -> str:
+    return f"children:{parent_id}"
+
+
+_page_cache: PageCache | None = None
+
+
+def init_page_cache(settings: Settings) -> PageCache | None:
+    global _page_cache
+    if _page_cache is None and settings.page_cache_enabled:
+        _page_cache = InMemoryPageCache(
+            max_entries=settings.page_cache_max_entries,
+            ttl_seconds=settings.page_cache_ttl_seconds,
+        )
+        log.info(
+            "page cache initialized",
+            extra={
+                "max_entries": settings.page_cache_max_entries,
+                "ttl_seconds": settings.page_cache_ttl_seconds,
+            },
+        )
+    return _page_cache
+
+
+def close_page_cache() -> None:
+    global _page_cache
+    _page_cache = None
+
+
+def get_page_cache() -> PageCache | None:
+    return _page_cache
+
+
+def _collect_cache_stats(fields: tuple[str, ...]) -> dict[tuple[str, ...], float]:
+    if _page_cache is None:
+        return {}
+    stats = _page_cache.stats()
+    return {(field,): stats[field] for field in fields if field in stats}
+
+
+REGISTRY.register(
+    Gauge(
+        "page_cache_operations",
+        "Page cache hits, misses, evictions and invalidations",
+        lambda: _collect_cache_stats(("hits", "misses", "evictions", "invalidations")),
+        ("result",),
+        kind="counter",
+    )
+)
+REGISTRY.register(
+    Gauge(
+        "page_cache_entries",
+        "Pages currently held in the cache",
+        lambda: {(): stats[("entries",)]} if (stats := _collect_cache_stats(("entries",))) else {},
+    )
+)
@@ -1,28 +1,135 @@
 from __future__ import annotations
 
+import bisect
+import itertools
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any
+
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import (
     AsyncEngine,
     AsyncSession,
     async_sessionmaker,
     create_async_engine,
 )
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
+from comment_service.core.config import Settings
 from comment_service.core.logging import get_logger
+from comment_service.core.metrics import REGISTRY, Gauge, instrument_engine
 
 log = get_logger(__name__)
 
 _engine: AsyncEngine | None = None
 _session_factory: async_sessionmaker[AsyncSession] | None = None
+_read_router: ReadRouter | None = None
+
+
+class CheckoutWaitStats:
+    """Время ожидания соединения из пула: счетчик, сумма, максимум и гистограмма"""
+
+    buckets: tuple[float, ...] = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.bucket_counts = [0] * (len(self.buckets) + 1)
+
+    def observe(self, seconds: float) -> None:
+        self.count += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.bucket_counts[bisect.bisect_left(self.buckets, seconds)] += 1
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "total_seconds": round(self.total_seconds, 6),
+            "max_seconds": round(self.max_seconds, 6),
+            "buckets": {
+                **{str(le): n for le, n in zip(self.buckets, self.bucket_counts)},
+                "+Inf": self.bucket_counts[-1],
+            },
+        }
+
+
+class TimedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """Пул соединений, замеряющий время ожидания checkout"""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.checkout_wait = CheckoutWaitStats()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            self.checkout_wait.observe(time.perf_counter() - started)
+
 
+def _engine_options(url: str, settings: Settings | None) -> dict[str, Any]:
+    """Параметры пула и драйвера из настроек; для SQLite в памяти пул не настраивается"""
+    if settings is None:
+        return {"pool_pre_ping": True}
 
-async def init_engine(url: str, echo: bool = False) -> AsyncEngine:
+    parsed = make_url(url)
+    options: dict[str, Any] = {"pool_pre_ping": settings.db_pool_pre_ping}
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        return options
+
+    options.update(
+        poolclass=TimedAsyncQueuePool,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+    )
+    if parsed.get_driver_name() == "asyncpg":
+        # statement_cache_size — кэш asyncpg, prepared_statement_cache_size — кэш диалекта
+        options["connect_args"] = {
+            "statement_cache_size": settings.db_statement_cache_size,
+            "prepared_statement_cache_size": settings.db_statement_cache_size,
+        }
+    return options
+
+
+async def init_engine(
+    url: str, echo: bool = False, settings: Settings | None = None
+) -> AsyncEngine:
     global _engine
     if _engine is None:
-        _engine = create_async_engine(url, echo=echo, pool_pre_ping=True)
-        log.info("database engine initialized", extra={"url": url})
+        _engine = create_async_engine(url, echo=echo, **_engine_options(url, settings))
+        instrument_engine(_engine.sync_engine)
+        log.info(
+            "database engine initialized",
+            extra={"url": make_url(url).render_as_string(hide_password=True)},
+        )
     return _engine
 
 
+def pool_stats(engine: AsyncEngine | None = None) -> dict[str, Any]:
+    """Заполненность пула и время ожидания соединения"""
+    target = engine or _engine
+    if target is None:
+        return {}
+    pool = target.pool
+    stats: dict[str, Any] = {"pool": type(pool).__name__}
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+        )
+    if isinstance(pool, TimedAsyncQueuePool):
+        stats["checkout_wait"] = pool.checkout_wait.snapshot()
+    return stats
+
+
 def init_session_factory(engine: AsyncEngine) -> async_sessionmaker[AsyncSession]:
     global _session_factory
     if _session_factory is None:
@@ -43,3 +150,183 @@ async def close_engine(engine: AsyncEngine | None = None) -> None:
 
 def get_session_factory() -> async_sessionmaker[AsyncSession] | None:
     return _session_factory
+
+
+@dataclass
+class Replica:
+    url: str
+    engine: AsyncEngine
+    session_factory: async_sessionmaker[AsyncSession]
+    unhealthy_until: float = 0.0
+
+    @property
+    def healthy(self) -> bool:
+        return self.unhealthy_until <= time.monotonic()
+
+
+class ReadRouter:
+    """
+    Выбор реплики для чтения: round-robin по здоровым репликам.
+    Реплика, на которой не удалось получить соединение, пропускается retry_seconds.
+    Пользователь, недавно выполнявший запись, читает с primary pin_seconds (read-your-writes;
+    закрепление хранится в памяти процесса).
+    """
+
+    def __init__(
+        self,
+        replicas: list[Replica],
+        pin_seconds: float,
+        retry_seconds: float,
+        max_pinned: int = 100_000,
+    ):
+        self.replicas = replicas
+        self.pin_seconds = pin_seconds
+        self.retry_seconds = retry_seconds
+        self.max_pinned = max_pinned
+        self._counter = itertools.count()
+        # user_id -> monotonic-время окончания закрепления за primary
+        self._pinned: OrderedDict[int, float] = OrderedDict()
+
+    def pin(self, user_id: int) -> None:
+        self._pinned[user_id] = time.monotonic() + self.pin_seconds
+        self._pinned.move_to_end(user_id)
+        while len(self._pinned) > self.max_pinned:
+            self._pinned.popitem(last=False)
+
+    def is_pinned(self, user_id: int | None) -> bool:
+        if user_id is None:
+            return False
+        until = self._pinned.get(user_id)
+        if until is None:
+            return False
+        if until <= time.monotonic():
+            del self._pinned[user_id]
+            return False
+        return True
+
+    def has_recent_writes(self) -> bool:
+        """
+        Была ли запись за последние pin_seconds: реплики могли ее еще не получить.
+        Закрепления упорядочены по времени, поэтому достаточно проверить последнее.
+        """
+        if not self._pinned:
+            return False
+        return next(reversed(self._pinned.values())) > time.monotonic()
+
+    def choose(self) -> Replica | None:
+        """Следующая здоровая реплика или None (тогда читаем с primary)"""
+        start = next(self._counter)
+        for offset in range(len(self.replicas)):
+            replica = self.replicas[(start + offset) % len(self.replicas)]
+            if replica.healthy:
+                return replica
+        return None
+
+    def mark_unhealthy(self, replica: Replica) -> None:
+        replica.unhealthy_until = time.monotonic() + self.retry_seconds
+        log.warning(
+            "read replica unavailable, skipping",
+            extra={"url": make_url(replica.url).render_as_string(hide_password=True)},
+        )
+
+    def stats(self) -> list[dict[str, Any]]:
+        return [
+            {
+                "url": make_url(r.url).render_as_string(hide_password=True),
+                "healthy": r.healthy,
+                **pool_stats(r.engine),
+            }
+            for r in self.replicas
+        ]
+
+
+async def init_read_router(settings: Settings) -> ReadRouter | None:
+    """Движки реплик из database_read_urls; None, если реплики не настроены"""
+    global _read_router
+    if _read_router is None and settings.database_read_urls:
+        replicas = []
+        for url in settings.database_read_urls:
+            engine = create_async_engine(
+                url, echo=settings.sql_echo, **_engine_options(url, settings)
+            )
+            instrument_engine(engine.sync_engine)
+            replicas.append(
+                Replica(
+                    url=url,
+                    engine=engine,
+                    session_factory=async_sessionmaker(engine, expire_on_commit=False),
+                )
+            )
+        _read_router = ReadRouter(
+            replicas,
+            pin_seconds=settings.db_read_pin_seconds,
+            retry_seconds=settings.db_replica_retry_seconds,
+        )
+        log.info("read replicas initialized", extra={"replicas": len(replicas)})
+    return _read_router
+
+
+async def close_read_router() -> None:
+    global _read_router
+    if _read_router is not None:
+        for replica in _read_router.replicas:
+            await replica.engine.dispose()
+        _read_router = None
+        log.info("read replicas closed")
+
+
+def get_read_router() -> ReadRouter | None:
+    return _read_router
+
+
+def _pools() -> list[tuple[str, AsyncEngine]]:
+    pools = [("primary", _engine)] if _engine is not None else []
+    if _read_router is not None:
+        pools.extend((f"replica{i}", r.engine) for i, r in enumerate(_read_router.replicas))
+    return pools
+
+
+def _collect_pool_connections() -> dict[tuple[str, ...], float]:
+    values: dict[tuple[str, ...], float] = {}
+    for name, engine in _pools():
+        stats = pool_stats(engine)
+        for state in ("size", "checked_in", "checked_out", "overflow"):
+            if state in stats:
+                values[(name, state)] = stats[state]
+    return values
+
+
+def _collect_checkout_wait(field: str) -> dict[tuple[str, ...], float]:
+    values: dict[tuple[str, ...], float] = {}
+    for name, engine in _pools():
+        if isinstance(engine.pool, TimedAsyncQueuePool):
+            values[(name,)] = getattr(engine.pool.checkout_wait, field)
+    return values
+
+
+REGISTRY.register(
+    Gauge(
+        "db_pool_connections",
+        "Connection pool state by pool",
+        _collect_pool_connections,
+        ("pool", "state"),
+    )
+)
+REGISTRY.register(
+    Gauge(
+        "db_pool_checkouts",
+        "Connection checkouts from the pool",
+        lambda: _collect_checkout_wait("count"),
+        ("pool",),
+        kind="counter",
+    )
+)
+REGISTRY.register(
+    Gauge(
+        "db_pool_checkout_wait_seconds",
+        "Total time spent waiting for a pooled connection",
+        lambda: _collect_checkout_wait("total_seconds"),
+        ("pool",),
+        kind="counter",
+    )
+)
@@ -1,14 +1,139 @@
+from __future__ import annotations
+
+import atexit
+import json
 import logging
+import queue
+import random
+import sys
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Literal, Optional
+
 from rich.logging import RichHandler
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson опционален
+    orjson = None
+
+LogFormat = Literal["rich", "json"]
+
+# Id текущего HTTP-запроса или сообщения RabbitMQ; попадает в каждую JSON-запись
+request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# Атрибуты LogRecord; все остальное в записи — поля из extra=
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord("", logging.INFO, "", 0, "", None, None))) | {
+    "message",
+    "asctime",
+    "request_id",
+}
+
+_listener: Optional[QueueListener] = None
+
+
+class RequestIdFilter(logging.Filter):
+    """Переносит request_id из контекста в запись до передачи ее в другой поток"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id.get()
+        return True
+
+
+class DebugSampler(logging.Filter):
+    """Пропускает только долю rate записей уровня DEBUG; остальные уровни — все"""
+
+    def __init__(self, rate: float) -> None:
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno > logging.DEBUG or random.random() < self.rate
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна строка JSON на запись: ts, level, logger, message, request_id, поля extra и exc"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(
+                timespec="milliseconds"
+            ),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return _dumps(entry)
+
+
+def _dumps(entry: dict[str, Any]) -> str:
+    if orjson is not None:
+        return orjson.dumps(entry, default=str).decode()
+    return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class _LazyQueueHandler(QueueHandler):
+    """
+    QueueHandler, который в потоке приложения только подставляет аргументы в сообщение
+    и превращает исключение в текст; сериализация в JSON и запись — в потоке QueueListener.
+    Стандартный prepare форматирует запись целиком и склеивает traceback с сообщением.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def init_logging(
+    level: str = "INFO", log_format: LogFormat = "rich", debug_sample_rate: float = 1.0
+) -> None:
+    """
+    rich — цветной вывод для разработки; json — однострочный JSON в stdout
+    через QueueHandler/QueueListener, чтобы форматирование и I/O не занимали event loop.
+    debug_sample_rate < 1 прореживает DEBUG-записи в обоих режимах.
+    """
+    global _listener
+    shutdown_logging()
+    handler: logging.Handler
+    if log_format == "json":
+        handler = _LazyQueueHandler(queue.SimpleQueue())
+        stream = logging.StreamHandler(sys.stdout)
+        stream.setFormatter(JsonFormatter())
+        _listener = QueueListener(handler.queue, stream)
+        _listener.start()
+    else:
+        handler = RichHandler(rich_tracebacks=True)
+        handler.setFormatter(logging.Formatter("%(message)s", datefmt="[%X]"))
+    if debug_sample_rate < 1.0:
+        handler.addFilter(DebugSampler(debug_sample_rate))
+    handler.addFilter(RequestIdFilter())
+    logging.basicConfig(level=level, handlers=[handler], force=True)
+
+
+def shutdown_logging() -> None:
+    """Дописать записи из очереди и остановить поток QueueListener"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
 
-def init_logging(level: str = "INFO") -> None:
-    logging.basicConfig(
-        level=level,
-        format="%(message)s",
-        datefmt="[%X]",
-        handlers=[RichHandler(rich_tracebacks=True)],
-    )
+atexit.register(shutdown_logging)
 
 
 def get_logger(name: str) -> logging.Logger:
@@ -0,0 +1,268 @@
+from __future__ import annotations
+
+import bisect
+import inspect
+import time
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Callable, Iterator
+
+from sqlalchemy import event
+
+from comment_service.core.query_budget import record_query
+
+# Границы гистограмм латентности, секунды
+LATENCY_BUCKETS: tuple[float, ...] = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+# Метод репозитория, от имени которого выполняется SQL (метка db_query_duration_seconds)
+db_operation: ContextVar[str] = ContextVar("db_operation", default="other")
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._children: dict[Any, Any] = {}
+
+    def labels(self, *values: str):
+        """
+        Дочерняя серия для набора меток; создается один раз и дальше берется из словаря.
+        При одной метке ключ — само значение, без кортежа.
+        """
+        key = values[0] if len(values) == 1 else values
+        child = self._children.get(key)
+        if child is None:
+            child = self._children[key] = self._new_child()
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def _items(self) -> Iterator[tuple[tuple[str, ...], Any]]:
+        for key, child in list(self._children.items()):
+            yield (key if isinstance(key, tuple) else (key,)), child
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.kind}"
+        yield from self.samples()
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum")
+
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        # Счетчики по корзинам без накопления; кумулятивные значения считаются при выдаче
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = buckets
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def samples(self) -> Iterator[str]:
+        for values, child in self._items():
+            counts = list(child.counts)
+            cumulative = 0
+            for le, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, values, f'le="{_format_value(le)}"')
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, values)
+            yield f"{self.name}_sum{labels} {_format_value(child.sum)}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+class Gauge(_Metric):
+    """
+    Значения снимаются функцией collect в момент выдачи /metrics (пул, кэш, очереди).
+    kind="counter" — для накопительных счетчиков, которые ведут сами компоненты.
+    """
+
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        collect: Callable[[], dict[tuple[str, ...], float]],
+        labelnames: tuple[str, ...] = (),
+        kind: str = "gauge",
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.collect = collect
+        self.kind = kind
+
+    def samples(self) -> Iterator[str]:
+        suffix = "_total" if self.kind == "counter" else ""
+        for values, value in self.collect().items():
+            labels = _format_labels(self.labelnames, values)
+            yield f"{self.name}{suffix}{labels} {_format_value(value)}"
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        """Зарегистрировать метрику; повторная регистрация имени заменяет прежнюю"""
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in list(self._metrics.values()):
+            try:
+                lines.extend(metric.render())
+            except Exception:
+                # Сбой сборщика одной метрики не должен ломать выдачу остальных
+                continue
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+http_request_duration = REGISTRY.register(
+    Histogram(
+        "http_request_duration_seconds",
+        "HTTP request latency by route template and status",
+        ("method", "route", "status"),
+    )
+)
+db_query_duration = REGISTRY.register(
+    Histogram(
+        "db_query_duration_seconds",
+        "SQL statement latency by repository method",
+        ("operation",),
+    )
+)
+http_request_db_queries = REGISTRY.register(
+    Histogram(
+        "http_request_db_queries",
+        "SQL statements issued per HTTP request",
+        ("route",),
+        buckets=(1, 2, 3, 5, 10, 20, 50, 100),
+    )
+)
+mq_publish_duration = REGISTRY.register(
+    Histogram(
+        "mq_publish_duration_seconds",
+        "RabbitMQ publish latency including broker confirm",
+        ("routing_key",),
+    )
+)
+mq_consume_duration = REGISTRY.register(
+    Histogram(
+        "mq_consume_duration_seconds",
+        "Incoming event handling latency by event type and outcome",
+        ("event_type", "outcome"),
+    )
+)
+mq_consumer_lag = REGISTRY.register(
+    Histogram(
+        "mq_consumer_lag_seconds",
+        "Delay between event timestamp and start of handling",
+        ("event_type",),
+        buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0),
+    )
+)
+
+
+def track_db_operations(cls):
+    """
+    Декоратор класса репозитория: публичные async-методы выставляют db_operation,
+    чтобы SQL внутри них попадал в db_query_duration_seconds с меткой метода.
+    """
+    for name, attr in list(vars(cls).items()):
+        if name.startswith("_") or not inspect.iscoroutinefunction(attr):
+            continue
+        setattr(cls, name, _with_operation(attr, name))
+    return cls
+
+
+def _with_operation(fn, operation: str):
+    @wraps(fn)
+    async def wrapper(*args, **kwargs):
+        token = db_operation.set(operation)
+        try:
+            return await fn(*args, **kwargs)
+        finally:
+            db_operation.reset(token)
+
+    return wrapper
+
+
+def instrument_engine(sync_engine) -> None:
+    """Замер времени каждого SQL-запроса через события before/after_cursor_execute"""
+    if getattr(sync_engine, "_query_metrics_installed", False):
+        return
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._query_started = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_query_started", None)
+        if started is not None:
+            elapsed = time.perf_counter() - started
+            db_query_duration.labels(db_operation.get()).observe(elapsed)
+            record_query(statement, elapsed)
+
+    sync_engine._query_metrics_installed = True
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Iterator, Optional
+
+
+@dataclass(slots=True)
+class QueryStats:
+    """SQL-запросы в пределах запроса/блока: число, суммарное время и первые выражения"""
+
+    max_statements: int = 50
+    parent: Optional[QueryStats] = None
+    count: int = 0
+    total_seconds: float = 0.0
+    statements: list[tuple[str, float]] = field(default_factory=list)
+
+    def record(self, statement: str, seconds: float) -> None:
+        stats: Optional[QueryStats] = self
+        # Вложенные трекеры (assert_max_queries вокруг HTTP-запроса) видят те же запросы
+        while stats is not None:
+            stats.count += 1
+            stats.total_seconds += seconds
+            if len(stats.statements) < stats.max_statements:
+                stats.statements.append((statement, seconds))
+            stats = stats.parent
+
+    def slowest(self, limit: int = 10) -> list[tuple[str, float]]:
+        return sorted(self.statements, key=lambda item: item[1], reverse=True)[:limit]
+
+    def describe(self, limit: int = 10) -> str:
+        lines = [f"{self.count} queries, {self.total_seconds * 1000:.1f} ms"]
+        for statement, seconds in self.slowest(limit):
+            lines.append(f"  {seconds * 1000:8.2f} ms  {' '.join(statement.split())[:300]}")
+        return "\n".join(lines)
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def record_query(statement: str, seconds: float) -> None:
+    """Вызывается из after_cursor_execute; вне трекера ничего не делает"""
+    stats = _current.get()
+    if stats is not None:
+        stats.record(statement, seconds)
+
+
+@contextmanager
+def track_queries(max_statements: int = 50) -> Iterator[QueryStats]:
+    """Считать SQL-запросы, выполненные внутри блока (в том же контексте asyncio)"""
+    stats = QueryStats(max_statements=max_statements, parent=_current.get())
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def assert_max_queries(limit: int) -> Iterator[QueryStats]:
+    """
+    Проверка для тестов и бенчмарков: блок выполняет не больше limit SQL-запросов.
+
+        with assert_max_queries(3):
+            await client.get("/api/v1/post/comments/1")
+    """
+    with track_queries() as stats:
+        yield stats
+    if stats.count > limit:
+        raise AssertionError(f"Expected at most {limit} queries, got {stats.describe()}")
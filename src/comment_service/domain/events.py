@@ -1,7 +1,7 @@
 from __future__ import annotations
 
-from pydantic import BaseModel
-from datetime import datetime
+from pydantic import BaseModel, Field
+from datetime import datetime, timezone
 from typing import Literal, Optional
 
 
@@ -9,7 +9,7 @@ class CommentEvent(BaseModel):
     """Базовое событие комментария"""
 
     event_type: str
-    timestamp: datetime = datetime.utcnow()
+    timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     service: str = "comment-service"
 
 
@@ -4,6 +4,9 @@ from dataclasses import dataclass, field
 from datetime import datetime
 from typing import Literal
 
+# Порядок сортировки лент комментариев
+SortOrder = Literal["oldest", "newest", "top"]
+
 
 @dataclass
 class Author:
@@ -24,7 +27,19 @@ class Comment:
     author_avatar: str | None
     text: str
     parent_id: int | None  # None = корневой комментарий
+    root_id: int | None = None  # корневой комментарий ветки (для корня — он сам)
+    depth: int = 0  # уровень вложенности, 0 = корневой
     rating: int = 0  # сумма лайков/дизлайков
     is_positive: bool = True  # общий тон (больше лайков = True)
+    children_count: int = 0  # количество прямых ответов
     created_at: datetime = field(default_factory=datetime.utcnow)
     updated_at: datetime = field(default_factory=datetime.utcnow)
+    deleted_at: datetime | None = None  # мягко удален (показывается как "[deleted]")
+
+
+@dataclass(frozen=True)
+class EntityVersion:
+    """Версия ленты комментариев сущности: растет при каждом создании комментария и реакции"""
+
+    version: int
+    updated_at: datetime | None = None
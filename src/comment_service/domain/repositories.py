@@ -1,14 +1,24 @@
 from __future__ import annotations
 
-from typing import List, Optional, Protocol, Tuple, Literal
+from datetime import datetime
+from typing import Dict, List, Literal, Optional, Protocol, Sequence, Tuple
 
-from comment_service.domain.models import Comment
+from comment_service.domain.events import CommentEvent
+from comment_service.domain.models import Comment, EntityVersion, SortOrder
 
 
 class CommentRepository(Protocol):
     """Репозиторий для работы с комментариями"""
 
-    async def create(self, comment: Comment) -> Comment: ...
+    async def create(self, comment: Comment, commit: bool = True) -> Comment:
+        """Сохранить комментарий; commit=False оставляет транзакцию открытой"""
+        ...
+
+    async def add_outbox_events(self, events: Sequence[CommentEvent]) -> None:
+        """Добавить доменные события в outbox текущей транзакции"""
+        ...
+
+    async def commit(self) -> None: ...
 
     async def get_by_id(self, comment_id: int) -> Optional[Comment]: ...
 
@@ -17,10 +27,12 @@ class CommentRepository(Protocol):
         entity_id: int,
         entity_type: str,
         cursor: Optional[str] = None,
-        limit: int = 5,
+        limit: Optional[int] = None,
+        sort: SortOrder = "oldest",
     ) -> Tuple[List[Comment], Optional[str]]:
         """
-        Получить корневые комментарии с курсорной пагинацией.
+        Получить корневые комментарии с курсорной пагинацией в порядке sort.
+        limit=None — размер страницы из курсора или по умолчанию.
         Возвращает (список комментариев, следующий курсор или None).
         """
         ...
@@ -29,20 +41,34 @@ class CommentRepository(Protocol):
         self,
         parent_id: int,
         cursor: Optional[str] = None,
-        limit: int = 5,
+        limit: Optional[int] = None,
+        sort: SortOrder = "oldest",
     ) -> Tuple[List[Comment], Optional[str]]:
         """
-        Получить дочерние комментарии с курсорной пагинацией.
+        Получить дочерние комментарии с курсорной пагинацией в порядке sort.
+        limit=None — размер страницы из курсора или по умолчанию.
         Возвращает (список комментариев, следующий курсор или None).
         """
         ...
 
-    async def count_children(self, parent_id: int) -> int:
-        """Подсчитать количество прямых дочерних комментариев"""
+    async def list_first_children(
+        self, parent_ids: Sequence[int], limit: int
+    ) -> Dict[int, List[Comment]]:
+        """
+        Получить первые limit ответов (в порядке oldest) для каждого из комментариев
+        одним запросом. Возвращает {parent_id: [ответы]}.
+        """
+        ...
+
+    async def list_subtree(self, comment_id: int, limit: int) -> Tuple[List[Comment], bool]:
+        """
+        Получить комментарий и всех его потомков в порядке обхода ветки в глубину.
+        Возвращает (не более limit комментариев, есть ли еще).
+        """
         ...
 
-    async def update_rating(self, comment_id: int, rating: int, is_positive: bool) -> None:
-        """Обновить рейтинг комментария"""
+    async def count_children(self, parent_id: int) -> int:
+        """Количество прямых дочерних комментариев (денормализованный счетчик)"""
         ...
 
     async def get_user_reaction(
@@ -51,19 +77,64 @@ class CommentRepository(Protocol):
         """Получить реакцию пользователя на комментарий (like/dislike или None)"""
         ...
 
+    async def get_user_reactions(
+        self, comment_ids: Sequence[int], user_id: int
+    ) -> Dict[int, Literal["like", "dislike"]]:
+        """
+        Получить реакции пользователя на набор комментариев одним запросом.
+        Возвращает {comment_id: reaction}; комментарии без реакции отсутствуют.
+        """
+        ...
+
     async def set_user_reaction(
         self,
         comment_id: int,
         user_id: int,
         reaction: Optional[Literal["like", "dislike"]],
-    ) -> None:
-        """Установить реакцию пользователя (like/dislike или None для удаления)"""
+    ) -> Optional[Comment]:
+        """
+        Установить реакцию пользователя (like/dislike или None для удаления).
+        Возвращает комментарий с обновленным рейтингом или None, если его нет.
+        """
         ...
 
-    async def delete_by_entity(self, entity_id: int, entity_type: str) -> int:
-        """Удалить все комментарии к указанной сущности. Возвращает количество удаленных комментариев."""
+    async def apply_reactions(
+        self, reactions: Dict[int, Dict[int, Optional[Literal["like", "dislike"]]]]
+    ) -> List[Comment]:
+        """
+        Записать пакет реакций {comment_id: {user_id: reaction}} одной транзакцией
+        с одним обновлением счетчиков на комментарий. Возвращает обновленные комментарии.
+        """
+        ...
+
+    async def soft_delete(self, comment_id: int, commit: bool = True) -> Optional[Comment]:
+        """
+        Пометить комментарий удаленным и обновить счетчики.
+        Возвращает комментарий или None, если его нет или он уже удален.
+        """
+        ...
+
+    async def purge_deleted(self, deleted_before: datetime, limit: int) -> int:
+        """Физически удалить надгробия без ответов, удаленные раньше deleted_before"""
+        ...
+
+    async def delete_by_entity(
+        self,
+        entity_id: int,
+        entity_type: str,
+        batch_size: int = 1000,
+        max_batches_per_second: float = 0.0,
+    ) -> int:
+        """
+        Удалить все комментарии к указанной сущности пачками по batch_size (каждая — своя
+        транзакция). Возвращает количество удаленных комментариев.
+        """
         ...
 
     async def count_by_entity(self, entity_id: int, entity_type: str) -> int:
         """Подсчитать количество комментариев к указанной сущности (включая дочерние)"""
         ...
+
+    async def get_entity_version(self, entity_id: int, entity_type: str) -> Optional[EntityVersion]:
+        """Текущая версия ленты сущности (None, если комментариев нет)"""
+        ...
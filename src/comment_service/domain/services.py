@@ -1,20 +1,86 @@
 from __future__ import annotations
 
 import base64
+import binascii
 import json
+import struct
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
 from typing import Optional
 
+from comment_service.domain.models import SortOrder
 
-def encode_cursor(comment_id: int) -> str:
-    """Закодировать курсор из ID комментария"""
-    data = {"id": comment_id}
-    return base64.b64encode(json.dumps(data).encode()).decode()
+DEFAULT_PAGE_SIZE = 5
 
+# Бинарный курсор: версия, флаги (порядок сортировки), размер страницы, ключ, id.
+# Ключ — created_at в мкс UTC для oldest/newest или rating для top.
+_CURSOR_VERSION = 1
+_CURSOR_FORMAT = struct.Struct("!BBHqq")
+_SORT_CODES: dict[SortOrder, int] = {"oldest": 0, "newest": 1, "top": 2}
+_SORT_BY_CODE = {code: sort for sort, code in _SORT_CODES.items()}
+_SORT_MASK = 0x03
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+class InvalidCursorError(ValueError):
+    """Курсор не декодируется или выдан для другого порядка сортировки"""
+
+
+@dataclass(frozen=True)
+class Cursor:
+    """Позиция keyset-пагинации: ключ сортировки и id последнего выданного комментария"""
+
+    id: int
+    sort: SortOrder = "oldest"
+    created_at: Optional[datetime] = None  # oldest/newest; None у курсоров старого формата
+    rating: Optional[int] = None  # top
+    limit: Optional[int] = None
+
+
+def _to_micros(value: datetime) -> int:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return (value - _EPOCH) // timedelta(microseconds=1)
+
+
+def encode_cursor(
+    sort: SortOrder,
+    comment_id: int,
+    created_at: datetime,
+    rating: int = 0,
+    limit: Optional[int] = None,
+) -> str:
+    """Закодировать курсор в компактную urlsafe-base64 строку (27 символов)"""
+    key = rating if sort == "top" else _to_micros(created_at)
+    data = _CURSOR_FORMAT.pack(_CURSOR_VERSION, _SORT_CODES[sort], limit or 0, key, comment_id)
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> Optional[Cursor]:
+    """Декодировать курсор; поддерживает старый формат base64(JSON {"id": ...})"""
+    try:
+        data = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+    except (binascii.Error, ValueError):
+        data = b""
+
+    if len(data) == _CURSOR_FORMAT.size and data[0] == _CURSOR_VERSION:
+        _, flags, limit, key, comment_id = _CURSOR_FORMAT.unpack(data)
+        sort = _SORT_BY_CODE.get(flags & _SORT_MASK)
+        if sort is None:
+            return None
+        if sort == "top":
+            return Cursor(id=comment_id, sort=sort, rating=key, limit=limit or None)
+        return Cursor(
+            id=comment_id,
+            sort=sort,
+            created_at=_EPOCH + timedelta(microseconds=key),
+            limit=limit or None,
+        )
 
-def decode_cursor(cursor: str) -> Optional[int]:
-    """Декодировать курсор в ID комментария"""
     try:
-        data = json.loads(base64.b64decode(cursor.encode()).decode())
-        return data.get("id")
+        legacy = json.loads(base64.b64decode(cursor.encode()).decode())
+        comment_id = legacy.get("id")
+        return Cursor(id=int(comment_id)) if comment_id else None
     except Exception:
         return None
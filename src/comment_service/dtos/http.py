@@ -20,10 +20,13 @@ class CommentDto(BaseModel):
     isPositive: bool
     rating: int
     parentId: Optional[int] = None
+    depth: int = 0
     childrenCount: int
     isLikedByMe: bool
     isDislikedByMe: bool
     type: Literal["post", "game"]
+    # Удаленный комментарий в ветке: текст и автор скрыты
+    isDeleted: bool = False
 
 
 class CommentListResponse(BaseModel):
@@ -32,6 +35,18 @@ class CommentListResponse(BaseModel):
     nextCursor: Optional[str] = None
 
 
+class CommentTreeItemDto(CommentDto):
+    replies: list[CommentDto] = Field(default_factory=list)
+    # Курсор для продолжения ответов через /children, если показаны не все
+    repliesCursor: Optional[str] = None
+
+
+class CommentTreeResponse(BaseModel):
+    items: list[CommentTreeItemDto]
+    hasMore: bool
+    nextCursor: Optional[str] = None
+
+
 class CreateCommentRequest(BaseModel):
     text: str = Field(..., min_length=1, max_length=10000)
 
@@ -1,9 +1,15 @@
+import asyncio
 import json
 import logging
+import time
+from datetime import datetime, timezone
+from uuid import uuid4
 import aio_pika
-from aio_pika.abc import AbstractRobustConnection
-from typing import Dict, Callable, Any
+from aio_pika.abc import AbstractIncomingMessage, AbstractRobustConnection
+from typing import AsyncIterator, Dict, Callable, Any
 from ..core.config import Settings, load_settings
+from ..core.logging import request_id
+from ..core.metrics import mq_consume_duration, mq_consumer_lag
 
 logger = logging.getLogger(__name__)
 
@@ -14,23 +20,26 @@ class EventConsumer:
         self.connection: AbstractRobustConnection = None
         self.channel: aio_pika.abc.AbstractChannel = None
         self.handlers: Dict[str, Callable] = {}
+        self.concurrency = self.settings.consumer_concurrency
+        self.processed = 0
+        self.failed = 0
 
     async def connect(self):
         try:
             self.connection = await aio_pika.connect_robust(self.settings.rabbitmq_url)
             self.channel = await self.connection.channel()
 
-            await self.channel.set_qos(prefetch_count=10)
+            await self.channel.set_qos(prefetch_count=self.settings.consumer_prefetch_count)
 
             logger.info("Event consumer connected to RabbitMQ successfully")
 
         except Exception as e:
-            logger.error(f"Failed to connect to RabbitMQ: {e}")
+            logger.error("Failed to connect to RabbitMQ: %s", e)
             raise
 
     def register_handler(self, event_type: str, handler: Callable[[Dict[str, Any]], None]):
         self.handlers[event_type] = handler
-        logger.debug(f"Handler registered for event type: {event_type}")
+        logger.debug("Handler registered for event type: %s", event_type)
 
     async def start_consuming(self, queue_name: str = "comments_events"):
         if not self.channel:
@@ -56,36 +65,154 @@ class EventConsumer:
         await queue.bind(exchange, "posts.deleted")
         await queue.bind(exchange, "posts.post_deleted")
 
-        logger.info(f"Started consuming from queue: {queue_name}")
+        logger.info("Started consuming from queue: %s", queue_name)
 
         async with queue.iterator() as queue_iter:
-            async for message in queue_iter:
-                async with message.process():
-                    try:
-                        event_data = json.loads(message.body.decode())
-                        routing_key = message.routing_key or ""
-
-                        # Определяем тип события по routing_key или по event_type в теле сообщения
-                        if routing_key.startswith("comments."):
-                            event_type = event_data.get("event_type")
-                        elif routing_key == "posts.deleted" or routing_key == "posts.post_deleted":
-                            event_type = "post_deleted"
-                        else:
-                            event_type = event_data.get("event_type")
-
-                        if event_type and event_type in self.handlers:
-                            await self.handlers[event_type](event_data)
-                            logger.debug(
-                                f"Event processed: {event_type} (routing_key: {routing_key})"
-                            )
-                        else:
-                            logger.warning(
-                                f"No handler for event type: {event_type} (routing_key: {routing_key})"
-                            )
-
-                    except Exception as e:
-                        logger.error(f"Error processing message: {e}")
-                        # Message will be rejected and go to DLQ
+            await self.consume(queue_iter)
+
+    async def consume(self, messages: AsyncIterator[AbstractIncomingMessage]):
+        """
+        Обработать поток сообщений. При concurrency > 1 сообщения раскладываются по воркерам
+        по ключу (entity_type, entity_id): события одной сущности обрабатываются по порядку,
+        разных сущностей — параллельно. Подойдет любой асинхронный итератор объектов
+        с body, routing_key, ack/nack/reject (например, in-memory очередь в тестах).
+        """
+        if self.concurrency <= 1:
+            async for message in messages:
+                decoded = await self._decode(message)
+                if decoded is not None:
+                    await self.handle_message(message, *decoded)
+            return
+
+        shards: list[asyncio.Queue] = [
+            asyncio.Queue(maxsize=self.settings.consumer_prefetch_count)
+            for _ in range(self.concurrency)
+        ]
+        workers = [asyncio.create_task(self._worker(shard)) for shard in shards]
+        try:
+            async for message in messages:
+                decoded = await self._decode(message)
+                if decoded is None:
+                    continue
+                event_type, event_data = decoded
+                shard = shards[hash(self._ordering_key(event_type, event_data)) % len(shards)]
+                await shard.put((message, event_type, event_data))
+        finally:
+            await self._drain(shards, workers)
+
+    async def _worker(self, shard: asyncio.Queue):
+        while True:
+            message, event_type, event_data = await shard.get()
+            try:
+                await self.handle_message(message, event_type, event_data)
+            finally:
+                shard.task_done()
+
+    async def _drain(self, shards: list[asyncio.Queue], workers: list[asyncio.Task]):
+        """Дождаться обработки уже полученных сообщений, остальные вернуть в очередь"""
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(shard.join() for shard in shards)),
+                timeout=self.settings.consumer_drain_timeout_seconds,
+            )
+        except asyncio.TimeoutError:
+            logger.warning("Consumer drain timed out, requeueing unprocessed messages")
+
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+        for shard in shards:
+            while not shard.empty():
+                message, _, _ = shard.get_nowait()
+                await message.nack(requeue=True)
+
+    async def _decode(self, message: AbstractIncomingMessage) -> tuple[str | None, dict] | None:
+        try:
+            event_data = json.loads(message.body.decode())
+        except (UnicodeDecodeError, ValueError) as e:
+            logger.error("Malformed message (routing_key: %s): %s", message.routing_key, e)
+            await message.reject(requeue=False)
+            return None
+
+        routing_key = message.routing_key or ""
+        # Определяем тип события по routing_key или по event_type в теле сообщения
+        if routing_key == "posts.deleted" or routing_key == "posts.post_deleted":
+            event_type = "post_deleted"
+        else:
+            event_type = event_data.get("event_type")
+        return event_type, event_data
+
+    @staticmethod
+    def _ordering_key(event_type: str | None, event_data: dict) -> tuple:
+        if event_type == "post_deleted":
+            return ("post", str(event_data.get("post_id") or event_data.get("postId")))
+        if "entity_id" in event_data:
+            return (event_data.get("entity_type"), str(event_data["entity_id"]))
+        return (event_type,)
+
+    async def handle_message(
+        self, message: AbstractIncomingMessage, event_type: str | None, event_data: dict
+    ):
+        """Вызвать обработчик и подтвердить сообщение; при ошибке оно уходит в DLQ"""
+        # message_id (id строки outbox у наших событий) связывает записи лога одного сообщения
+        token = request_id.set(message.message_id or uuid4().hex)
+        try:
+            await self._handle_message(message, event_type, event_data)
+        finally:
+            request_id.reset(token)
+
+    async def _handle_message(
+        self, message: AbstractIncomingMessage, event_type: str | None, event_data: dict
+    ):
+        routing_key = message.routing_key or ""
+        metric_type = event_type if event_type in self.handlers else "unhandled"
+        started = time.perf_counter()
+        self._observe_lag(metric_type, event_data)
+        try:
+            if event_type and event_type in self.handlers:
+                await self.handlers[event_type](event_data)
+                logger.debug("Event processed: %s (routing_key: %s)", event_type, routing_key)
+            else:
+                logger.warning(
+                    "No handler for event type: %s (routing_key: %s)", event_type, routing_key
+                )
+        except asyncio.CancelledError:
+            # Остановка посреди обработки: сообщение вернется в очередь
+            await message.nack(requeue=True)
+            raise
+        except Exception as e:
+            logger.error("Error processing message: %s", e)
+            self.failed += 1
+            await message.reject(requeue=False)
+            mq_consume_duration.labels(metric_type, "failed").observe(time.perf_counter() - started)
+            return
+
+        self.processed += 1
+        await message.ack()
+        mq_consume_duration.labels(metric_type, "ok").observe(time.perf_counter() - started)
+
+    @staticmethod
+    def _observe_lag(event_type: str, event_data: dict):
+        """Задержка от времени события (поле timestamp) до начала обработки"""
+        timestamp = event_data.get("timestamp")
+        if not isinstance(timestamp, str):
+            return
+        try:
+            produced = datetime.fromisoformat(timestamp)
+        except ValueError:
+            return
+        if produced.tzinfo is None:
+            produced = produced.replace(tzinfo=timezone.utc)
+        lag = (datetime.now(timezone.utc) - produced).total_seconds()
+        mq_consumer_lag.labels(event_type).observe(max(lag, 0.0))
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "concurrency": self.concurrency,
+            "processed": self.processed,
+            "failed": self.failed,
+        }
 
     async def close(self):
         if self.connection:
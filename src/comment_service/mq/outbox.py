@@ -0,0 +1,114 @@
+import asyncio
+import logging
+from datetime import timedelta
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from ..core.config import Settings
+from ..repo.sql.models import utcnow
+from ..repo.sql.repositories import SQLCommentRepository
+from ..domain.events import CommentCountUpdatedEvent
+from .publisher import CountUpdateAggregator, EventPublisher
+
+COUNT_UPDATED_ROUTING_KEY = "comments.comment_count_updated"
+
+logger = logging.getLogger(__name__)
+
+
+class OutboxRelay:
+    """
+    Фоновая публикация событий из таблицы outbox_events.
+    Пачка публикуется с подтверждениями брокера; подтвержденные строки удаляются в той же
+    транзакции, неудачные остаются и повторяются с экспоненциальной паузой (at-least-once,
+    message_id = id строки outbox для дедупликации у потребителей). Пауза считается для
+    каждой строки по числу ее попыток, поэтому событие, которое брокер не принимает, не
+    задерживает остальные; после max_attempts неудач строка откладывается — остается
+    в outbox, но больше не публикуется, пока attempts не сброшен вручную.
+    Счетчики comment_count_updated при включенном агрегаторе удаляются из outbox сразу после
+    передачи агрегатору: при аварийной остановке может потеряться не более одного окна
+    обновлений, следующее изменение счетчика восстановит значение.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        publisher: EventPublisher,
+        settings: Settings,
+        count_aggregator: CountUpdateAggregator | None = None,
+    ):
+        self.session_factory = session_factory
+        self.publisher = publisher
+        # Если задан, comment_count_updated не публикуются напрямую, а схлопываются по сущности
+        self.count_aggregator = count_aggregator
+        self.batch_size = settings.outbox_batch_size
+        self.poll_interval = settings.outbox_poll_interval_seconds
+        self.max_backoff = settings.outbox_max_backoff_seconds
+        self.max_attempts = settings.outbox_max_attempts
+
+    async def run(self):
+        backoff = self.poll_interval
+        while True:
+            try:
+                published = await self.drain_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                backoff = min(backoff * 2, self.max_backoff)
+                logger.error("Outbox relay failed, retrying in %.1fs: %s", backoff, e)
+                await asyncio.sleep(backoff)
+                continue
+
+            backoff = self.poll_interval
+            # Полная пачка — в outbox, вероятно, есть еще события: продолжаем без паузы
+            if published < self.batch_size:
+                await asyncio.sleep(self.poll_interval)
+
+    async def drain_once(self) -> int:
+        """Опубликовать одну пачку; возвращает число опубликованных событий"""
+        async with self.session_factory() as session:
+            repo = SQLCommentRepository(session)
+            rows = await repo.lock_outbox_batch(self.batch_size, self.max_attempts)
+            if not rows:
+                await session.commit()
+                return 0
+
+            results = await asyncio.gather(
+                *(self._publish(row) for row in rows), return_exceptions=True
+            )
+            published = [row.id for row, res in zip(rows, results) if res is None]
+            failed = [row for row, res in zip(rows, results) if res is not None]
+
+            now = utcnow()
+            retry_at = {row.id: now + self.retry_delay(row.attempts + 1) for row in failed}
+            parked = [row.id for row in failed if row.attempts + 1 >= self.max_attempts]
+            await repo.delete_outbox_events(published)
+            await repo.mark_outbox_failed(retry_at)
+            await session.commit()
+
+        if parked:
+            logger.error(
+                "Outbox events %s parked after %s failed attempts", parked, self.max_attempts
+            )
+        if failed:
+            error = next(res for res in results if res is not None)
+            message = f"{len(failed)} of {len(rows)} outbox events not published: {error}"
+            # Ни одного подтверждения — вероятно, брокер недоступен: общая пауза в run();
+            # отдельные неудачные строки повторяются по своему next_attempt_at
+            if not published:
+                raise RuntimeError(message)
+            logger.warning(message)
+        if published:
+            logger.debug("Outbox relay published %s events", len(published))
+        return len(published)
+
+    def retry_delay(self, attempts: int) -> timedelta:
+        """Пауза перед следующей попыткой строки после attempts неудач"""
+        return timedelta(seconds=min(self.poll_interval * 2**attempts, self.max_backoff))
+
+    async def _publish(self, row):
+        if self.count_aggregator is not None and row.routing_key == COUNT_UPDATED_ROUTING_KEY:
+            self.count_aggregator.add(CommentCountUpdatedEvent.model_validate_json(row.payload))
+            return
+        await self.publisher.publish_raw(
+            row.routing_key, row.payload.encode(), message_id=str(row.id)
+        )
@@ -1,8 +1,11 @@
-import json
+import asyncio
 import logging
+import time
 import aio_pika
 from aio_pika.abc import AbstractRobustConnection
 from ..core.config import Settings, load_settings
+from ..core.metrics import mq_publish_duration
+from ..domain.events import CommentCountUpdatedEvent
 
 logger = logging.getLogger(__name__)
 
@@ -17,7 +20,8 @@ class EventPublisher:
     async def connect(self):
         try:
             self.connection = await aio_pika.connect_robust(self.settings.rabbitmq_url)
-            self.channel = await self.connection.channel()
+            # publisher confirms: publish() завершается только после подтверждения брокера
+            self.channel = await self.connection.channel(publisher_confirms=True)
 
             self.exchange = await self.channel.declare_exchange(
                 "blog_events", aio_pika.ExchangeType.TOPIC, durable=True
@@ -26,32 +30,109 @@ class EventPublisher:
             logger.info("Event publisher connected to RabbitMQ successfully")
 
         except Exception as e:
-            logger.error(f"Failed to connect to RabbitMQ: {e}")
+            logger.error("Failed to connect to RabbitMQ: %s", e)
             raise
 
     async def publish(self, event):
+        await self.publish_raw(
+            routing_key=f"comments.{event.event_type}",
+            body=event.model_dump_json().encode(),
+        )
+
+    async def publish_raw(self, routing_key: str, body: bytes, message_id: str | None = None):
+        """Опубликовать готовое тело сообщения и дождаться подтверждения брокера"""
         if not self.exchange:
-            logger.error("Event publisher not connected")
-            return
+            raise RuntimeError("Event publisher not connected")
 
         try:
-            message_body = json.dumps(event.dict()).encode()
             message = aio_pika.Message(
-                body=message_body,
+                body=body,
                 content_type="application/json",
                 delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+                message_id=message_id,
             )
-
-            routing_key = f"comments.{event.event_type}"
+            started = time.perf_counter()
             await self.exchange.publish(message, routing_key=routing_key)
+            mq_publish_duration.labels(routing_key).observe(time.perf_counter() - started)
 
-            logger.debug(f"Event published: {event.event_type} -> {routing_key}")
+            logger.debug("Event published -> %s", routing_key)
 
         except Exception as e:
-            logger.error(f"Failed to publish event: {e}")
+            logger.error("Failed to publish event: %s", e)
             raise
 
     async def close(self):
         if self.connection:
             await self.connection.close()
             logger.info("Event publisher connection closed")
+
+
+class CountUpdateAggregator:
+    """
+    Схлопывает comment_count_updated по (entity_type, entity_id): за окно window_seconds
+    на сущность публикуется одно событие с последним значением счетчика.
+    Неопубликованные события возвращаются в очередь, если за это время не пришло более свежее.
+    """
+
+    def __init__(self, publisher: EventPublisher, window_seconds: float):
+        self.publisher = publisher
+        self.window_seconds = window_seconds
+        self._pending: dict[tuple[str, int], CommentCountUpdatedEvent] = {}
+        self._task: asyncio.Task | None = None
+        self.received = 0
+        self.published = 0
+
+    def add(self, event: CommentCountUpdatedEvent):
+        key = (event.entity_type, event.entity_id)
+        current = self._pending.get(key)
+        if current is None or event.timestamp >= current.timestamp:
+            self._pending[key] = event
+        self.received += 1
+
+    async def flush(self) -> int:
+        pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        events = list(pending.values())
+        results = await asyncio.gather(
+            *(self.publisher.publish(event) for event in events), return_exceptions=True
+        )
+        published = 0
+        for event, result in zip(events, results):
+            if result is None:
+                published += 1
+            else:
+                self._requeue(event)
+        self.published += published
+        if published < len(events):
+            logger.error("Failed to publish %s count updates, will retry", len(events) - published)
+        return published
+
+    def _requeue(self, event: CommentCountUpdatedEvent):
+        key = (event.entity_type, event.entity_id)
+        if key not in self._pending:
+            self._pending[key] = event
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.window_seconds)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error("Count update flush failed: %s", e)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def close(self):
+        """Остановить фоновый сброс и опубликовать накопленное"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
@@ -14,10 +14,14 @@ def comment_to_domain(model: m.CommentModel) -> Comment:
         author_avatar=model.author_avatar,
         text=model.text,
         parent_id=model.parent_id,
+        root_id=model.root_id,
+        depth=model.depth,
         rating=model.rating,
         is_positive=model.is_positive,
+        children_count=model.children_count,
         created_at=model.created_at,
         updated_at=model.updated_at,
+        deleted_at=model.deleted_at,
     )
 
 
@@ -31,8 +35,12 @@ def comment_to_model(domain: Comment) -> m.CommentModel:
         author_avatar=domain.author_avatar,
         text=domain.text,
         parent_id=domain.parent_id,
+        root_id=domain.root_id,
+        depth=domain.depth,
         rating=domain.rating,
         is_positive=domain.is_positive,
+        children_count=domain.children_count,
         created_at=domain.created_at,
         updated_at=domain.updated_at,
+        deleted_at=domain.deleted_at,
     )
@@ -3,7 +3,7 @@ from __future__ import annotations
 from datetime import datetime, timezone
 from typing import Literal
 
-from sqlalchemy import Boolean, DateTime, ForeignKey, Integer, String, Text
+from sqlalchemy import BigInteger, Boolean, DateTime, ForeignKey, Index, Integer, String, Text, text
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
 
@@ -11,33 +11,89 @@ def utcnow() -> datetime:
     return datetime.now(timezone.utc)
 
 
+def path_segment(comment_id: int) -> str:
+    """Сегмент материализованного пути: id фиксированной ширины, чтобы сортировка
+    строк совпадала с обходом дерева в глубину"""
+    return f"{comment_id:010d}/"
+
+
 class Base(DeclarativeBase):
     pass
 
 
 class CommentModel(Base):
     __tablename__ = "comments"
+    __table_args__ = (
+        # Корневые комментарии сущности по времени (sort=oldest, newest — обратным обходом);
+        # надгробия с ответами показываются в лентах как "[deleted]" и входят в индекс
+        Index(
+            "ix_comments_root_listing",
+            "entity_type",
+            "entity_id",
+            "created_at",
+            "id",
+            postgresql_where=text("parent_id IS NULL"),
+            sqlite_where=text("parent_id IS NULL"),
+        ),
+        # Корневые комментарии сущности по рейтингу (sort=top)
+        Index(
+            "ix_comments_root_top",
+            "entity_type",
+            "entity_id",
+            "rating",
+            "id",
+            postgresql_where=text("parent_id IS NULL"),
+            sqlite_where=text("parent_id IS NULL"),
+        ),
+        # Ответы на комментарий по времени (list_children), а также FK parent_id
+        Index("ix_comments_parent_listing", "parent_id", "created_at", "id"),
+        # Ответы на комментарий по рейтингу
+        Index("ix_comments_parent_top", "parent_id", "rating", "id"),
+        # Все комментарии сущности (удаление и сверка счетчиков)
+        Index("ix_comments_entity", "entity_type", "entity_id", "id"),
+        # Поддерево ветки одним диапазонным сканированием (list_subtree)
+        Index("ix_comments_thread", "root_id", "path"),
+        # Удаленные комментарии, ожидающие физического удаления (TombstonePurger)
+        Index(
+            "ix_comments_deleted",
+            "deleted_at",
+            postgresql_where=text("deleted_at IS NOT NULL"),
+            sqlite_where=text("deleted_at IS NOT NULL"),
+        ),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
-    entity_id: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
-    entity_type: Mapped[Literal["post", "game"]] = mapped_column(
-        String(10), nullable=False, index=True
-    )
+    entity_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    entity_type: Mapped[Literal["post", "game"]] = mapped_column(String(10), nullable=False)
     author_id: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
     author_username: Mapped[str] = mapped_column(String(255), nullable=False)
     author_avatar: Mapped[str | None] = mapped_column(String(512))
     text: Mapped[str] = mapped_column(Text, nullable=False)
-    parent_id: Mapped[int | None] = mapped_column(
-        ForeignKey("comments.id", ondelete="CASCADE"), index=True
-    )
+    parent_id: Mapped[int | None] = mapped_column(ForeignKey("comments.id", ondelete="CASCADE"))
+    # Материализованный путь: корень ветки, глубина и путь из id предков (включая себя)
+    root_id: Mapped[int | None] = mapped_column(Integer)
+    depth: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    # Диапазонный поиск и сортировка по path рассчитаны на побайтовое сравнение: в PostgreSQL
+    # столбец в collation "C" (порядок "/" и цифр не зависит от локали), в SQLite это BINARY
+    path: Mapped[str | None] = mapped_column(Text().with_variant(Text(collation="C"), "postgresql"))
     rating: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    likes_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    dislikes_count: Mapped[int] = mapped_column(
+        Integer, default=0, server_default="0", nullable=False
+    )
+    # Денормализованный счетчик прямых ответов, поддерживается при записи
+    children_count: Mapped[int] = mapped_column(
+        Integer, default=0, server_default="0", nullable=False
+    )
     is_positive: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
     created_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True), default=utcnow, nullable=False, index=True
+        DateTime(timezone=True), default=utcnow, nullable=False
     )
     updated_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), default=utcnow, onupdate=utcnow, nullable=False
     )
+    # Мягкое удаление: строка остается надгробием в ветке до фоновой очистки
+    deleted_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
 
     # Relationships
     parent: Mapped["CommentModel | None"] = relationship(
@@ -53,12 +109,52 @@ class CommentModel(Base):
 
 class CommentReactionModel(Base):
     __tablename__ = "comment_reactions"
+    __table_args__ = (
+        # Одна реакция на пользователя; индекс также обслуживает поиск по comment_id
+        Index("uq_comment_reactions_comment_user", "comment_id", "user_id", unique=True),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     comment_id: Mapped[int] = mapped_column(
-        ForeignKey("comments.id", ondelete="CASCADE"), nullable=False, index=True
+        ForeignKey("comments.id", ondelete="CASCADE"), nullable=False
     )
     user_id: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
     reaction: Mapped[Literal["like", "dislike"]] = mapped_column(String(10), nullable=False)
 
     comment: Mapped[CommentModel] = relationship(back_populates="reactions")
+
+
+class CommentCountModel(Base):
+    """Денормализованный счетчик комментариев сущности (включая ответы)"""
+
+    __tablename__ = "comment_counts"
+
+    entity_type: Mapped[Literal["post", "game"]] = mapped_column(String(10), primary_key=True)
+    entity_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    comment_count: Mapped[int] = mapped_column(
+        Integer, default=0, server_default="0", nullable=False
+    )
+    # Растет при каждом изменении ленты (комментарий, реакция) — основа ETag
+    version: Mapped[int] = mapped_column(BigInteger, default=0, server_default="0", nullable=False)
+    updated_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+
+
+class OutboxEventModel(Base):
+    """
+    Transactional outbox: доменные события пишутся в той же транзакции, что и изменения,
+    и публикуются в RabbitMQ фоновым OutboxRelay (доставка at-least-once)
+    """
+
+    __tablename__ = "outbox_events"
+
+    id: Mapped[int] = mapped_column(
+        BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True
+    )
+    routing_key: Mapped[str] = mapped_column(String(100), nullable=False)
+    payload: Mapped[str] = mapped_column(Text, nullable=False)
+    attempts: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    # Неудачная строка повторяется не раньше этого времени (экспоненциальная пауза по attempts)
+    next_attempt_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=utcnow, nullable=False
+    )
@@ -1,29 +1,243 @@
 from __future__ import annotations
 
-from typing import List, Literal, Optional, Tuple
+import asyncio
+import time
+from dataclasses import dataclass, replace
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Literal, Optional, Sequence, Tuple
 
-from sqlalchemy import and_, delete, func, select
+from sqlalchemy import and_, case, delete, func, or_, select, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
 
-from comment_service.domain.models import Comment
+from comment_service.core.metrics import track_db_operations
+from comment_service.domain.events import CommentEvent
+from comment_service.domain.models import Comment, EntityVersion, SortOrder
 from comment_service.domain.repositories import CommentRepository
-from comment_service.domain.services import decode_cursor, encode_cursor
+from comment_service.domain.services import (
+    DEFAULT_PAGE_SIZE,
+    Cursor,
+    InvalidCursorError,
+    decode_cursor,
+    encode_cursor,
+)
 from comment_service.repo.sql import models as m
 from comment_service.repo.sql import mappers
 
+# Пар (comment_id, user_id) в одном многострочном выражении: держит число параметров
+# ниже лимитов SQLite и asyncpg
+REACTION_CHUNK_SIZE = 500
 
+# В ленты попадают живые комментарии и надгробия, у которых остались живые потомки:
+# последние показываются как "[deleted]", чтобы ветка не терялась. children_count считает
+# только живые ответы, поэтому для надгробия, чьи ответы тоже удалены, живой потомок
+# ищется по диапазону path (ix_comments_thread) — так же, как в list_subtree
+_descendant = aliased(m.CommentModel)
+LISTED = or_(
+    m.CommentModel.deleted_at.is_(None),
+    m.CommentModel.children_count > 0,
+    select(_descendant.id)
+    .where(
+        and_(
+            _descendant.root_id == m.CommentModel.root_id,
+            _descendant.path > m.CommentModel.path,
+            _descendant.path
+            < func.substr(m.CommentModel.path, 1, func.length(m.CommentModel.path) - 1) + "0",
+            _descendant.deleted_at.is_(None),
+        )
+    )
+    .exists(),
+)
+
+
+@dataclass
+class CounterDrift:
+    """Результат сверки денормализованных счетчиков"""
+
+    children_counts: int = 0
+    entity_counts: int = 0
+    reaction_counts: int = 0
+
+
+@dataclass
+class BulkDeleteProgress:
+    """Ход пакетного удаления комментариев сущности"""
+
+    entity_type: str
+    entity_id: int
+    deleted: int = 0
+    batches: int = 0
+    duration_seconds: float = 0.0
+    # id комментариев последней пачки (например, для сброса кэша их ответов)
+    batch_ids: Sequence[int] = ()
+
+
+class BulkDeleteStats:
+    """Накопительные метрики пакетных удалений (для /stats)"""
+
+    def __init__(self):
+        self.runs = 0
+        self.deleted = 0
+        self.batches = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def observe(self, progress: BulkDeleteProgress):
+        self.runs += 1
+        self.deleted += progress.deleted
+        self.batches += progress.batches
+        self.total_seconds += progress.duration_seconds
+        self.max_seconds = max(self.max_seconds, progress.duration_seconds)
+
+    def snapshot(self) -> dict[str, float]:
+        return {
+            "runs": self.runs,
+            "deleted": self.deleted,
+            "batches": self.batches,
+            "total_seconds": round(self.total_seconds, 3),
+            "max_seconds": round(self.max_seconds, 3),
+        }
+
+
+bulk_delete_stats = BulkDeleteStats()
+
+
+@track_db_operations
 class SQLCommentRepository(CommentRepository):
     def __init__(self, session: AsyncSession):
         self.session = session
 
-    async def create(self, comment: Comment) -> Comment:
+    def _insert(self, table):
+        """INSERT с поддержкой ON CONFLICT для текущего диалекта"""
+        dialect = self.session.bind.dialect.name
+        if dialect == "postgresql":
+            return postgresql.insert(table)
+        if dialect == "sqlite":
+            return sqlite.insert(table)
+        raise NotImplementedError(f"Upsert is not supported for dialect: {dialect}")
+
+    async def _increment_entity_count(self, entity_type: str, entity_id: int, delta: int) -> int:
+        now = m.utcnow()
+        stmt = self._insert(m.CommentCountModel).values(
+            entity_type=entity_type,
+            entity_id=entity_id,
+            comment_count=max(delta, 0),
+            version=1,
+            updated_at=now,
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[m.CommentCountModel.entity_type, m.CommentCountModel.entity_id],
+            set_={
+                "comment_count": m.CommentCountModel.comment_count + delta,
+                "version": m.CommentCountModel.version + 1,
+                "updated_at": now,
+            },
+        ).returning(m.CommentCountModel.comment_count)
+        result = await self.session.execute(stmt)
+        return result.scalar_one()
+
+    async def _bump_entity_version(self, entity_type: str, entity_id: int) -> None:
+        """Отметить изменение ленты сущности без изменения счетчика комментариев"""
+        await self.session.execute(
+            update(m.CommentCountModel)
+            .where(
+                and_(
+                    m.CommentCountModel.entity_type == entity_type,
+                    m.CommentCountModel.entity_id == entity_id,
+                )
+            )
+            .values(version=m.CommentCountModel.version + 1, updated_at=m.utcnow())
+        )
+
+    async def create(self, comment: Comment, commit: bool = True) -> Comment:
         model = mappers.comment_to_model(comment)
         self.session.add(model)
         await self.session.flush()
+
+        # Счетчики обновляются атомарно в той же транзакции;
+        # заодно получаем путь родителя для материализованного пути
+        parent = None
+        if model.parent_id is not None:
+            result = await self.session.execute(
+                update(m.CommentModel)
+                .where(m.CommentModel.id == model.parent_id)
+                .values(children_count=m.CommentModel.children_count + 1)
+                .returning(m.CommentModel.root_id, m.CommentModel.depth, m.CommentModel.path)
+            )
+            parent = result.first()
+        await self._increment_entity_count(model.entity_type, model.entity_id, 1)
+
+        if parent is not None and parent.path is not None:
+            model.root_id = parent.root_id
+            model.depth = parent.depth + 1
+            model.path = parent.path + m.path_segment(model.id)
+        else:
+            model.root_id = model.id
+            model.depth = 0
+            model.path = m.path_segment(model.id)
+
+        await self.session.flush()
         await self.session.refresh(model)
-        await self.session.commit()
+        if commit:
+            await self.session.commit()
         return mappers.comment_to_domain(model)
 
+    async def add_outbox_events(self, events: Sequence[CommentEvent]) -> None:
+        """Записать события в outbox текущей транзакции (публикует OutboxRelay)"""
+        for event in events:
+            self.session.add(
+                m.OutboxEventModel(
+                    routing_key=f"comments.{event.event_type}",
+                    payload=event.model_dump_json(),
+                )
+            )
+        await self.session.flush()
+
+    async def commit(self) -> None:
+        await self.session.commit()
+
+    async def lock_outbox_batch(self, limit: int, max_attempts: int) -> List[m.OutboxEventModel]:
+        """
+        Следующая пачка событий outbox в порядке записи: без отложенных (max_attempts неудачных
+        попыток) и тех, чья пауза перед повтором не истекла. Строки блокируются до конца
+        транзакции; SKIP LOCKED позволяет нескольким экземплярам разбирать outbox параллельно
+        """
+        result = await self.session.execute(
+            select(m.OutboxEventModel)
+            .where(
+                and_(
+                    m.OutboxEventModel.attempts < max_attempts,
+                    or_(
+                        m.OutboxEventModel.next_attempt_at.is_(None),
+                        m.OutboxEventModel.next_attempt_at <= m.utcnow(),
+                    ),
+                )
+            )
+            .order_by(m.OutboxEventModel.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        return list(result.scalars().all())
+
+    async def delete_outbox_events(self, ids: Sequence[int]) -> None:
+        if ids:
+            await self.session.execute(
+                delete(m.OutboxEventModel).where(m.OutboxEventModel.id.in_(ids))
+            )
+
+    async def mark_outbox_failed(self, retry_at: Dict[int, datetime]) -> None:
+        """Засчитать неудачную попытку и назначить время повтора: id строки -> next_attempt_at"""
+        if retry_at:
+            await self.session.execute(
+                update(m.OutboxEventModel)
+                .where(m.OutboxEventModel.id.in_(retry_at))
+                .values(
+                    attempts=m.OutboxEventModel.attempts + 1,
+                    next_attempt_at=case(retry_at, value=m.OutboxEventModel.id),
+                )
+            )
+
     async def get_by_id(self, comment_id: int) -> Optional[Comment]:
         result = await self.session.execute(
             select(m.CommentModel).where(m.CommentModel.id == comment_id)
@@ -31,29 +245,44 @@ class SQLCommentRepository(CommentRepository):
         model = result.scalars().first()
         return mappers.comment_to_domain(model) if model else None
 
-    async def list_root_comments(
+    async def _paginate(
         self,
-        entity_id: int,
-        entity_type: str,
-        cursor: Optional[str] = None,
-        limit: int = 5,
+        query,
+        cursor: Optional[str],
+        limit: Optional[int],
+        sort: SortOrder = "oldest",
     ) -> Tuple[List[Comment], Optional[str]]:
-        query = (
-            select(m.CommentModel)
-            .where(
-                and_(
-                    m.CommentModel.entity_id == entity_id,
-                    m.CommentModel.entity_type == entity_type,
-                    m.CommentModel.parent_id.is_(None),
-                )
+        """
+        Keyset-пагинация по (ключ сортировки, id): сравнение кортежей обслуживается
+        составными индексами списков, поэтому глубина страницы не влияет на стоимость.
+        """
+        position: Optional[Cursor] = None
+        if cursor:
+            position = decode_cursor(cursor)
+            # Курсор другой сортировки указывает на позицию в другом порядке обхода
+            if position is None or position.sort != sort:
+                raise InvalidCursorError("Invalid cursor")
+        if position and sort != "top" and position.created_at is None:
+            # Курсор старого формата содержит только id — восстанавливаем created_at
+            created_at = await self.session.scalar(
+                select(m.CommentModel.created_at).where(m.CommentModel.id == position.id)
             )
-            .order_by(m.CommentModel.created_at.asc())
-        )
+            position = replace(position, created_at=created_at) if created_at else None
 
-        if cursor:
-            cursor_id = decode_cursor(cursor)
-            if cursor_id:
-                query = query.where(m.CommentModel.id > cursor_id)
+        limit = limit or (position.limit if position else None) or DEFAULT_PAGE_SIZE
+
+        sort_column = m.CommentModel.rating if sort == "top" else m.CommentModel.created_at
+        descending = sort != "oldest"
+
+        key = tuple_(sort_column, m.CommentModel.id)
+        if position:
+            position_key = position.rating if sort == "top" else position.created_at
+            after = tuple_(position_key, position.id)
+            query = query.where(key < after if descending else key > after)
+        if descending:
+            query = query.order_by(sort_column.desc(), m.CommentModel.id.desc())
+        else:
+            query = query.order_by(sort_column.asc(), m.CommentModel.id.asc())
 
         query = query.limit(limit + 1)  # +1 чтобы проверить, есть ли еще
         result = await self.session.execute(query)
@@ -62,53 +291,109 @@ class SQLCommentRepository(CommentRepository):
         comments = [mappers.comment_to_domain(model) for model in models[:limit]]
         next_cursor = None
         if len(models) > limit:
-            next_cursor = encode_cursor(models[limit - 1].id)
+            last = models[limit - 1]
+            next_cursor = encode_cursor(sort, last.id, last.created_at, last.rating, limit)
 
         return comments, next_cursor
 
-    async def list_children(
+    async def list_root_comments(
         self,
-        parent_id: int,
+        entity_id: int,
+        entity_type: str,
         cursor: Optional[str] = None,
-        limit: int = 5,
+        limit: Optional[int] = None,
+        sort: SortOrder = "oldest",
     ) -> Tuple[List[Comment], Optional[str]]:
-        query = (
-            select(m.CommentModel)
-            .where(m.CommentModel.parent_id == parent_id)
-            .order_by(m.CommentModel.created_at.asc())
+        query = select(m.CommentModel).where(
+            and_(
+                m.CommentModel.entity_id == entity_id,
+                m.CommentModel.entity_type == entity_type,
+                m.CommentModel.parent_id.is_(None),
+                LISTED,
+            )
         )
+        return await self._paginate(query, cursor, limit, sort)
 
-        if cursor:
-            cursor_id = decode_cursor(cursor)
-            if cursor_id:
-                query = query.where(m.CommentModel.id > cursor_id)
+    async def list_children(
+        self,
+        parent_id: int,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None,
+        sort: SortOrder = "oldest",
+    ) -> Tuple[List[Comment], Optional[str]]:
+        query = select(m.CommentModel).where(and_(m.CommentModel.parent_id == parent_id, LISTED))
+        return await self._paginate(query, cursor, limit, sort)
 
-        query = query.limit(limit + 1)
-        result = await self.session.execute(query)
-        models = result.scalars().all()
+    async def list_first_children(
+        self, parent_ids: Sequence[int], limit: int
+    ) -> Dict[int, List[Comment]]:
+        if not parent_ids or limit <= 0:
+            return {}
+        # Один оконный запрос вместо запроса на каждый корневой комментарий
+        row_number = (
+            func.row_number()
+            .over(
+                partition_by=m.CommentModel.parent_id,
+                order_by=(m.CommentModel.created_at.asc(), m.CommentModel.id.asc()),
+            )
+            .label("row_number")
+        )
+        ranked = (
+            select(m.CommentModel, row_number)
+            .where(and_(m.CommentModel.parent_id.in_(parent_ids), LISTED))
+            .subquery()
+        )
+        reply = aliased(m.CommentModel, ranked)
+        # Без ORDER BY во внешнем запросе: SQLite сортировал бы результат окна во временном
+        # B-дереве; не больше limit строк на родителя упорядочиваются здесь по row_number
+        result = await self.session.execute(
+            select(reply, ranked.c.row_number).where(ranked.c.row_number <= limit)
+        )
 
-        comments = [mappers.comment_to_domain(model) for model in models[:limit]]
-        next_cursor = None
-        if len(models) > limit:
-            next_cursor = encode_cursor(models[limit - 1].id)
+        ranked_replies: Dict[int, List[Tuple[int, Comment]]] = {}
+        for model, position in result.all():
+            ranked_replies.setdefault(model.parent_id, []).append(
+                (position, mappers.comment_to_domain(model))
+            )
+        return {
+            parent_id: [comment for _, comment in sorted(items, key=lambda item: item[0])]
+            for parent_id, items in ranked_replies.items()
+        }
 
-        return comments, next_cursor
+    async def list_subtree(self, comment_id: int, limit: int) -> Tuple[List[Comment], bool]:
+        anchor = (
+            await self.session.execute(
+                select(m.CommentModel.root_id, m.CommentModel.path).where(
+                    m.CommentModel.id == comment_id
+                )
+            )
+        ).first()
+        if anchor is None or anchor.path is None:
+            return [], False
 
-    async def count_children(self, parent_id: int) -> int:
+        # Потомки — это строки с префиксом path; верхняя граница диапазона получается
+        # заменой завершающего "/" на следующий за ним символ "0"
+        upper = anchor.path[:-1] + "0"
         result = await self.session.execute(
-            select(func.count(m.CommentModel.id)).where(m.CommentModel.parent_id == parent_id)
+            select(m.CommentModel)
+            .where(
+                and_(
+                    m.CommentModel.root_id == anchor.root_id,
+                    m.CommentModel.path >= anchor.path,
+                    m.CommentModel.path < upper,
+                )
+            )
+            .order_by(m.CommentModel.path)
+            .limit(limit + 1)
         )
-        return result.scalar_one() or 0
+        models = result.scalars().all()
+        return [mappers.comment_to_domain(model) for model in models[:limit]], len(models) > limit
 
-    async def update_rating(self, comment_id: int, rating: int, is_positive: bool) -> None:
+    async def count_children(self, parent_id: int) -> int:
         result = await self.session.execute(
-            select(m.CommentModel).where(m.CommentModel.id == comment_id)
+            select(m.CommentModel.children_count).where(m.CommentModel.id == parent_id)
         )
-        model = result.scalars().first()
-        if model:
-            model.rating = rating
-            model.is_positive = is_positive
-            await self.session.commit()
+        return result.scalar_one_or_none() or 0
 
     async def get_user_reaction(
         self, comment_id: int, user_id: int
@@ -124,83 +409,515 @@ class SQLCommentRepository(CommentRepository):
         reaction = result.scalars().first()
         return reaction.reaction if reaction else None
 
+    async def get_user_reactions(
+        self, comment_ids: Sequence[int], user_id: int
+    ) -> Dict[int, Literal["like", "dislike"]]:
+        if not comment_ids:
+            return {}
+        result = await self.session.execute(
+            select(m.CommentReactionModel.comment_id, m.CommentReactionModel.reaction).where(
+                and_(
+                    m.CommentReactionModel.comment_id.in_(comment_ids),
+                    m.CommentReactionModel.user_id == user_id,
+                )
+            )
+        )
+        return {comment_id: reaction for comment_id, reaction in result.all()}
+
     async def set_user_reaction(
         self,
         comment_id: int,
         user_id: int,
         reaction: Optional[Literal["like", "dislike"]],
-    ) -> None:
-        # Удалить существующую реакцию
-        stmt = delete(m.CommentReactionModel).where(
-            and_(
-                m.CommentReactionModel.comment_id == comment_id,
-                m.CommentReactionModel.user_id == user_id,
+    ) -> Optional[Comment]:
+        # Реакции на один комментарий выполняются по очереди: прежняя реакция пользователя,
+        # прочитанная под блокировкой, не устареет до записи, и дельты счетчиков точны
+        if not await self._lock_comments([comment_id]):
+            # Комментарий удален или не существует: реакцию не сохраняем
+            await self.session.rollback()
+            return None
+
+        match_user = and_(
+            m.CommentReactionModel.comment_id == comment_id,
+            m.CommentReactionModel.user_id == user_id,
+        )
+        if reaction is None:
+            result = await self.session.execute(
+                delete(m.CommentReactionModel)
+                .where(match_user)
+                .returning(m.CommentReactionModel.reaction)
+            )
+            previous = result.scalars().first()
+            changed = previous is not None
+        else:
+            previous = await self.session.scalar(
+                select(m.CommentReactionModel.reaction).where(match_user)
+            )
+
+            # Одна запись: INSERT .. ON CONFLICT (comment_id, user_id) DO UPDATE.
+            # Если реакция не изменилась, строка не обновляется и не возвращается
+            stmt = self._insert(m.CommentReactionModel).values(
+                comment_id=comment_id, user_id=user_id, reaction=reaction
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[
+                    m.CommentReactionModel.comment_id,
+                    m.CommentReactionModel.user_id,
+                ],
+                set_={"reaction": stmt.excluded.reaction},
+                where=m.CommentReactionModel.reaction != stmt.excluded.reaction,
+            ).returning(m.CommentReactionModel.id)
+            result = await self.session.execute(stmt)
+            changed = result.scalar_one_or_none() is not None
+
+        if not changed:
+            await self.session.commit()
+            return await self.get_by_id(comment_id)
+
+        likes_delta = int(reaction == "like") - int(previous == "like")
+        dislikes_delta = int(reaction == "dislike") - int(previous == "dislike")
+
+        # Инкрементально обновляем счетчики одним атомарным UPDATE вместо пересчета
+        likes = m.CommentModel.likes_count + likes_delta
+        dislikes = m.CommentModel.dislikes_count + dislikes_delta
+        result = await self.session.execute(
+            update(m.CommentModel)
+            .where(m.CommentModel.id == comment_id)
+            .values(
+                likes_count=likes,
+                dislikes_count=dislikes,
+                rating=likes - dislikes,
+                is_positive=likes >= dislikes,
             )
+            .returning(m.CommentModel)
+            .execution_options(synchronize_session=False)
         )
-        await self.session.execute(stmt)
+        model = result.scalars().one()
+        await self._bump_entity_version(model.entity_type, model.entity_id)
+        await self.session.commit()
+        return mappers.comment_to_domain(model)
 
-        # Добавить новую, если указана
-        if reaction:
-            new_reaction = m.CommentReactionModel(
-                comment_id=comment_id,
-                user_id=user_id,
-                reaction=reaction,
+    async def _lock_comments(self, comment_ids: Sequence[int]) -> set[int]:
+        """
+        Заблокировать живые комментарии до конца транзакции (по возрастанию id, чтобы
+        параллельные транзакции не взаимоблокировались); вернуть id неудаленных.
+        """
+        alive = and_(m.CommentModel.id.in_(comment_ids), m.CommentModel.deleted_at.is_(None))
+        if self.session.bind.dialect.name == "sqlite":
+            # SQLite не поддерживает FOR UPDATE, а транзакция pysqlite начинается только
+            # с первого изменения: пустой UPDATE сразу берет блокировку записи
+            # (updated_at присваивается явно, иначе сработал бы onupdate)
+            stmt = (
+                update(m.CommentModel)
+                .where(alive)
+                .values(updated_at=m.CommentModel.updated_at)
+                .returning(m.CommentModel.id)
+                .execution_options(synchronize_session=False)
+            )
+        else:
+            stmt = (
+                select(m.CommentModel.id).where(alive).order_by(m.CommentModel.id).with_for_update()
             )
-            self.session.add(new_reaction)
+        result = await self.session.execute(stmt)
+        return set(result.scalars().all())
 
-        # Пересчитать рейтинг комментария
-        like_count_result = await self.session.execute(
-            select(func.count(m.CommentReactionModel.id)).where(
-                and_(
-                    m.CommentReactionModel.comment_id == comment_id,
-                    m.CommentReactionModel.reaction == "like",
+    async def apply_reactions(
+        self, reactions: Dict[int, Dict[int, Optional[Literal["like", "dislike"]]]]
+    ) -> List[Comment]:
+        """
+        Записать накопленные реакции {comment_id: {user_id: reaction}} одной транзакцией:
+        многострочные upsert/delete по comment_reactions и один UPDATE счетчиков на комментарий.
+        Реакции на удаленные комментарии отбрасываются. Возвращает обновленные комментарии.
+
+        Блокировки берутся в том же порядке, что и в set_user_reaction: сначала комментарии,
+        затем реакции, каждые по возрастанию ключа — параллельные транзакции не взаимоблокируются.
+        """
+        alive = await self._lock_comments(list(reactions))
+        pairs = sorted(
+            (comment_id, user_id)
+            for comment_id, by_user in reactions.items()
+            if comment_id in alive
+            for user_id in by_user
+        )
+        if not pairs:
+            await self.session.commit()
+            return []
+
+        # Прежние реакции нужны для точных дельт счетчиков
+        previous: Dict[Tuple[int, int], str] = {}
+        for start in range(0, len(pairs), REACTION_CHUNK_SIZE):
+            chunk = pairs[start : start + REACTION_CHUNK_SIZE]
+            result = await self.session.execute(
+                select(
+                    m.CommentReactionModel.comment_id,
+                    m.CommentReactionModel.user_id,
+                    m.CommentReactionModel.reaction,
+                )
+                .where(
+                    tuple_(m.CommentReactionModel.comment_id, m.CommentReactionModel.user_id).in_(
+                        chunk
+                    )
+                )
+                .order_by(m.CommentReactionModel.comment_id, m.CommentReactionModel.user_id)
+                .with_for_update()
+            )
+            previous.update({(c, u): reaction for c, u, reaction in result.all()})
+
+        upserts: List[dict] = []
+        removals: List[Tuple[int, int]] = []
+        deltas: Dict[int, List[int]] = {}
+        for comment_id, user_id in pairs:
+            reaction = reactions[comment_id][user_id]
+            before = previous.get((comment_id, user_id))
+            if reaction == before:
+                continue
+            if reaction is None:
+                removals.append((comment_id, user_id))
+            else:
+                upserts.append({"comment_id": comment_id, "user_id": user_id, "reaction": reaction})
+            delta = deltas.setdefault(comment_id, [0, 0])
+            delta[0] += int(reaction == "like") - int(before == "like")
+            delta[1] += int(reaction == "dislike") - int(before == "dislike")
+
+        for start in range(0, len(upserts), REACTION_CHUNK_SIZE):
+            stmt = self._insert(m.CommentReactionModel).values(
+                upserts[start : start + REACTION_CHUNK_SIZE]
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[
+                    m.CommentReactionModel.comment_id,
+                    m.CommentReactionModel.user_id,
+                ],
+                set_={"reaction": stmt.excluded.reaction},
+            )
+            await self.session.execute(stmt)
+        for start in range(0, len(removals), REACTION_CHUNK_SIZE):
+            await self.session.execute(
+                delete(m.CommentReactionModel).where(
+                    tuple_(m.CommentReactionModel.comment_id, m.CommentReactionModel.user_id).in_(
+                        removals[start : start + REACTION_CHUNK_SIZE]
+                    )
                 )
             )
+
+        updated: List[Comment] = []
+        entities = set()
+        for comment_id, (likes_delta, dislikes_delta) in deltas.items():
+            if not likes_delta and not dislikes_delta:
+                continue
+            likes = m.CommentModel.likes_count + likes_delta
+            dislikes = m.CommentModel.dislikes_count + dislikes_delta
+            result = await self.session.execute(
+                update(m.CommentModel)
+                .where(m.CommentModel.id == comment_id)
+                .values(
+                    likes_count=likes,
+                    dislikes_count=dislikes,
+                    rating=likes - dislikes,
+                    is_positive=likes >= dislikes,
+                )
+                .returning(m.CommentModel)
+                .execution_options(synchronize_session=False)
+            )
+            model = result.scalars().one()
+            updated.append(mappers.comment_to_domain(model))
+            entities.add((model.entity_type, model.entity_id))
+        for entity_type, entity_id in entities:
+            await self._bump_entity_version(entity_type, entity_id)
+        await self.session.commit()
+        return updated
+
+    async def soft_delete(self, comment_id: int, commit: bool = True) -> Optional[Comment]:
+        """
+        Пометить комментарий удаленным (одна строка) и обновить счетчики.
+        Возвращает удаленный комментарий или None, если его нет или он уже удален.
+        """
+        result = await self.session.execute(
+            update(m.CommentModel)
+            .where(and_(m.CommentModel.id == comment_id, m.CommentModel.deleted_at.is_(None)))
+            .values(deleted_at=m.utcnow())
+            .returning(m.CommentModel)
+            .execution_options(synchronize_session=False)
         )
-        dislike_count_result = await self.session.execute(
-            select(func.count(m.CommentReactionModel.id)).where(
+        model = result.scalars().first()
+        if model is None:
+            return None
+
+        # children_count и comment_counts считают только живые комментарии
+        if model.parent_id is not None:
+            await self.session.execute(
+                update(m.CommentModel)
+                .where(m.CommentModel.id == model.parent_id)
+                .values(children_count=m.CommentModel.children_count - 1)
+            )
+        await self._increment_entity_count(model.entity_type, model.entity_id, -1)
+        if commit:
+            await self.session.commit()
+        return mappers.comment_to_domain(model)
+
+    async def purge_deleted(self, deleted_before: datetime, limit: int) -> int:
+        """
+        Физически удалить до limit надгробий, удаленных раньше deleted_before, вместе с реакциями.
+        Удаляются только комментарии без ответов, поэтому каскад по parent_id не срабатывает;
+        ветки из надгробий очищаются снизу вверх за несколько проходов.
+        """
+        child = aliased(m.CommentModel)
+        result = await self.session.execute(
+            select(m.CommentModel.id)
+            .where(
                 and_(
-                    m.CommentReactionModel.comment_id == comment_id,
-                    m.CommentReactionModel.reaction == "dislike",
+                    m.CommentModel.deleted_at.is_not(None),
+                    m.CommentModel.deleted_at < deleted_before,
+                    ~select(child.id).where(child.parent_id == m.CommentModel.id).exists(),
                 )
             )
+            .order_by(m.CommentModel.deleted_at)
+            .limit(limit)
         )
-        like_count = like_count_result.scalar_one() or 0
-        dislike_count = dislike_count_result.scalar_one() or 0
-        rating = like_count - dislike_count
-        is_positive = like_count >= dislike_count
+        ids = result.scalars().all()
+        if not ids:
+            return 0
 
-        await self.update_rating(comment_id, rating, is_positive)
+        await self.session.execute(
+            delete(m.CommentReactionModel).where(m.CommentReactionModel.comment_id.in_(ids))
+        )
+        result = await self.session.execute(
+            delete(m.CommentModel).where(
+                and_(m.CommentModel.id.in_(ids), m.CommentModel.deleted_at.is_not(None))
+            )
+        )
         await self.session.commit()
+        return result.rowcount
 
     async def count_by_entity(self, entity_id: int, entity_type: str) -> int:
         """Подсчитать количество комментариев к указанной сущности (включая дочерние)"""
         result = await self.session.execute(
-            select(func.count(m.CommentModel.id)).where(
+            select(m.CommentCountModel.comment_count).where(
                 and_(
-                    m.CommentModel.entity_id == entity_id, m.CommentModel.entity_type == entity_type
+                    m.CommentCountModel.entity_id == entity_id,
+                    m.CommentCountModel.entity_type == entity_type,
                 )
             )
         )
-        return result.scalar_one() or 0
+        return result.scalar_one_or_none() or 0
 
-    async def delete_by_entity(self, entity_id: int, entity_type: str) -> int:
-        """Удалить все комментарии к указанной сущности. Возвращает количество удаленных комментариев."""
-        # Сначала удаляем реакции к комментариям этой сущности
-        subquery = select(m.CommentModel.id).where(
-            and_(m.CommentModel.entity_id == entity_id, m.CommentModel.entity_type == entity_type)
+    async def get_entity_version(self, entity_id: int, entity_type: str) -> Optional[EntityVersion]:
+        """Текущая версия ленты сущности — один запрос по первичному ключу comment_counts"""
+        result = await self.session.execute(
+            select(m.CommentCountModel.version, m.CommentCountModel.updated_at).where(
+                and_(
+                    m.CommentCountModel.entity_id == entity_id,
+                    m.CommentCountModel.entity_type == entity_type,
+                )
+            )
         )
+        row = result.first()
+        if row is None:
+            return None
+        updated_at = row.updated_at
+        if updated_at is not None and updated_at.tzinfo is None:
+            updated_at = updated_at.replace(tzinfo=timezone.utc)
+        return EntityVersion(version=row.version, updated_at=updated_at)
 
-        stmt_reactions = delete(m.CommentReactionModel).where(
-            m.CommentReactionModel.comment_id.in_(subquery)
+    async def delete_by_entity(
+        self,
+        entity_id: int,
+        entity_type: str,
+        batch_size: int = 1000,
+        max_batches_per_second: float = 0.0,
+        on_progress: Optional[Callable[[BulkDeleteProgress], None]] = None,
+    ) -> int:
+        """
+        Удалить все комментарии к указанной сущности. Возвращает количество удаленных комментариев.
+        Удаление идет пачками по batch_size от больших id к меньшим (ответы раньше родителей),
+        каждая пачка — отдельная транзакция. Прерванное удаление продолжается повторным вызовом:
+        оставшиеся строки и есть состояние, счетчик сущности удаляется последним.
+        """
+        entity = and_(
+            m.CommentModel.entity_id == entity_id, m.CommentModel.entity_type == entity_type
         )
-        await self.session.execute(stmt_reactions)
+        progress = BulkDeleteProgress(entity_type=entity_type, entity_id=entity_id)
+        min_interval = 1.0 / max_batches_per_second if max_batches_per_second > 0 else 0.0
+        started = time.perf_counter()
+
+        while True:
+            batch_started = time.perf_counter()
+            result = await self.session.execute(
+                select(m.CommentModel.id)
+                .where(entity)
+                .order_by(m.CommentModel.id.desc())
+                .limit(batch_size)
+            )
+            ids = result.scalars().all()
+            if not ids:
+                break
+
+            await self.session.execute(
+                delete(m.CommentReactionModel).where(m.CommentReactionModel.comment_id.in_(ids))
+            )
+            result = await self.session.execute(
+                delete(m.CommentModel).where(m.CommentModel.id.in_(ids))
+            )
+            await self.session.commit()
+
+            progress.deleted += result.rowcount
+            progress.batches += 1
+            progress.batch_ids = ids
+            progress.duration_seconds = time.perf_counter() - started
+            if on_progress is not None:
+                on_progress(progress)
+            if len(ids) < batch_size:
+                break
+            # Отдаем управление между пачками и, если задано, ограничиваем темп
+            await asyncio.sleep(max(0.0, min_interval - (time.perf_counter() - batch_started)))
 
-        # Затем удаляем сами комментарии
-        stmt_comments = delete(m.CommentModel).where(
-            and_(m.CommentModel.entity_id == entity_id, m.CommentModel.entity_type == entity_type)
+        await self.session.execute(
+            delete(m.CommentCountModel).where(
+                and_(
+                    m.CommentCountModel.entity_id == entity_id,
+                    m.CommentCountModel.entity_type == entity_type,
+                )
+            )
         )
-        result = await self.session.execute(stmt_comments)
         await self.session.commit()
 
-        return result.rowcount
+        progress.duration_seconds = time.perf_counter() - started
+        bulk_delete_stats.observe(progress)
+        return progress.deleted
+
+    async def reconcile_counters(self, dry_run: bool = False) -> CounterDrift:
+        """
+        Найти и исправить разошедшиеся денормализованные счетчики
+        (comments.children_count и comment_counts).
+        """
+        drift = CounterDrift()
+        child = m.CommentModel.__table__.alias("child")
+
+        actual_children = (
+            select(child.c.parent_id, func.count().label("cnt"))
+            .where(and_(child.c.parent_id.is_not(None), child.c.deleted_at.is_(None)))
+            .group_by(child.c.parent_id)
+            .subquery()
+        )
+        actual = func.coalesce(actual_children.c.cnt, 0)
+        result = await self.session.execute(
+            select(m.CommentModel.id, actual)
+            .outerjoin(actual_children, actual_children.c.parent_id == m.CommentModel.id)
+            .where(m.CommentModel.children_count != actual)
+        )
+        drifted_children = result.all()
+        drift.children_counts = len(drifted_children)
+        if not dry_run:
+            for comment_id, count in drifted_children:
+                await self.session.execute(
+                    update(m.CommentModel)
+                    .where(m.CommentModel.id == comment_id)
+                    .values(children_count=count)
+                )
+
+        actual_entities = (
+            select(
+                m.CommentModel.entity_type,
+                m.CommentModel.entity_id,
+                func.count().label("cnt"),
+            )
+            .where(m.CommentModel.deleted_at.is_(None))
+            .group_by(m.CommentModel.entity_type, m.CommentModel.entity_id)
+            .subquery()
+        )
+        result = await self.session.execute(
+            select(
+                actual_entities.c.entity_type, actual_entities.c.entity_id, actual_entities.c.cnt
+            )
+            .outerjoin(
+                m.CommentCountModel,
+                and_(
+                    m.CommentCountModel.entity_type == actual_entities.c.entity_type,
+                    m.CommentCountModel.entity_id == actual_entities.c.entity_id,
+                ),
+            )
+            .where(func.coalesce(m.CommentCountModel.comment_count, -1) != actual_entities.c.cnt)
+        )
+        drifted_entities = result.all()
+        # Счетчики сущностей, у которых больше нет комментариев
+        result = await self.session.execute(
+            select(m.CommentCountModel.entity_type, m.CommentCountModel.entity_id)
+            .outerjoin(
+                actual_entities,
+                and_(
+                    m.CommentCountModel.entity_type == actual_entities.c.entity_type,
+                    m.CommentCountModel.entity_id == actual_entities.c.entity_id,
+                ),
+            )
+            .where(actual_entities.c.cnt.is_(None))
+        )
+        orphaned_entities = result.all()
+        drift.entity_counts = len(drifted_entities) + len(orphaned_entities)
+        if not dry_run:
+            for entity_type, entity_id, count in drifted_entities:
+                stmt = self._insert(m.CommentCountModel).values(
+                    entity_type=entity_type, entity_id=entity_id, comment_count=count
+                )
+                await self.session.execute(
+                    stmt.on_conflict_do_update(
+                        index_elements=[
+                            m.CommentCountModel.entity_type,
+                            m.CommentCountModel.entity_id,
+                        ],
+                        set_={"comment_count": count},
+                    )
+                )
+            for entity_type, entity_id in orphaned_entities:
+                await self.session.execute(
+                    delete(m.CommentCountModel).where(
+                        and_(
+                            m.CommentCountModel.entity_type == entity_type,
+                            m.CommentCountModel.entity_id == entity_id,
+                        )
+                    )
+                )
+
+        actual_reactions = (
+            select(
+                m.CommentReactionModel.comment_id,
+                func.sum(case((m.CommentReactionModel.reaction == "like", 1), else_=0)).label(
+                    "likes"
+                ),
+                func.sum(case((m.CommentReactionModel.reaction == "dislike", 1), else_=0)).label(
+                    "dislikes"
+                ),
+            )
+            .group_by(m.CommentReactionModel.comment_id)
+            .subquery()
+        )
+        actual_likes = func.coalesce(actual_reactions.c.likes, 0)
+        actual_dislikes = func.coalesce(actual_reactions.c.dislikes, 0)
+        result = await self.session.execute(
+            select(m.CommentModel.id, actual_likes, actual_dislikes)
+            .outerjoin(actual_reactions, actual_reactions.c.comment_id == m.CommentModel.id)
+            .where(
+                or_(
+                    m.CommentModel.likes_count != actual_likes,
+                    m.CommentModel.dislikes_count != actual_dislikes,
+                    m.CommentModel.rating != actual_likes - actual_dislikes,
+                )
+            )
+        )
+        drifted_reactions = result.all()
+        drift.reaction_counts = len(drifted_reactions)
+
+        if not dry_run:
+            for comment_id, likes, dislikes in drifted_reactions:
+                await self.session.execute(
+                    update(m.CommentModel)
+                    .where(m.CommentModel.id == comment_id)
+                    .values(
+                        likes_count=likes,
+                        dislikes_count=dislikes,
+                        rating=likes - dislikes,
+                        is_positive=likes >= dislikes,
+                    )
+                )
+            await self.session.commit()
+
+        return drift
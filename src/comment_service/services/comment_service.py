@@ -1,13 +1,32 @@
 from __future__ import annotations
 
-from typing import Literal, Optional
+from dataclasses import replace
+from typing import Awaitable, Callable, Dict, List, Literal, Optional, Sequence, TypeVar
 
-from comment_service.domain.models import Comment
+from comment_service.domain.models import Comment, EntityVersion, SortOrder
 from comment_service.domain.repositories import CommentRepository
-from comment_service.dtos.http import AuthorDto, CommentDto, CommentListResponse
+from comment_service.domain.services import decode_cursor, encode_cursor
+from comment_service.dtos.http import (
+    AuthorDto,
+    CommentDto,
+    CommentListResponse,
+    CommentTreeItemDto,
+    CommentTreeResponse,
+)
+from comment_service.core.cache import PageCache, children_tag, entity_tag
 from comment_service.core.config import Settings
-from comment_service.mq.publisher import EventPublisher
-from comment_service.domain.events import CommentCreatedEvent, CommentCountUpdatedEvent
+from comment_service.domain.events import (
+    CommentCountUpdatedEvent,
+    CommentCreatedEvent,
+    CommentDeletedEvent,
+)
+from comment_service.services.reaction_buffer import ReactionBuffer
+
+# Текст и имя автора удаленного комментария в ветке
+DELETED_PLACEHOLDER = "[deleted]"
+
+PageT = TypeVar("PageT", CommentListResponse, CommentTreeResponse)
+DtoT = TypeVar("DtoT", bound=CommentDto)
 
 
 class CommentAppService:
@@ -15,11 +34,16 @@ class CommentAppService:
         self,
         comment_repo: CommentRepository,
         settings: Settings,
-        event_publisher: EventPublisher | None = None,
+        page_cache: PageCache | None = None,
+        reaction_buffer: ReactionBuffer | None = None,
+        stale_reads: Callable[[], bool] | None = None,
     ):
         self.comment_repo = comment_repo
         self.settings = settings
-        self.event_publisher = event_publisher
+        self.page_cache = page_cache
+        self.reaction_buffer = reaction_buffer
+        # Чтение с реплики: True, пока она может не содержать недавних записей
+        self.stale_reads = stale_reads
 
     async def list_comments(
         self,
@@ -27,20 +51,28 @@ class CommentAppService:
         entity_type: Literal["post", "game"],
         cursor: Optional[str] = None,
         user_id: Optional[int] = None,
+        sort: SortOrder = "oldest",
+        limit: Optional[int] = None,
     ) -> CommentListResponse:
-        comments, next_cursor = await self.comment_repo.list_root_comments(
-            entity_id=entity_id,
-            entity_type=entity_type,
-            cursor=cursor,
-            limit=5,
-        )
+        page_size = self._page_size(limit, cursor)
 
-        items = [await self._build_comment_dto(comment, user_id) for comment in comments]
+        async def load(viewer_id: Optional[int]) -> tuple[CommentListResponse, List[str]]:
+            comments, next_cursor = await self.comment_repo.list_root_comments(
+                entity_id=entity_id,
+                entity_type=entity_type,
+                cursor=cursor,
+                limit=page_size,
+                sort=sort,
+            )
+            response = CommentListResponse(
+                items=await self._build_comment_dtos(comments, viewer_id),
+                hasMore=next_cursor is not None,
+                nextCursor=next_cursor,
+            )
+            return response, [entity_tag(entity_type, entity_id)]
 
-        return CommentListResponse(
-            items=items,
-            hasMore=next_cursor is not None,
-            nextCursor=next_cursor,
+        return await self._read_through(
+            f"root:{entity_type}:{entity_id}:{sort}:{page_size}:{cursor or ''}", load, user_id
         )
 
     async def list_children(
@@ -48,21 +80,141 @@ class CommentAppService:
         parent_id: int,
         cursor: Optional[str] = None,
         user_id: Optional[int] = None,
+        sort: SortOrder = "oldest",
+        limit: Optional[int] = None,
     ) -> CommentListResponse:
-        comments, next_cursor = await self.comment_repo.list_children(
-            parent_id=parent_id,
+        page_size = self._page_size(limit, cursor)
+
+        async def load(viewer_id: Optional[int]) -> tuple[CommentListResponse, List[str]]:
+            comments, next_cursor = await self.comment_repo.list_children(
+                parent_id=parent_id,
+                cursor=cursor,
+                limit=page_size,
+                sort=sort,
+            )
+            response = CommentListResponse(
+                items=await self._build_comment_dtos(comments, viewer_id),
+                hasMore=next_cursor is not None,
+                nextCursor=next_cursor,
+            )
+            # Пустая страница сбрасывается по родителю, непустая — и по сущности
+            tags = [children_tag(parent_id)]
+            tags.extend({entity_tag(c.entity_type, c.entity_id) for c in comments})
+            return response, tags
+
+        return await self._read_through(
+            f"children:{parent_id}:{sort}:{page_size}:{cursor or ''}", load, user_id
+        )
+
+    async def list_comment_tree(
+        self,
+        entity_id: int,
+        entity_type: Literal["post", "game"],
+        cursor: Optional[str] = None,
+        user_id: Optional[int] = None,
+        sort: SortOrder = "oldest",
+        limit: Optional[int] = None,
+        replies: Optional[int] = None,
+    ) -> CommentTreeResponse:
+        """Корневые комментарии вместе с первыми ответами каждого — одним ответом"""
+        if replies is None:
+            replies = self.settings.comments_tree_replies
+        replies = min(replies, self.settings.comments_max_tree_replies)
+        page_size = self._page_size(limit, cursor)
+
+        async def load(viewer_id: Optional[int]) -> tuple[CommentTreeResponse, List[str]]:
+            response = await self._load_comment_tree(
+                entity_id, entity_type, cursor, viewer_id, sort, page_size, replies
+            )
+            return response, [entity_tag(entity_type, entity_id)]
+
+        return await self._read_through(
+            f"tree:{entity_type}:{entity_id}:{sort}:{page_size}:{replies}:{cursor or ''}",
+            load,
+            user_id,
+        )
+
+    async def _load_comment_tree(
+        self,
+        entity_id: int,
+        entity_type: Literal["post", "game"],
+        cursor: Optional[str],
+        user_id: Optional[int],
+        sort: SortOrder,
+        page_size: int,
+        replies: int,
+    ) -> CommentTreeResponse:
+        roots, next_cursor = await self.comment_repo.list_root_comments(
+            entity_id=entity_id,
+            entity_type=entity_type,
             cursor=cursor,
-            limit=5,
+            limit=page_size,
+            sort=sort,
         )
+        # На один ответ больше: children_count не учитывает надгробия с живыми ответами,
+        # поэтому продолжение ответов определяется по лишней строке
+        replies_by_root = await self.comment_repo.list_first_children(
+            [root.id for root in roots], replies + 1 if replies else 0
+        )
+        more_replies = {
+            root_id
+            for root_id, root_replies in replies_by_root.items()
+            if len(root_replies) > replies
+        }
+        replies_by_root = {
+            root_id: root_replies[:replies] for root_id, root_replies in replies_by_root.items()
+        }
 
-        items = [await self._build_comment_dto(comment, user_id) for comment in comments]
+        page = list(roots)
+        for root in roots:
+            page.extend(replies_by_root.get(root.id, []))
+        dtos = {dto.id: dto for dto in await self._build_comment_dtos(page, user_id)}
 
-        return CommentListResponse(
+        items = []
+        for root in roots:
+            root_replies = replies_by_root.get(root.id, [])
+            replies_cursor = None
+            if root.id in more_replies:
+                last = root_replies[-1]
+                replies_cursor = encode_cursor(
+                    "oldest", last.id, last.created_at, last.rating, replies
+                )
+            items.append(
+                CommentTreeItemDto(
+                    **dtos[root.id].model_dump(),
+                    replies=[dtos[reply.id] for reply in root_replies],
+                    repliesCursor=replies_cursor,
+                )
+            )
+
+        return CommentTreeResponse(
             items=items,
             hasMore=next_cursor is not None,
             nextCursor=next_cursor,
         )
 
+    async def get_entity_version(
+        self, entity_id: int, entity_type: Literal["post", "game"]
+    ) -> Optional[EntityVersion]:
+        """Версия ленты сущности для условных GET (ETag / Last-Modified)"""
+        return await self.comment_repo.get_entity_version(entity_id, entity_type)
+
+    async def get_thread(
+        self,
+        comment_id: int,
+        user_id: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> CommentListResponse:
+        """Комментарий и все его ответы любой глубины в порядке ветки (одним запросом)"""
+        max_size = self.settings.comments_max_thread_size
+        comments, has_more = await self.comment_repo.list_subtree(
+            comment_id, min(limit or max_size, max_size)
+        )
+        return CommentListResponse(
+            items=await self._build_comment_dtos(comments, user_id),
+            hasMore=has_more,
+        )
+
     async def create_comment(
         self,
         entity_id: int,
@@ -86,64 +238,234 @@ class CommentAppService:
             is_positive=True,
         )
 
-        saved = await self.comment_repo.create(comment)
-
-        # Публикуем событие создания комментария
-        if self.event_publisher:
-            try:
-                await self.event_publisher.publish(
-                    CommentCreatedEvent(
-                        comment_id=saved.id,
-                        entity_id=saved.entity_id,
-                        entity_type=saved.entity_type,
-                        author_id=saved.author_id,
-                        author_username=saved.author_username,
-                        parent_id=saved.parent_id,
-                    )
-                )
+        # Комментарий и события сохраняются одной транзакцией; публикует их OutboxRelay
+        saved = await self.comment_repo.create(comment, commit=False)
+        comment_count = await self.comment_repo.count_by_entity(
+            entity_id=saved.entity_id, entity_type=saved.entity_type
+        )
+        await self.comment_repo.add_outbox_events(
+            [
+                CommentCreatedEvent(
+                    comment_id=saved.id,
+                    entity_id=saved.entity_id,
+                    entity_type=saved.entity_type,
+                    author_id=saved.author_id,
+                    author_username=saved.author_username,
+                    parent_id=saved.parent_id,
+                ),
+                # Счетчик для синхронизации с post_service
+                CommentCountUpdatedEvent(
+                    entity_id=saved.entity_id,
+                    entity_type=saved.entity_type,
+                    comment_count=comment_count,
+                ),
+            ]
+        )
+        await self.comment_repo.commit()
+        await self._invalidate_pages(saved)
 
-                # Подсчитываем и публикуем обновление счетчика комментариев
-                comment_count = await self.comment_repo.count_by_entity(
-                    entity_id=saved.entity_id, entity_type=saved.entity_type
-                )
-                await self.event_publisher.publish(
-                    CommentCountUpdatedEvent(
-                        entity_id=saved.entity_id,
-                        entity_type=saved.entity_type,
-                        comment_count=comment_count,
-                    )
-                )
-            except Exception as e:
-                # Логируем ошибку, но не прерываем выполнение
-                import logging
+        return await self._build_comment_dto(saved, user_id=None)
 
-                logger = logging.getLogger(__name__)
-                logger.error(f"Failed to publish comment events: {e}")
+    async def delete_comment(self, comment_id: int) -> Optional[Comment]:
+        """
+        Мягко удалить комментарий: одна строка помечается deleted_at, ответы остаются на месте.
+        Физически строку удалит TombstonePurger. None — комментария нет или он уже удален.
+        """
+        deleted = await self.comment_repo.soft_delete(comment_id, commit=False)
+        if deleted is None:
+            return None
 
-        return await self._build_comment_dto(saved, user_id=None)
+        comment_count = await self.comment_repo.count_by_entity(
+            entity_id=deleted.entity_id, entity_type=deleted.entity_type
+        )
+        await self.comment_repo.add_outbox_events(
+            [
+                CommentDeletedEvent(
+                    comment_id=deleted.id,
+                    entity_id=deleted.entity_id,
+                    entity_type=deleted.entity_type,
+                ),
+                CommentCountUpdatedEvent(
+                    entity_id=deleted.entity_id,
+                    entity_type=deleted.entity_type,
+                    comment_count=comment_count,
+                ),
+            ]
+        )
+        await self.comment_repo.commit()
+        await self._invalidate_pages(deleted)
+        return deleted
 
     async def set_reaction(
         self,
         comment_id: int,
         user_id: int,
         reaction: Literal["like", "dislike"],
-    ) -> CommentDto:
-        """Поставить реакцию и вернуть обновленный комментарий"""
-        await self.comment_repo.set_user_reaction(comment_id, user_id, reaction)
-        updated = await self.comment_repo.get_by_id(comment_id)
+    ) -> Optional[CommentDto]:
+        """Поставить реакцию и вернуть обновленный комментарий (None, если он удален)"""
+        if self.reaction_buffer is not None:
+            return await self._set_reaction_buffered(comment_id, user_id, reaction)
+        updated = await self.comment_repo.set_user_reaction(comment_id, user_id, reaction)
         if not updated:
-            raise ValueError("Comment not found after reaction update")
-        return await self._build_comment_dto(updated, user_id=user_id)
+            return None
+        await self._invalidate_pages(updated)
+        # Реакция пользователя известна — повторно читать ее из БД не нужно
+        return self._to_dto(updated, reaction=reaction)
+
+    async def _set_reaction_buffered(
+        self,
+        comment_id: int,
+        user_id: int,
+        reaction: Literal["like", "dislike"],
+    ) -> Optional[CommentDto]:
+        """
+        Реакция уходит в ReactionBuffer, запись в БД — при ближайшем сбросе.
+        В ответе рейтинг уже учитывает реакцию пользователя; остальные зрители увидят
+        новые счетчики после сброса.
+        """
+        comment = await self.comment_repo.get_by_id(comment_id)
+        if comment is None or comment.deleted_at is not None:
+            return None
+
+        # Рейтинг из БД учитывает только записанную реакцию пользователя, поэтому дельта
+        # считается от нее, а не от последней незаписанной из буфера
+        reactions = await self.comment_repo.get_user_reactions([comment_id], user_id)
+        persisted = reactions.get(comment_id)
+        self.reaction_buffer.add(comment_id, user_id, reaction)
+
+        rating = comment.rating + _score(reaction) - _score(persisted)
+        comment = replace(comment, rating=rating, is_positive=rating >= 0)
+        return self._to_dto(comment, reaction=reaction)
+
+    async def _read_through(
+        self,
+        key: str,
+        load: Callable[[Optional[int]], Awaitable[tuple[PageT, List[str]]]],
+        user_id: Optional[int],
+    ) -> PageT:
+        """
+        Страница из кэша или из БД.
+        В кэше хранится анонимная версия страницы (общая для всех зрителей), реакции
+        текущего пользователя накладываются поверх одним запросом.
+        Страница с отстающей реплики не кэшируется: она пережила бы инвалидацию после записи
+        и нарушила read-your-writes для закрепленного за primary автора.
+        """
+        if self.page_cache is None:
+            page, _ = await load(user_id)
+            return page
+
+        page = await self.page_cache.get(key)
+        if page is None:
+            page, tags = await load(None)
+            if self.stale_reads is None or not self.stale_reads():
+                await self.page_cache.set(key, page, tags)
+        return await self._overlay_reactions(page, user_id)
+
+    async def _overlay_reactions(self, page: PageT, user_id: Optional[int]) -> PageT:
+        """Копия страницы с флагами isLikedByMe/isDislikedByMe для пользователя"""
+        if not user_id or not page.items:
+            return page
+
+        ids = []
+        for item in page.items:
+            ids.append(item.id)
+            ids.extend(reply.id for reply in getattr(item, "replies", ()))
+        reactions = await self._user_reactions(ids, user_id)
+        if not reactions:
+            return page
+
+        def mark(dto: DtoT) -> DtoT:
+            reaction = reactions.get(dto.id)
+            if reaction is None:
+                return dto
+            return dto.model_copy(
+                update={
+                    "isLikedByMe": reaction == "like",
+                    "isDislikedByMe": reaction == "dislike",
+                }
+            )
+
+        items = []
+        for item in page.items:
+            item = mark(item)
+            if isinstance(item, CommentTreeItemDto) and item.replies:
+                item = item.model_copy(update={"replies": [mark(r) for r in item.replies]})
+            items.append(item)
+        return page.model_copy(update={"items": items})
+
+    async def _invalidate_pages(self, comment: Comment) -> None:
+        """Сбросить закэшированные страницы, которые могли показывать комментарий"""
+        if self.page_cache is None:
+            return
+        tags = [entity_tag(comment.entity_type, comment.entity_id)]
+        if comment.parent_id:
+            tags.append(children_tag(comment.parent_id))
+        await self.page_cache.invalidate(*tags)
+
+    def _page_size(self, limit: Optional[int], cursor: Optional[str]) -> int:
+        """Размер страницы: явный limit, иначе из курсора, иначе по умолчанию (с пределом)"""
+        if not limit and cursor:
+            position = decode_cursor(cursor)
+            limit = position.limit if position else None
+        limit = limit or self.settings.comments_page_size
+        return min(limit, self.settings.comments_max_page_size)
 
     async def _build_comment_dto(self, comment: Comment, user_id: Optional[int]) -> CommentDto:
-        children_count = await self.comment_repo.count_children(comment.id)
-        is_liked = False
-        is_disliked = False
+        items = await self._build_comment_dtos([comment], user_id)
+        return items[0]
+
+    async def _build_comment_dtos(
+        self, comments: Sequence[Comment], user_id: Optional[int]
+    ) -> List[CommentDto]:
+        """
+        Собрать DTO для страницы комментариев.
+        Счетчики ответов денормализованы в самих комментариях, поэтому дополнительный
+        запрос нужен только для реакций авторизованного пользователя.
+        """
+        if not comments:
+            return []
+
+        reactions = {}
         if user_id:
-            reaction = await self.comment_repo.get_user_reaction(comment.id, user_id)
-            is_liked = reaction == "like"
-            is_disliked = reaction == "dislike"
+            reactions = await self._user_reactions([comment.id for comment in comments], user_id)
+
+        return [self._to_dto(comment, reaction=reactions.get(comment.id)) for comment in comments]
 
+    async def _user_reactions(
+        self, comment_ids: List[int], user_id: int
+    ) -> Dict[int, Literal["like", "dislike"]]:
+        """Реакции пользователя из БД с наложенными незаписанными из ReactionBuffer"""
+        reactions = await self.comment_repo.get_user_reactions(comment_ids, user_id)
+        if self.reaction_buffer is None:
+            return reactions
+        for comment_id, reaction in self.reaction_buffer.overlay(comment_ids, user_id).items():
+            if reaction is None:
+                reactions.pop(comment_id, None)
+            else:
+                reactions[comment_id] = reaction
+        return reactions
+
+    @staticmethod
+    def _to_dto(
+        comment: Comment,
+        reaction: Optional[Literal["like", "dislike"]],
+    ) -> CommentDto:
+        if comment.deleted_at is not None:
+            return CommentDto(
+                id=comment.id,
+                author=AuthorDto(id=0, username=DELETED_PLACEHOLDER),
+                date=comment.created_at,
+                text=DELETED_PLACEHOLDER,
+                isPositive=comment.is_positive,
+                rating=comment.rating,
+                parentId=comment.parent_id,
+                depth=comment.depth,
+                childrenCount=comment.children_count,
+                isLikedByMe=False,
+                isDislikedByMe=False,
+                type=comment.entity_type,
+                isDeleted=True,
+            )
         return CommentDto(
             id=comment.id,
             author=AuthorDto(
@@ -156,8 +478,14 @@ class CommentAppService:
             isPositive=comment.is_positive,
             rating=comment.rating,
             parentId=comment.parent_id,
-            childrenCount=children_count,
-            isLikedByMe=is_liked,
-            isDislikedByMe=is_disliked,
+            depth=comment.depth,
+            childrenCount=comment.children_count,
+            isLikedByMe=reaction == "like",
+            isDislikedByMe=reaction == "dislike",
             type=comment.entity_type,
         )
+
+
+def _score(reaction: Optional[str]) -> int:
+    """Вклад реакции в рейтинг"""
+    return {"like": 1, "dislike": -1}.get(reaction, 0)
@@ -0,0 +1,65 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from ..core.config import Settings
+from ..repo.sql.repositories import SQLCommentRepository
+
+logger = logging.getLogger(__name__)
+
+
+class TombstonePurger:
+    """
+    Фоновая физическая очистка мягко удаленных комментариев.
+    Работает только в окне [purge_window_start_hour, purge_window_end_hour) по UTC
+    (окно может переходить через полночь; равные границы — круглые сутки). Надгробия старше
+    purge_grace_seconds удаляются пачками по purge_batch_size, каждая — своей транзакцией.
+    """
+
+    def __init__(self, session_factory: async_sessionmaker[AsyncSession], settings: Settings):
+        self.session_factory = session_factory
+        self.batch_size = settings.purge_batch_size
+        self.interval = settings.purge_interval_seconds
+        self.grace = timedelta(seconds=settings.purge_grace_seconds)
+        self.window_start = settings.purge_window_start_hour
+        self.window_end = settings.purge_window_end_hour
+        self.purged = 0
+
+    def in_window(self, now: datetime) -> bool:
+        if self.window_start == self.window_end:
+            return True
+        if self.window_start < self.window_end:
+            return self.window_start <= now.hour < self.window_end
+        return now.hour >= self.window_start or now.hour < self.window_end
+
+    async def run(self):
+        while True:
+            try:
+                if self.in_window(datetime.now(timezone.utc)):
+                    purged = await self.purge_once()
+                    if purged:
+                        logger.info("Purged %s deleted comments", purged)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Tombstone purge failed: %s", e)
+            await asyncio.sleep(self.interval)
+
+    async def purge_once(self) -> int:
+        """Удалить все доступные надгробия пачками; вернуть число удаленных строк"""
+        deleted_before = datetime.now(timezone.utc) - self.grace
+        total = 0
+        while True:
+            async with self.session_factory() as session:
+                purged = await SQLCommentRepository(session).purge_deleted(
+                    deleted_before, self.batch_size
+                )
+            total += purged
+            if purged < self.batch_size:
+                break
+            # Отдаем управление между пачками
+            await asyncio.sleep(0)
+        self.purged += total
+        return total
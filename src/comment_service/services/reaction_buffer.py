@@ -0,0 +1,211 @@
+import asyncio
+from typing import Dict, Iterable, Literal, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from comment_service.core.cache import PageCache, children_tag, entity_tag
+from comment_service.core.config import Settings
+from comment_service.core.logging import get_logger
+from comment_service.core.metrics import REGISTRY, Gauge
+from comment_service.repo.sql.repositories import SQLCommentRepository
+
+log = get_logger(__name__)
+
+Reaction = Optional[Literal["like", "dislike"]]
+
+# Буфер, запущенный в этом процессе: его счетчики выдаются в /metrics
+_active: Optional["ReactionBuffer"] = None
+
+
+class ReactionBuffer:
+    """
+    Write-behind для реакций: запрос только запоминает последнюю реакцию пользователя
+    на комментарий в памяти, а фоновая задача раз в flush_interval записывает накопленное
+    одной транзакцией (SQLCommentRepository.apply_reactions) — многострочные upsert
+    и одно обновление счетчиков на комментарий вместо транзакции на каждый клик.
+
+    Потеря при аварийном завершении процесса ограничена одним интервалом сброса:
+    при max_pending незаписанных реакций сброс запускается сразу, не дожидаясь интервала.
+    Пока БД недоступна, неудачная пачка возвращается в буфер только в пределах max_pending,
+    самые старые реакции сверх предела отбрасываются (счетчик dropped).
+    add не ждет записи — запрос держит соединение из пула, и ожидание сброса под нагрузкой
+    исчерпало бы пул. При штатной остановке close() записывает все накопленное до закрытия БД.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        settings: Settings,
+        page_cache: PageCache | None = None,
+    ):
+        self.session_factory = session_factory
+        self.page_cache = page_cache
+        self.flush_interval = settings.reaction_buffer_flush_interval_seconds
+        self.max_pending = settings.reaction_buffer_max_pending
+        # comment_id -> user_id -> последняя реакция (None — снять реакцию)
+        self._pending: Dict[int, Dict[int, Reaction]] = {}
+        self._pending_count = 0
+        # Пачка, которая пишется прямо сейчас: видна в overlay до фиксации транзакции
+        self._flushing: Dict[int, Dict[int, Reaction]] = {}
+        self._lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self.received = 0
+        self.flushed = 0
+        self.failed = 0
+        self.dropped = 0
+
+    def get(self, comment_id: int, user_id: int) -> tuple[bool, Reaction]:
+        """(есть ли незаписанная реакция, ее значение)"""
+        for source in (self._pending, self._flushing):
+            by_user = source.get(comment_id)
+            if by_user is not None and user_id in by_user:
+                return True, by_user[user_id]
+        return False, None
+
+    def overlay(self, comment_ids: Iterable[int], user_id: int) -> Dict[int, Reaction]:
+        """Незаписанные реакции пользователя на комментарии страницы"""
+        result: Dict[int, Reaction] = {}
+        if not self._pending and not self._flushing:
+            return result
+        for comment_id in comment_ids:
+            found, reaction = self.get(comment_id, user_id)
+            if found:
+                result[comment_id] = reaction
+        return result
+
+    def pending_for(self, user_id: int) -> Dict[int, Reaction]:
+        """Все незаписанные реакции пользователя: страница с ними отличается от записанной в БД"""
+        result: Dict[int, Reaction] = {}
+        for source in (self._flushing, self._pending):
+            for comment_id, by_user in source.items():
+                if user_id in by_user:
+                    result[comment_id] = by_user[user_id]
+        return result
+
+    def add(self, comment_id: int, user_id: int, reaction: Reaction) -> None:
+        by_user = self._pending.setdefault(comment_id, {})
+        if user_id not in by_user:
+            self._pending_count += 1
+        by_user[user_id] = reaction
+        self.received += 1
+        if self._pending_count >= self.max_pending:
+            self._wakeup.set()
+
+    async def flush(self) -> int:
+        """Записать накопленные реакции; вернуть число записанных пар (комментарий, пользователь)"""
+        async with self._lock:
+            pending, self._pending = self._pending, {}
+            count, self._pending_count = self._pending_count, 0
+            if not pending:
+                return 0
+
+            self._flushing = pending
+            try:
+                async with self.session_factory() as session:
+                    updated = await SQLCommentRepository(session).apply_reactions(pending)
+            except Exception:
+                self.failed += count
+                self._requeue(pending)
+                raise
+            finally:
+                self._flushing = {}
+
+        self.flushed += count
+        if self.page_cache is not None and updated:
+            tags = set()
+            for comment in updated:
+                tags.add(entity_tag(comment.entity_type, comment.entity_id))
+                if comment.parent_id:
+                    tags.add(children_tag(comment.parent_id))
+            await self.page_cache.invalidate(*tags)
+        return count
+
+    def _requeue(self, pending: Dict[int, Dict[int, Reaction]]) -> None:
+        """
+        Вернуть незаписанную пачку; более свежие реакции тех же пользователей важнее.
+        Если вместе с накопленными за время сброса реакциями пачка не помещается
+        в max_pending, отбрасываются самые ранние реакции пачки.
+        """
+        stale = [
+            (comment_id, user_id, reaction)
+            for comment_id, by_user in pending.items()
+            for user_id, reaction in by_user.items()
+            if user_id not in self._pending.get(comment_id, ())
+        ]
+        overflow = len(stale) - max(self.max_pending - self._pending_count, 0)
+        if overflow > 0:
+            self.dropped += overflow
+            log.warning("Reaction buffer is full, dropped %s oldest unflushed reactions", overflow)
+            stale = stale[overflow:]
+
+        # Старые реакции — в начало, чтобы при следующем переполнении отбрасывались первыми
+        requeued: Dict[int, Dict[int, Reaction]] = {}
+        for comment_id, user_id, reaction in stale:
+            requeued.setdefault(comment_id, {})[user_id] = reaction
+        for comment_id, by_user in self._pending.items():
+            requeued.setdefault(comment_id, {}).update(by_user)
+        self._pending = requeued
+        self._pending_count += len(stale)
+
+    async def run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                log.error("Reaction buffer flush failed, will retry: %s", e)
+                # Переполненный буфер сразу взводит _wakeup: без паузы повтор крутился бы
+                # в горячем цикле, пока БД недоступна
+                await asyncio.sleep(self.flush_interval)
+
+    def start(self):
+        global _active
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+        _active = self
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "received": self.received,
+            "flushed": self.flushed,
+            "failed": self.failed,
+            "dropped": self.dropped,
+        }
+
+    async def close(self):
+        """Остановить фоновый сброс и записать накопленное"""
+        global _active
+        if _active is self:
+            _active = None
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        flushed = await self.flush()
+        if flushed:
+            log.info("Reaction buffer flushed %s reactions on shutdown", flushed)
+
+
+def _collect_stats() -> Dict[Tuple[str, ...], float]:
+    if _active is None:
+        return {}
+    return {(result,): value for result, value in _active.stats().items()}
+
+
+REGISTRY.register(
+    Gauge(
+        "reaction_buffer_reactions",
+        "Reactions received, flushed, failed and dropped by the write-behind buffer",
+        _collect_stats,
+        ("result",),
+        kind="counter",
+    )
+)
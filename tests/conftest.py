@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import logging
+
+import httpx
+import pytest
+from jose import jwt
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from comment_service.api.app import create_app
+from comment_service.core.config import Settings
+from comment_service.repo.sql import models as m
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def settings() -> Settings:
+    return Settings(log_level="WARNING")
+
+
+@pytest.fixture
+async def engine(tmp_path):
+    # Файл, а не :memory: — у каждого соединения пула одна и та же база;
+    # timeout — busy timeout SQLite: параллельные писатели ждут блокировку, а не падают
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'comments.db'}", connect_args={"timeout": 30}
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(m.Base.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+def session_factory(engine):
+    return async_sessionmaker(engine, expire_on_commit=False)
+
+
+@pytest.fixture
+def app(settings, session_factory):
+    app = create_app(settings)
+    # ASGITransport не запускает lifespan — зависимости берут фабрику сессий из state
+    app.state.session_factory = session_factory
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    return app
+
+
+@pytest.fixture
+async def client(app):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+
+
+@pytest.fixture
+def auth(settings):
+    def headers(user_id: int) -> dict[str, str]:
+        claims = {"sub": str(user_id), "username": f"user{user_id}"}
+        token = jwt.encode(claims, settings.jwt_secret_key, algorithm="HS256")
+        return {"Authorization": f"Bearer {token}"}
+
+    return headers
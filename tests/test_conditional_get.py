@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+from sqlalchemy import update
+
+from comment_service.repo.sql import models as m
+from comment_service.services.reaction_buffer import ReactionBuffer
+
+pytestmark = pytest.mark.anyio
+
+LIST = "/api/v1/post/comments/1"
+
+
+@pytest.fixture
+async def comment_id(client, auth) -> int:
+    response = await client.post("/api/v1/post/1/comments", json={"text": "a"}, headers=auth(1))
+    return response.json()["comment"]["id"]
+
+
+async def set_updated_at(session_factory, updated_at: datetime) -> None:
+    async with session_factory() as session:
+        await session.execute(update(m.CommentCountModel).values(updated_at=updated_at))
+        await session.commit()
+
+
+async def test_etag_revalidation(client, auth, comment_id):
+    first = await client.get(LIST, headers=auth(2))
+    etag = first.headers["ETag"]
+
+    cached = await client.get(LIST, headers={**auth(2), "If-None-Match": etag})
+    assert cached.status_code == 304
+
+    await client.post(f"/api/v1/post/comments/{comment_id}/like", headers=auth(3))
+    changed = await client.get(LIST, headers={**auth(2), "If-None-Match": etag})
+    assert changed.status_code == 200
+
+
+async def test_last_modified_revalidation(client, session_factory, comment_id):
+    updated_at = datetime.now(timezone.utc).replace(microsecond=500_000) - timedelta(seconds=5)
+    await set_updated_at(session_factory, updated_at)
+
+    first = await client.get(LIST)
+    last_modified = first.headers["Last-Modified"]
+    assert last_modified == format_datetime(
+        updated_at.replace(microsecond=0) + timedelta(seconds=1), usegmt=True
+    )
+
+    cached = await client.get(LIST, headers={"If-Modified-Since": last_modified})
+    assert cached.status_code == 304
+
+    await set_updated_at(session_factory, updated_at + timedelta(seconds=1))
+    changed = await client.get(LIST, headers={"If-Modified-Since": last_modified})
+    assert changed.status_code == 200
+
+
+async def test_change_within_named_second_is_not_304(client, session_factory, comment_id):
+    # Запись в еще не закончившейся секунде: Last-Modified не отдается, а If-Modified-Since
+    # с этой же секундой не считается свежим
+    updated_at = datetime.now(timezone.utc) + timedelta(seconds=30)
+    await set_updated_at(session_factory, updated_at)
+
+    response = await client.get(
+        LIST, headers={"If-Modified-Since": format_datetime(updated_at, usegmt=True)}
+    )
+
+    assert response.status_code == 200
+    assert "Last-Modified" not in response.headers
+
+
+async def test_buffered_reaction_is_not_hidden_by_304(app, client, auth, settings, session_factory):
+    app.state.reaction_buffer = ReactionBuffer(session_factory, settings)
+    response = await client.post("/api/v1/post/1/comments", json={"text": "a"}, headers=auth(1))
+    comment_id = response.json()["comment"]["id"]
+    etag = (await client.get(LIST, headers=auth(2))).headers["ETag"]
+
+    await client.post(f"/api/v1/post/comments/{comment_id}/like", headers=auth(2))
+    response = await client.get(LIST, headers={**auth(2), "If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.json()["items"][0]["isLikedByMe"] is True
+    pending_etag = response.headers["ETag"]
+    cached = await client.get(LIST, headers={**auth(2), "If-None-Match": pending_etag})
+    assert cached.status_code == 304
+
+    await app.state.reaction_buffer.flush()
+    flushed = await client.get(LIST, headers={**auth(2), "If-None-Match": pending_etag})
+    assert flushed.status_code == 200
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import json
+from functools import partial
+
+import pytest
+
+from comment_service.api import lifespan
+from comment_service.api.lifespan import handle_post_deleted
+from comment_service.domain.models import Comment
+from comment_service.mq.consumer import EventConsumer
+from comment_service.repo.sql.repositories import SQLCommentRepository
+
+pytestmark = pytest.mark.anyio
+
+
+class InMemoryMessage:
+    """Замена aio_pika.IncomingMessage: body, routing_key, message_id и исход доставки"""
+
+    def __init__(self, routing_key: str, payload: dict):
+        self.routing_key = routing_key
+        self.message_id: str | None = None
+        self.body = json.dumps(payload).encode()
+        self.outcome: str | None = None
+
+    async def ack(self):
+        self.outcome = "ack"
+
+    async def nack(self, requeue: bool = True):
+        self.outcome = "requeue" if requeue else "nack"
+
+    async def reject(self, requeue: bool = False):
+        self.outcome = "requeue" if requeue else "dead_letter"
+
+
+async def iterate(messages):
+    for message in messages:
+        yield message
+
+
+@pytest.fixture
+def consumer(settings, session_factory, monkeypatch) -> EventConsumer:
+    monkeypatch.setattr(lifespan, "get_session_factory", lambda: session_factory)
+    consumer = EventConsumer(settings)
+    consumer.register_handler("post_deleted", partial(handle_post_deleted, settings=settings))
+    return consumer
+
+
+async def test_post_deleted_removes_comments_and_acks(consumer, session_factory):
+    async with session_factory() as session:
+        await SQLCommentRepository(session).create(
+            Comment(
+                id=0,
+                entity_id=7,
+                entity_type="post",
+                author_id=1,
+                author_username="author",
+                author_avatar=None,
+                text="text",
+                parent_id=None,
+            )
+        )
+    message = InMemoryMessage("posts.deleted", {"post_id": 7})
+
+    await consumer.consume(iterate([message]))
+
+    assert message.outcome == "ack"
+    async with session_factory() as session:
+        assert await SQLCommentRepository(session).count_by_entity(7, "post") == 0
+
+
+async def test_post_deleted_failure_is_not_acked(consumer, monkeypatch):
+    async def fail(self, *args, **kwargs):
+        raise RuntimeError("database is gone")
+
+    monkeypatch.setattr(SQLCommentRepository, "delete_by_entity", fail)
+    message = InMemoryMessage("posts.deleted", {"post_id": 7})
+
+    await consumer.consume(iterate([message]))
+
+    assert message.outcome == "dead_letter"
+    assert consumer.failed == 1
@@ -0,0 +1,17 @@
+from __future__ import annotations
+
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_route_label_is_full_template(client, auth):
+    created = await client.post("/api/v1/post/1/comments", json={"text": "a"}, headers=auth(1))
+    comment_id = created.json()["comment"]["id"]
+    await client.get(f"/api/v1/post/comments/{comment_id}/children")
+
+    metrics = (await client.get("/metrics")).text
+
+    assert 'route="/api/v1/post/{entity_id}/comments"' in metrics
+    assert 'route="/api/v1/post/comments/{comment_id}/children"' in metrics
+    assert 'route="/post/comments/{comment_id}/children"' not in metrics
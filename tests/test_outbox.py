@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import logging
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import select, update
+
+from comment_service.mq.outbox import OutboxRelay
+from comment_service.repo.sql import models as m
+
+pytestmark = pytest.mark.anyio
+
+
+class FlakyPublisher:
+    """Подтверждает все сообщения, кроме routing key из rejected"""
+
+    def __init__(self, rejected: set[str]):
+        self.rejected = rejected
+        self.published: list[str] = []
+
+    async def publish_raw(self, routing_key: str, body: bytes, message_id: str | None = None):
+        if routing_key in self.rejected:
+            raise RuntimeError("rejected by broker")
+        self.published.append(routing_key)
+
+
+async def outbox_rows(session_factory) -> list[m.OutboxEventModel]:
+    async with session_factory() as session:
+        result = await session.execute(select(m.OutboxEventModel).order_by(m.OutboxEventModel.id))
+        return list(result.scalars().all())
+
+
+async def make_due(session_factory) -> None:
+    async with session_factory() as session:
+        await session.execute(
+            update(m.OutboxEventModel).values(next_attempt_at=m.utcnow() - timedelta(seconds=1))
+        )
+        await session.commit()
+
+
+async def test_failing_event_backs_off_and_is_parked(session_factory, settings, caplog):
+    settings = settings.model_copy(update={"outbox_max_attempts": 2})
+    publisher = FlakyPublisher({"comments.poison"})
+    relay = OutboxRelay(session_factory, publisher, settings)
+    async with session_factory() as session:
+        for routing_key in ("comments.poison", "comments.comment_created"):
+            session.add(m.OutboxEventModel(routing_key=routing_key, payload="{}"))
+        await session.commit()
+
+    assert await relay.drain_once() == 1
+    assert publisher.published == ["comments.comment_created"]
+    (poison,) = await outbox_rows(session_factory)
+    assert poison.attempts == 1
+    assert poison.next_attempt_at is not None
+
+    # Пауза перед повтором не истекла — строка не берется
+    assert await relay.drain_once() == 0
+
+    await make_due(session_factory)
+    with pytest.raises(RuntimeError), caplog.at_level(logging.ERROR):
+        await relay.drain_once()
+    assert f"Outbox events [{poison.id}] parked" in caplog.text
+    (poison,) = await outbox_rows(session_factory)
+    assert poison.attempts == 2
+
+    # Отложенная строка остается в outbox, но больше не публикуется
+    await make_due(session_factory)
+    assert await relay.drain_once() == 0
+    assert [row.id for row in await outbox_rows(session_factory)] == [poison.id]
+
+
+def test_retry_delay_is_exponential_and_capped(settings):
+    settings = settings.model_copy(
+        update={"outbox_poll_interval_seconds": 0.5, "outbox_max_backoff_seconds": 30}
+    )
+    relay = OutboxRelay(None, FlakyPublisher(set()), settings)
+
+    delays = [relay.retry_delay(attempts).total_seconds() for attempts in (1, 2, 3, 10)]
+
+    assert delays == [1.0, 2.0, 4.0, 30.0]
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import pytest
+
+from comment_service.api import lifespan
+from comment_service.api.lifespan import handle_post_deleted
+from comment_service.core import cache
+from comment_service.core.cache import InMemoryPageCache
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def page_cache(app, monkeypatch) -> InMemoryPageCache:
+    page_cache = InMemoryPageCache(max_entries=100, ttl_seconds=60)
+    app.state.page_cache = page_cache
+    # handle_post_deleted берет кэш и фабрику сессий из глобального состояния процесса
+    monkeypatch.setattr(cache, "_page_cache", page_cache)
+    return page_cache
+
+
+async def post(client, auth, path: str, text: str) -> int:
+    response = await client.post(path, json={"text": text}, headers=auth(1))
+    assert response.status_code == 200, response.text
+    return response.json()["comment"]["id"]
+
+
+async def page_ids(client, path: str) -> list[int]:
+    response = await client.get(path)
+    assert response.status_code == 200
+    return [item["id"] for item in response.json()["items"]]
+
+
+async def tree_reply_ids(client) -> list[int]:
+    response = await client.get("/api/v1/post/comments/1/tree")
+    return [reply["id"] for item in response.json()["items"] for reply in item["replies"]]
+
+
+async def test_soft_delete_invalidates_parent_pages(client, auth, page_cache):
+    root = await post(client, auth, "/api/v1/post/1/comments", "root")
+    reply = await post(client, auth, f"/api/v1/post/comments/{root}/replies", "reply")
+    assert await page_ids(client, f"/api/v1/post/comments/{root}/children") == [reply]
+    assert await tree_reply_ids(client) == [reply]
+
+    deleted = await client.delete(f"/api/v1/post/comments/{reply}", headers=auth(1))
+    assert deleted.status_code == 204
+
+    assert await page_ids(client, f"/api/v1/post/comments/{root}/children") == []
+    assert await tree_reply_ids(client) == []
+
+
+async def test_post_deleted_invalidates_children_pages(
+    client, auth, page_cache, session_factory, settings, monkeypatch
+):
+    monkeypatch.setattr(lifespan, "get_session_factory", lambda: session_factory)
+    root = await post(client, auth, "/api/v1/post/1/comments", "root")
+    reply = await post(client, auth, f"/api/v1/post/comments/{root}/replies", "reply")
+    empty = await post(client, auth, f"/api/v1/post/comments/{reply}/replies", "leaf")
+    assert await page_ids(client, f"/api/v1/post/comments/{root}/children") == [reply]
+    assert await page_ids(client, f"/api/v1/post/comments/{empty}/children") == []
+
+    await handle_post_deleted({"post_id": 1}, settings=settings)
+
+    # Включая пустую страницу ответов, помеченную только тегом родителя
+    assert page_cache.stats()["entries"] == 0
+    assert await page_ids(client, f"/api/v1/post/comments/{root}/children") == []
+    assert await page_ids(client, "/api/v1/post/comments/1") == []
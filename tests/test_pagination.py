@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+async def create_comments(client, auth, count: int) -> list[int]:
+    ids = []
+    for i in range(count):
+        response = await client.post(
+            "/api/v1/post/1/comments", json={"text": f"comment {i}"}, headers=auth(1)
+        )
+        assert response.status_code == 200, response.text
+        ids.append(response.json()["comment"]["id"])
+    return ids
+
+
+async def test_cursor_walks_all_pages(client, auth):
+    ids = await create_comments(client, auth, 5)
+
+    seen = []
+    params = {"limit": 2}
+    while True:
+        response = await client.get("/api/v1/post/comments/1", params=params)
+        assert response.status_code == 200
+        page = response.json()
+        seen.extend(item["id"] for item in page["items"])
+        if not page["nextCursor"]:
+            break
+        params = {"cursor": page["nextCursor"]}
+
+    assert seen == ids
+
+
+async def test_malformed_cursor_is_rejected(client):
+    response = await client.get("/api/v1/post/comments/1", params={"cursor": "garbage!!"})
+
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("path", ["/api/v1/post/comments/1", "/api/v1/post/comments/1/tree"])
+async def test_cursor_from_other_sort_is_rejected(client, auth, path):
+    await create_comments(client, auth, 3)
+    first = await client.get(path, params={"limit": 1, "sort": "top"})
+    cursor = first.json()["nextCursor"]
+    assert cursor
+
+    response = await client.get(path, params={"cursor": cursor, "sort": "newest"})
+
+    assert response.status_code == 400
+
+
+async def test_cursor_from_other_sort_is_rejected_for_children(client, auth):
+    (root,) = await create_comments(client, auth, 1)
+    for i in range(3):
+        await client.post(
+            f"/api/v1/post/comments/{root}/replies", json={"text": f"reply {i}"}, headers=auth(2)
+        )
+    first = await client.get(
+        f"/api/v1/post/comments/{root}/children", params={"limit": 1, "sort": "newest"}
+    )
+    cursor = first.json()["nextCursor"]
+
+    response = await client.get(f"/api/v1/post/comments/{root}/children", params={"cursor": cursor})
+
+    assert response.status_code == 400
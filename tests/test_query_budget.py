@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import pytest
+
+from comment_service.core.metrics import instrument_engine
+from comment_service.core.query_budget import assert_max_queries
+
+pytestmark = pytest.mark.anyio
+
+ROOTS = 5
+REPLIES = 3
+
+# Бюджеты как в benchmarks/check_query_budget.py: число запросов не зависит от числа
+# комментариев на странице и ответов у них
+BUDGETS = [
+    ("GET", "/api/v1/post/comments/1?limit=20", False, 2),
+    ("GET", "/api/v1/post/comments/1?limit=20", True, 3),
+    ("GET", "/api/v1/post/comments/1/tree?limit=20&replies=3", False, 3),
+    ("GET", "/api/v1/post/comments/1/tree?limit=20&replies=3", True, 4),
+    ("POST", "/api/v1/post/comments/{root}/like", True, 5),
+    ("POST", "/api/v1/post/comments/{root}/dislike", True, 5),
+]
+
+
+@pytest.fixture
+async def root(engine, client, auth) -> int:
+    instrument_engine(engine.sync_engine)
+    roots = []
+    for i in range(ROOTS):
+        response = await client.post(
+            "/api/v1/post/1/comments", json={"text": f"root {i}"}, headers=auth(1)
+        )
+        roots.append(response.json()["comment"]["id"])
+    for root in roots:
+        for i in range(REPLIES):
+            await client.post(
+                f"/api/v1/post/comments/{root}/replies",
+                json={"text": f"reply {i}"},
+                headers=auth(2),
+            )
+    return roots[0]
+
+
+@pytest.mark.parametrize("method, path, authorized, budget", BUDGETS)
+async def test_endpoint_query_budget(client, auth, root, method, path, authorized, budget):
+    headers = auth(3) if authorized else {}
+
+    with assert_max_queries(budget) as stats:
+        response = await client.request(method, path.format(root=root), headers=headers)
+
+    assert response.status_code == 200, response.text
+    assert stats.count > 0
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import pytest
+from sqlalchemy import event
+
+from comment_service.domain.models import Comment
+from comment_service.repo.sql.repositories import SQLCommentRepository
+
+pytestmark = pytest.mark.anyio
+
+
+def new_comment(parent_id=None) -> Comment:
+    return Comment(
+        id=0,
+        entity_id=1,
+        entity_type="post",
+        author_id=1,
+        author_username="author",
+        author_avatar=None,
+        text="text",
+        parent_id=parent_id,
+    )
+
+
+async def query_plans(engine, session, run) -> list[str]:
+    """Выполнить run и вернуть EXPLAIN QUERY PLAN каждого выданного им SELECT"""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", capture)
+    try:
+        await run()
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", capture)
+
+    plans = []
+    connection = await session.connection()
+    for statement, parameters in statements:
+        result = await connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+        plans.append("\n".join(row[-1] for row in result.all()))
+    return plans
+
+
+@pytest.fixture
+async def thread(session_factory) -> Comment:
+    async with session_factory() as session:
+        repo = SQLCommentRepository(session)
+        root = None
+        for _ in range(3):
+            root = await repo.create(new_comment())
+        for _ in range(3):
+            await repo.create(new_comment(parent_id=root.id))
+        return root
+
+
+@pytest.mark.parametrize("sort", ["oldest", "newest"])
+async def test_root_listing_uses_index(engine, session_factory, thread, sort):
+    async with session_factory() as session:
+        repo = SQLCommentRepository(session)
+        _, cursor = await repo.list_root_comments(1, "post", limit=1, sort=sort)
+
+        async def run():
+            await repo.list_root_comments(1, "post", limit=1, sort=sort)
+            await repo.list_root_comments(1, "post", cursor=cursor, sort=sort)
+
+        plans = await query_plans(engine, session, run)
+
+    assert len(plans) == 2
+    for plan in plans:
+        assert "ix_comments_root_listing" in plan
+        assert "USE TEMP B-TREE" not in plan
+
+
+@pytest.mark.parametrize("sort", ["oldest", "newest"])
+async def test_children_listing_uses_index(engine, session_factory, thread, sort):
+    async with session_factory() as session:
+        repo = SQLCommentRepository(session)
+        _, cursor = await repo.list_children(thread.id, limit=1, sort=sort)
+
+        async def run():
+            await repo.list_children(thread.id, limit=1, sort=sort)
+            await repo.list_children(thread.id, cursor=cursor, sort=sort)
+
+        plans = await query_plans(engine, session, run)
+
+    assert len(plans) == 2
+    for plan in plans:
+        assert "ix_comments_parent_listing" in plan
+        assert "USE TEMP B-TREE" not in plan
+
+
+async def test_first_children_are_not_sorted_in_temp_btree(engine, session_factory, thread):
+    async with session_factory() as session:
+        repo = SQLCommentRepository(session)
+
+        async def run():
+            replies = await repo.list_first_children([thread.id], limit=2)
+            first, second = replies[thread.id]
+            assert first.id < second.id
+
+        (plan,) = await query_plans(engine, session, run)
+
+    assert "ix_comments_parent_listing" in plan
+    assert "USE TEMP B-TREE" not in plan
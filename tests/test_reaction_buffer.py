@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import pytest
+
+from comment_service.core.metrics import REGISTRY
+from comment_service.domain.models import Comment
+from comment_service.repo.sql.repositories import SQLCommentRepository
+from comment_service.services.comment_service import CommentAppService
+from comment_service.services.reaction_buffer import ReactionBuffer
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def comment(session_factory) -> Comment:
+    async with session_factory() as session:
+        return await SQLCommentRepository(session).create(
+            Comment(
+                id=0,
+                entity_id=1,
+                entity_type="post",
+                author_id=1,
+                author_username="author",
+                author_avatar=None,
+                text="text",
+                parent_id=None,
+            )
+        )
+
+
+@pytest.fixture
+def buffer(session_factory, settings) -> ReactionBuffer:
+    return ReactionBuffer(session_factory, settings)
+
+
+async def react(session_factory, settings, buffer, comment_id: int, user_id: int, reaction):
+    async with session_factory() as session:
+        service = CommentAppService(SQLCommentRepository(session), settings, reaction_buffer=buffer)
+        return await service.set_reaction(comment_id, user_id, reaction)
+
+
+async def stored_rating(session_factory, comment_id: int) -> int:
+    async with session_factory() as session:
+        return (await SQLCommentRepository(session).get_by_id(comment_id)).rating
+
+
+async def test_repeated_like_keeps_rating(session_factory, settings, buffer, comment):
+    first = await react(session_factory, settings, buffer, comment.id, 2, "like")
+    second = await react(session_factory, settings, buffer, comment.id, 2, "like")
+
+    assert (first.rating, second.rating) == (1, 1)
+    await buffer.flush()
+    assert await stored_rating(session_factory, comment.id) == 1
+
+
+async def test_unflushed_toggles_rate_against_stored_reaction(
+    session_factory, settings, buffer, comment
+):
+    ratings = [
+        (await react(session_factory, settings, buffer, comment.id, 2, reaction)).rating
+        for reaction in ("like", "dislike", "like")
+    ]
+
+    assert ratings == [1, -1, 1]
+    await buffer.flush()
+    assert await stored_rating(session_factory, comment.id) == 1
+
+
+async def test_change_of_flushed_reaction(session_factory, settings, buffer, comment):
+    await react(session_factory, settings, buffer, comment.id, 2, "like")
+    await buffer.flush()
+
+    disliked = await react(session_factory, settings, buffer, comment.id, 2, "dislike")
+    liked = await react(session_factory, settings, buffer, comment.id, 2, "like")
+
+    assert (disliked.rating, liked.rating) == (-1, 1)
+    await buffer.flush()
+    assert await stored_rating(session_factory, comment.id) == 1
+
+
+async def test_failed_flush_requeue_is_capped(session_factory, settings, comment):
+    settings = settings.model_copy(update={"reaction_buffer_max_pending": 3})
+    buffer = ReactionBuffer(session_factory, settings)
+    for user_id in (1, 2, 3):
+        buffer.add(comment.id, user_id, "like")
+
+    def unavailable():
+        # Реакции, пришедшие во время неудачного сброса, новее пачки и не отбрасываются
+        buffer.add(comment.id, 10, "dislike")
+        buffer.add(comment.id, 11, "dislike")
+        raise OSError("database is unavailable")
+
+    buffer.session_factory = unavailable
+    with pytest.raises(OSError):
+        await buffer.flush()
+
+    assert buffer.dropped == 2
+    assert buffer.failed == 3
+    assert [buffer.get(comment.id, user_id)[0] for user_id in (1, 2, 3, 10, 11)] == [
+        False,
+        False,
+        True,
+        True,
+        True,
+    ]
+
+    buffer.session_factory = session_factory
+    buffer.start()
+    assert 'reaction_buffer_reactions_total{result="dropped"} 2' in REGISTRY.render()
+    await buffer.close()
+
+    assert await stored_rating(session_factory, comment.id) == -1
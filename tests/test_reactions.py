@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import asyncio
+import random
+
+import pytest
+from sqlalchemy import func, select
+
+from comment_service.domain.models import Comment
+from comment_service.repo.sql import models as m
+from comment_service.repo.sql.repositories import SQLCommentRepository
+from comment_service.services.comment_service import CommentAppService
+from comment_service.services.reaction_buffer import ReactionBuffer
+
+pytestmark = pytest.mark.anyio
+
+# Параллельных пользователей в проверке счетчиков под конкурентной нагрузкой
+REACTORS = 100
+
+
+@pytest.fixture
+async def comment(session_factory) -> Comment:
+    async with session_factory() as session:
+        return await SQLCommentRepository(session).create(
+            Comment(
+                id=0,
+                entity_id=1,
+                entity_type="post",
+                author_id=1,
+                author_username="author",
+                author_avatar=None,
+                text="viral comment",
+                parent_id=None,
+            )
+        )
+
+
+async def react(session_factory, settings, comment_id: int, user_id: int, reaction):
+    async with session_factory() as session:
+        service = CommentAppService(SQLCommentRepository(session), settings)
+        return await service.set_reaction(comment_id, user_id, reaction)
+
+
+async def assert_counters_match_rows(session_factory, comment_id: int) -> m.CommentModel:
+    async with session_factory() as session:
+        model = await session.get(m.CommentModel, comment_id)
+        rows = dict(
+            (
+                await session.execute(
+                    select(m.CommentReactionModel.reaction, func.count())
+                    .where(m.CommentReactionModel.comment_id == comment_id)
+                    .group_by(m.CommentReactionModel.reaction)
+                )
+            ).all()
+        )
+    assert model.likes_count == rows.get("like", 0)
+    assert model.dislikes_count == rows.get("dislike", 0)
+    assert model.rating == model.likes_count - model.dislikes_count
+    return model
+
+
+async def test_reaction_toggles(session_factory, settings, comment):
+    liked = await react(session_factory, settings, comment.id, 2, "like")
+    again = await react(session_factory, settings, comment.id, 2, "like")
+    disliked = await react(session_factory, settings, comment.id, 2, "dislike")
+    removed = await react(session_factory, settings, comment.id, 2, None)
+
+    assert [liked.rating, again.rating, disliked.rating, removed.rating] == [1, 1, -1, 0]
+    await assert_counters_match_rows(session_factory, comment.id)
+
+
+async def test_repeated_reaction_does_not_touch_comment(session_factory, settings, comment):
+    await react(session_factory, settings, comment.id, 2, "like")
+    async with session_factory() as session:
+        before = await SQLCommentRepository(session).get_by_id(comment.id)
+
+    await react(session_factory, settings, comment.id, 2, "like")
+
+    async with session_factory() as session:
+        after = await SQLCommentRepository(session).get_by_id(comment.id)
+    assert after.updated_at == before.updated_at
+
+
+async def test_concurrent_reactions_of_many_users(session_factory, settings, comment):
+    async def user_reactions(user_id: int) -> str:
+        rnd = random.Random(user_id)
+        reaction = "like"
+        for _ in range(3):
+            reaction = rnd.choice(("like", "dislike"))
+            await react(session_factory, settings, comment.id, user_id, reaction)
+        return reaction
+
+    final = await asyncio.gather(*(user_reactions(user_id) for user_id in range(2, 2 + REACTORS)))
+
+    model = await assert_counters_match_rows(session_factory, comment.id)
+    assert model.likes_count == final.count("like")
+    assert model.dislikes_count == final.count("dislike")
+
+
+async def test_concurrent_different_reactions_of_one_user(session_factory, settings, comment):
+    reactions = ["like", "dislike", None, "like", "dislike", "like", None, "dislike"] * 4
+
+    await asyncio.gather(
+        *(react(session_factory, settings, comment.id, 2, reaction) for reaction in reactions)
+    )
+
+    model = await assert_counters_match_rows(session_factory, comment.id)
+    assert model.likes_count + model.dislikes_count <= 1
+
+
+async def test_reaction_on_deleted_comment_is_not_saved(session_factory, settings, comment):
+    async with session_factory() as session:
+        await SQLCommentRepository(session).soft_delete(comment.id)
+
+    async with session_factory() as session:
+        updated = await SQLCommentRepository(session).set_user_reaction(comment.id, 2, "like")
+        assert updated is None
+
+    async with session_factory() as session:
+        count = await session.scalar(select(func.count()).select_from(m.CommentReactionModel))
+    assert count == 0
+
+
+@pytest.mark.parametrize("buffered", [False, True])
+async def test_reaction_on_missing_or_deleted_comment_is_404(
+    app, client, auth, session_factory, settings, buffered
+):
+    if buffered:
+        app.state.reaction_buffer = ReactionBuffer(session_factory, settings)
+    created = await client.post("/api/v1/post/1/comments", json={"text": "a"}, headers=auth(1))
+    comment_id = created.json()["comment"]["id"]
+    deleted = await client.delete(f"/api/v1/post/comments/{comment_id}", headers=auth(1))
+    assert deleted.status_code == 204
+
+    for target in (comment_id, comment_id + 100):
+        response = await client.post(f"/api/v1/post/comments/{target}/like", headers=auth(2))
+        assert response.status_code == 404
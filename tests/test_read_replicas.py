@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import pytest
+
+from comment_service.core.cache import InMemoryPageCache
+from comment_service.core.db import ReadRouter, Replica
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def page_cache(app) -> InMemoryPageCache:
+    app.state.page_cache = InMemoryPageCache(max_entries=100, ttl_seconds=60)
+    return app.state.page_cache
+
+
+@pytest.fixture
+def read_router(app, engine, session_factory) -> ReadRouter:
+    # «Реплика» — та же база: проверяется только, откуда страница попадает в кэш
+    replica = Replica(url=str(engine.url), engine=engine, session_factory=session_factory)
+    app.state.read_router = ReadRouter([replica], pin_seconds=60, retry_seconds=60)
+    return app.state.read_router
+
+
+async def test_replica_pages_are_cached_without_recent_writes(client, page_cache, read_router):
+    response = await client.get("/api/v1/post/comments/1")
+
+    assert response.status_code == 200
+    assert page_cache.stats()["entries"] == 1
+
+
+async def test_replica_pages_are_not_cached_after_write(client, auth, page_cache, read_router):
+    await client.get("/api/v1/post/comments/1")
+    created = await client.post("/api/v1/post/1/comments", json={"text": "a"}, headers=auth(1))
+    assert created.status_code == 200
+    assert page_cache.stats()["entries"] == 0
+    assert read_router.has_recent_writes()
+
+    # Аноним читает с реплики, которая могла еще не получить запись: страница не кэшируется,
+    # иначе автор после окончания закрепления увидел бы ее без своего комментария
+    response = await client.get("/api/v1/post/comments/1")
+
+    assert response.status_code == 200
+    assert page_cache.stats()["entries"] == 0
+
+
+async def test_primary_pages_are_cached_after_write(client, auth, page_cache, read_router):
+    await client.post("/api/v1/post/1/comments", json={"text": "a"}, headers=auth(1))
+
+    # Автор закреплен за primary
+    response = await client.get("/api/v1/post/comments/1", headers=auth(1))
+
+    assert [item["text"] for item in response.json()["items"]] == ["a"]
+    assert page_cache.stats()["entries"] == 1
+
+
+def test_recent_writes_expire_with_pins():
+    router = ReadRouter([], pin_seconds=0, retry_seconds=60)
+    assert not router.has_recent_writes()
+
+    router.pin(1)
+
+    assert not router.has_recent_writes()
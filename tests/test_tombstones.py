@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+async def post(client, auth, path: str, text: str) -> int:
+    response = await client.post(path, json={"text": text}, headers=auth(1))
+    assert response.status_code == 200, response.text
+    return response.json()["comment"]["id"]
+
+
+async def delete(client, auth, comment_id: int) -> None:
+    response = await client.delete(f"/api/v1/post/comments/{comment_id}", headers=auth(1))
+    assert response.status_code == 204
+
+
+async def test_root_tombstone_with_replies_stays_in_listing(client, auth):
+    root = await post(client, auth, "/api/v1/post/1/comments", "root")
+    await post(client, auth, f"/api/v1/post/comments/{root}/replies", "reply")
+    lonely = await post(client, auth, "/api/v1/post/1/comments", "no replies")
+    await delete(client, auth, root)
+    await delete(client, auth, lonely)
+
+    for path in ("/api/v1/post/comments/1", "/api/v1/post/comments/1/tree"):
+        items = (await client.get(path)).json()["items"]
+        assert [item["id"] for item in items] == [root]
+        assert items[0]["isDeleted"] is True
+        assert items[0]["text"] == "[deleted]"
+
+
+async def test_child_tombstone_with_replies_stays_in_children(client, auth):
+    root = await post(client, auth, "/api/v1/post/1/comments", "root")
+    child = await post(client, auth, f"/api/v1/post/comments/{root}/replies", "child")
+    await post(client, auth, f"/api/v1/post/comments/{child}/replies", "grandchild")
+    lonely = await post(client, auth, f"/api/v1/post/comments/{root}/replies", "no replies")
+    await delete(client, auth, child)
+    await delete(client, auth, lonely)
+
+    children = (await client.get(f"/api/v1/post/comments/{root}/children")).json()["items"]
+    assert [(item["id"], item["isDeleted"]) for item in children] == [(child, True)]
+
+    tree = (await client.get("/api/v1/post/comments/1/tree")).json()["items"]
+    assert [reply["id"] for reply in tree[0]["replies"]] == [child]
+
+
+async def test_tombstone_with_only_deleted_replies_keeps_live_descendants(client, auth):
+    root = await post(client, auth, "/api/v1/post/1/comments", "root")
+    child = await post(client, auth, f"/api/v1/post/comments/{root}/replies", "child")
+    grandchild = await post(client, auth, f"/api/v1/post/comments/{child}/replies", "grandchild")
+    await delete(client, auth, child)
+    await delete(client, auth, root)
+
+    listing = (await client.get("/api/v1/post/comments/1")).json()["items"]
+    assert [(item["id"], item["isDeleted"]) for item in listing] == [(root, True)]
+    tree = (await client.get("/api/v1/post/comments/1/tree")).json()["items"]
+    assert [reply["id"] for reply in tree[0]["replies"]] == [child]
+    children = (await client.get(f"/api/v1/post/comments/{root}/children")).json()["items"]
+    assert [(item["id"], item["isDeleted"]) for item in children] == [(child, True)]
+    replies = (await client.get(f"/api/v1/post/comments/{child}/children")).json()["items"]
+    assert [item["id"] for item in replies] == [grandchild]
+
+    await delete(client, auth, grandchild)
+    assert (await client.get("/api/v1/post/comments/1")).json()["items"] == []
+
+
+async def test_tree_replies_cursor_counts_listed_tombstones(client, auth):
+    root = await post(client, auth, "/api/v1/post/1/comments", "root")
+    replies = [
+        await post(client, auth, f"/api/v1/post/comments/{root}/replies", f"reply {i}")
+        for i in range(3)
+    ]
+    for reply in replies[:2]:
+        await post(client, auth, f"/api/v1/post/comments/{reply}/replies", "nested")
+        await delete(client, auth, reply)
+
+    tree = await client.get("/api/v1/post/comments/1/tree", params={"replies": 2})
+    (item,) = tree.json()["items"]
+    assert [reply["id"] for reply in item["replies"]] == replies[:2]
+
+    rest = await client.get(
+        f"/api/v1/post/comments/{root}/children", params={"cursor": item["repliesCursor"]}
+    )
+    assert [reply["id"] for reply in rest.json()["items"]] == replies[2:]